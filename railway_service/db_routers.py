@@ -0,0 +1,51 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_DATABASE = "default"
+
+# app_label of the DatabaseCache table's pseudo-model.
+CACHE_APP_LABEL = "django_cache"
+
+# Reads go to the primary unless a request explicitly allows replicas, so
+# management commands, shells and background work always see fresh data.
+_use_primary = ContextVar("use_primary", default=True)
+
+
+@contextmanager
+def use_primary(value: bool = True):
+    """Route reads inside the block to the primary (or allow replicas)."""
+    token = _use_primary.set(value)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router:
+    - Writes - always the primary
+    - Reads - a random replica from DATABASE_REPLICAS, unless pinned to the primary
+      (the cache table always: a lagging replica would miss fresh pins)
+    - Migrations - only the primary (replicas are fed by streaming replication)
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or _use_primary.get():
+            return PRIMARY_DATABASE
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return PRIMARY_DATABASE
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DATABASE
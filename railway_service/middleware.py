@@ -0,0 +1,135 @@
+import hashlib
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from railway_service import metrics
+from railway_service.db_routers import use_primary
+from railway_service.nplusone import detect_n_plus_one
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send safe-method requests to the read replicas and everything else to the primary.
+
+    After a successful write the client is pinned to the primary for
+    DATABASE_REPLICA_PIN_SECONDS, so e.g. a freshly created order is visible in
+    the order list even if the replicas lag behind. Clients are identified by
+    their Authorization header (or session cookie), so JWT clients are covered
+    without decoding the token here.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def _pin_key(request):
+        credentials = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+            settings.SESSION_COOKIE_NAME
+        )
+        if not credentials:
+            return None
+        digest = hashlib.sha256(credentials.encode()).hexdigest()
+        return f"db-primary-pin:{digest}"
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        pin_key = self._pin_key(request)
+        is_write = request.method not in SAFE_METHODS
+        primary = is_write or bool(pin_key and cache.get(pin_key))
+
+        with use_primary(primary):
+            response = self.get_response(request)
+
+        if is_write and pin_key and response.status_code < 400:
+            cache.set(pin_key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Measure every request and report it in two ways:
+    - a Server-Timing header (db, render, app and total time in ms, query count)
+    - histograms per view and action, exposed at /metrics
+
+    Render is the time the renderer spends turning the response data into
+    JSON, msgpack, CBOR or Parquet; app is what is left of the total outside
+    the database and the renderer (view logic, serializer to_representation).
+    The cost is a database execute wrapper and a few perf_counter() calls.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        query_stats = request._query_stats = metrics.QueryStats()
+        request._render_duration = 0.0
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_stats))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        render = request._render_duration
+        app = total - query_stats.duration - render
+
+        response["Server-Timing"] = (
+            f'db;dur={query_stats.duration * 1000:.2f};desc="{query_stats.count} queries", '
+            f"render;dur={render * 1000:.2f}, "
+            f"app;dur={app * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+        match = request.resolver_match
+        if match is not None and match.view_name:
+            actions = getattr(match.func, "actions", None) or {}
+            labels = (
+                ("view", match.view_name),
+                ("action", actions.get(request.method.lower(), request.method.lower())),
+            )
+            metrics.REQUEST_DURATION.observe(labels, total)
+            metrics.DB_DURATION.observe(labels, query_stats.duration)
+            metrics.RENDER_DURATION.observe(labels, render)
+            metrics.APP_DURATION.observe(labels, app)
+            metrics.DB_QUERIES.observe(labels, query_stats.count)
+        return response
+
+    def process_template_response(self, request, response):
+        # Template response hooks run in reverse order, so this one, of the
+        # first middleware, runs right before the response is rendered.
+        started = time.perf_counter()
+        db_started = request._query_stats.duration
+
+        def rendered(response):
+            request._render_duration = (
+                time.perf_counter()
+                - started
+                - (request._query_stats.duration - db_started)
+            )
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class NPlusOneMiddleware:
+    """
+    Flag repeated query fingerprints in read requests when NPLUSONE_DETECTION is on.
+
+    Writes are skipped: e.g. order creation validates and inserts tickets one
+    by one by design.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.NPLUSONE_DETECTION or request.method not in SAFE_METHODS:
+            return self.get_response(request)
+        with detect_n_plus_one():
+            return self.get_response(request)
@@ -0,0 +1,68 @@
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_TRANSACTION_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK")
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize literals and placeholder lists away, so repeated queries compare equal."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql.replace("%s", "?"))
+    sql = _PLACEHOLDER_LIST.sub("(?+)", sql)
+    return " ".join(sql.split())
+
+
+class NPlusOneDetector:
+    """
+    Database execute wrapper flagging a query fingerprint executed more than
+    `threshold` times: it either raises NPlusOneError or logs a warning with
+    the stack trace of the offending query.
+    """
+
+    def __init__(self, threshold: int, raise_error: bool):
+        self.threshold = threshold
+        self.raise_error = raise_error
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(_TRANSACTION_STATEMENTS):
+            query = fingerprint(sql)
+            self.counts[query] += 1
+            if self.counts[query] == self.threshold + 1:
+                self.report(query)
+        return execute(sql, params, many, context)
+
+    def report(self, query: str) -> None:
+        message = (
+            f"Possible N+1 query: executed more than {self.threshold} times "
+            f"in one request: {query}"
+        )
+        if self.raise_error:
+            raise NPlusOneError(message)
+        logger.warning(message, stack_info=True)
+
+
+@contextmanager
+def detect_n_plus_one(threshold: int = None, raise_error: bool = None):
+    detector = NPlusOneDetector(
+        threshold=settings.NPLUSONE_THRESHOLD if threshold is None else threshold,
+        raise_error=settings.NPLUSONE_RAISE if raise_error is None else raise_error,
+    )
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
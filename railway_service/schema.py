@@ -0,0 +1,59 @@
+import hashlib
+import threading
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """
+    The OpenAPI document, built once per process instead of on every request:
+    read from OPENAPI_SCHEMA_FILE when `manage.py spectacular --file` wrote it
+    at deploy time, otherwise generated on the first request. Each format is
+    rendered once with an ETag, so revalidating clients get 304 Not Modified.
+    """
+
+    _schema = None
+    _rendered = {}  # media type -> (content type, body, etag)
+    _lock = threading.Lock()
+
+    def get_schema(self, request) -> dict:
+        schema_file = settings.OPENAPI_SCHEMA_FILE
+        if schema_file and Path(schema_file).exists():
+            # YAML is a superset of JSON: either output format loads.
+            return yaml.safe_load(Path(schema_file).read_text(encoding="utf-8"))
+        generator = self.generator_class(
+            urlconf=self.urlconf, api_version=self.api_version, patterns=self.patterns
+        )
+        return generator.get_schema(request=request, public=self.serve_public)
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        cls = type(self)
+        media_type = request.accepted_media_type
+        with cls._lock:
+            if cls._schema is None:
+                cls._schema = self.get_schema(request)
+            if media_type not in cls._rendered:
+                renderer = request.accepted_renderer
+                body = renderer.render(cls._schema, media_type, {"view": self})
+                content_type = renderer.media_type
+                if renderer.charset:
+                    content_type = f"{content_type}; charset={renderer.charset}"
+                etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+                cls._rendered[media_type] = (content_type, body, etag)
+        content_type, body, etag = cls._rendered[media_type]
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+        response = HttpResponse(body, content_type=content_type)
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import hashlib
 import os
 from datetime import timedelta
 from pathlib import Path
@@ -35,6 +36,10 @@ if not SECRET_KEY:
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Dev tooling, neither imported unless enabled.
+DEBUG_TOOLBAR = DEBUG and os.environ.get("DEBUG_TOOLBAR", "true").lower() == "true"
+API_DOCS = os.environ.get("API_DOCS", "true").lower() == "true"
+
 ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
 
 
@@ -47,26 +52,31 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "debug_toolbar",
     "rest_framework",
     "railway_station",
     "user",
     "drf_spectacular",
     "rest_framework.authtoken",
 ]
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append("debug_toolbar")
 
 AUTH_USER_MODEL = "user.User"
 
 MIDDLEWARE = [
+    "railway_service.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "railway_service.middleware.ReplicaRoutingMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "railway_service.middleware.NPlusOneMiddleware",
 ]
+if DEBUG_TOOLBAR:
+    MIDDLEWARE.insert(2, "debug_toolbar.middleware.DebugToolbarMiddleware")
 
 ROOT_URLCONF = "railway_service.urls"
 
@@ -91,15 +101,73 @@ WSGI_APPLICATION = "railway_service.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
+
+def postgres_database(alias: str, host: str) -> dict:
+    """
+    Connection settings for one PostgreSQL alias.
+
+    psycopg3 connection pooling is enabled per alias through
+    <ALIAS>_POOL_MAX_SIZE (and optionally <ALIAS>_POOL_MIN_SIZE and
+    <ALIAS>_POOL_TIMEOUT), e.g. DEFAULT_POOL_MAX_SIZE=20, REPLICA_1_POOL_MAX_SIZE=40.
+    """
+    database = {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.environ.get("POSTGRES_DB", "railway_station"),
         "USER": os.environ.get("POSTGRES_USER", "railway_station_user"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "railway_station_password"),
-        "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+        "HOST": host,
         "PORT": os.environ.get("POSTGRES_PORT", "5432"),
     }
+    env_prefix = alias.upper()
+    pool_max_size = os.environ.get(f"{env_prefix}_POOL_MAX_SIZE")
+    if pool_max_size:
+        database["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.environ.get(f"{env_prefix}_POOL_MIN_SIZE", 1)),
+                "max_size": int(pool_max_size),
+                "timeout": float(os.environ.get(f"{env_prefix}_POOL_TIMEOUT", 10)),
+            }
+        }
+    return database
+
+
+DATABASES = {
+    "default": postgres_database(
+        "default", os.environ.get("POSTGRES_HOST", "localhost")
+    ),
+}
+
+# Read replicas: POSTGRES_REPLICA_HOSTS=replica1,replica2 adds the aliases
+# "replica_1", "replica_2", ... For local testing point it at the primary
+# host itself (e.g. POSTGRES_REPLICA_HOSTS=localhost). Replicas mirror the
+# test database, so TestCase data (kept in an open transaction) is only
+# visible through "default": run the test suite without replicas.
+DATABASE_REPLICAS = []
+for number, replica_host in enumerate(
+    filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1
+):
+    DATABASES[f"replica_{number}"] = {
+        **postgres_database(f"replica_{number}", replica_host.strip()),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["railway_service.db_routers.PrimaryReplicaRouter"]
+
+# How long a client keeps reading from the primary after a successful write.
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get("DATABASE_REPLICA_PIN_SECONDS", 5))
+
+# Shared by every worker and management command: replica pins and the fare
+# version must be seen by all processes, which a per-process LocMemCache is
+# not. Create the table with manage.py createcachetable.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "railway_cache",
+    },
+    # Throttle counters are written on every request, which would cost several
+    # queries each in the database cache: they stay per process.
+    "local": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
 }
 
 
@@ -146,6 +214,55 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 INTERNAL_IPS = ["127.0.0.1", "localhost"]
 
+# N+1 query detection: a query fingerprint repeated more than NPLUSONE_THRESHOLD
+# times in one request is logged with its stack trace (raised in the test suite,
+# see railway_service.test_runner).
+NPLUSONE_DETECTION = DEBUG
+NPLUSONE_THRESHOLD = 5
+NPLUSONE_RAISE = False
+
+TEST_RUNNER = "railway_service.test_runner.RailwayTestRunner"
+
+# How long order creation responses are replayed for a repeated Idempotency-Key.
+IDEMPOTENCY_KEY_TTL_SECONDS = int(
+    os.environ.get("IDEMPOTENCY_KEY_TTL_SECONDS", 24 * 60 * 60)
+)
+
+# Background jobs (manage.py run_workers): a running job is retried after
+# JOB_TIMEOUT_SECONDS, failed attempts back off exponentially up to the maximum.
+JOB_TIMEOUT_SECONDS = int(os.environ.get("JOB_TIMEOUT_SECONDS", 300))
+JOB_MAX_BACKOFF_SECONDS = int(os.environ.get("JOB_MAX_BACKOFF_SECONDS", 3600))
+
+# Admin changelists and paginated API lists report the planner's row estimate
+# instead of an exact COUNT(*) from this many rows on.
+APPROXIMATE_COUNT_THRESHOLD = int(os.environ.get("APPROXIMATE_COUNT_THRESHOLD", 10000))
+
+# Concurrent identical GETs of @single_flight actions share one computation;
+# while one is running, others may get the previous result this long.
+SINGLE_FLIGHT_STALE_SECONDS = int(os.environ.get("SINGLE_FLIGHT_STALE_SECONDS", 2))
+
+# Journeys that arrived this many days ago are moved to the archive tables
+# by manage.py archive_journeys.
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 30))
+
+# Key of the HMAC-signed ticket tokens, shared with the gate scanners that
+# verify them offline; derived from SECRET_KEY unless set.
+TICKET_TOKEN_KEY = (
+    os.environ.get("TICKET_TOKEN_KEY")
+    or hashlib.sha256(f"railway_station.tickets:{SECRET_KEY}".encode()).hexdigest()
+)
+# A ticket token is valid from this long before departure until this long
+# after arrival.
+TICKET_TOKEN_MARGIN_MINUTES = int(os.environ.get("TICKET_TOKEN_MARGIN_MINUTES", 180))
+
+EMAIL_BACKEND = os.environ.get(
+    "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
+)
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "tickets@railway.local")
+
+# Clients allowed to scrape the Prometheus /metrics endpoint.
+METRICS_ALLOWED_IPS = os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1").split(",")
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "railway_station.permissions.IsAdminAllORIsAuthenticatedReadOnly",
@@ -154,9 +271,29 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_FILTER_BACKENDS": [
+        "railway_station.filters.QueryParamFilter",
+        "railway_station.filters.SparseFieldsetFilter",
+    ],
+    "DEFAULT_PAGINATION_CLASS": "railway_station.pagination.ApproximateCountPagination",
+    # Binary formats are picked through the Accept / Content-Type headers
+    # (application/msgpack, application/cbor) or ?format=msgpack|cbor.
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "railway_station.renderers.MessagePackRenderer",
+        "railway_station.renderers.CBORRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+        "railway_station.parsers.MessagePackParser",
+        "railway_station.parsers.CBORParser",
+    ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "railway_service.throttling.AnonLocalRateThrottle",
+        "railway_service.throttling.UserLocalRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {"anon": "100/day", "user": "1000/day"},
 }
@@ -164,6 +301,11 @@ REST_FRAMEWORK = {
 MEDIA_ROOT = "/files/media"
 MEDIA_URL = "/media/"
 
+# Written by `manage.py spectacular --file <path>` at deploy time, so workers
+# serve /api/schema/ without introspecting the API. Generated once per
+# process on the first request when unset or missing.
+OPENAPI_SCHEMA_FILE = os.environ.get("OPENAPI_SCHEMA_FILE")
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "API service for railway station",
     "DESCRIPTION": "Your project description",
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class RailwayTestRunner(DiscoverRunner):
+    """Test runner turning N+1 query warnings into errors."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.NPLUSONE_DETECTION = True
+        settings.NPLUSONE_RAISE = True
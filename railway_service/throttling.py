@@ -0,0 +1,10 @@
+from django.core.cache import caches
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+
+class AnonLocalRateThrottle(AnonRateThrottle):
+    cache = caches["local"]
+
+
+class UserLocalRateThrottle(UserRateThrottle):
+    cache = caches["local"]
@@ -1,11 +1,83 @@
 from django.contrib import admin
 
-from .models import Crew, Order, Route, Station, Ticket, Train, TrainType
+from .models import (
+    ArchivedJourney,
+    ArchivedTicket,
+    Crew,
+    FareBand,
+    Journey,
+    Order,
+    Route,
+    RouteFare,
+    Station,
+    Ticket,
+    TicketScan,
+    Train,
+    TrainType,
+)
+from .pagination import ApproximateCountPaginator
 
 admin.site.register(Train)
 admin.site.register(TrainType)
 admin.site.register(Station)
 admin.site.register(Route)
 admin.site.register(Crew)
-admin.site.register(Ticket)
-admin.site.register(Order)
+admin.site.register(FareBand)
+admin.site.register(RouteFare)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist without exact COUNT(*) queries (see ApproximateCountPaginator)."""
+
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Journey)
+class JourneyAdmin(LargeTableAdmin):
+    list_display = ("id", "route", "train", "departure_time", "arrival_time")
+    list_select_related = ("route__source", "route__destination", "train")
+    raw_id_fields = ("route", "train")
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+
+
+@admin.register(Ticket)
+class TicketAdmin(LargeTableAdmin):
+    list_display = ("id", "journey", "order", "cargo", "seat", "price")
+    list_select_related = (
+        "journey__route__source",
+        "journey__route__destination",
+        "journey__train",
+        "order",
+    )
+    raw_id_fields = ("journey", "order")
+
+
+@admin.register(ArchivedJourney)
+class ArchivedJourneyAdmin(LargeTableAdmin):
+    list_display = ("id", "route", "train", "departure_time", "archived_at")
+    list_select_related = ("route__source", "route__destination", "train")
+    raw_id_fields = ("route", "train", "crew")
+
+
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(LargeTableAdmin):
+    list_display = ("id", "journey", "order", "cargo", "seat", "price")
+    list_select_related = (
+        "journey__route__source",
+        "journey__route__destination",
+        "order",
+    )
+    raw_id_fields = ("journey", "order")
+
+
+@admin.register(TicketScan)
+class TicketScanAdmin(LargeTableAdmin):
+    list_display = ("ticket_id", "gate", "scanned_at", "received_at")
+    raw_id_fields = ("ticket",)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RailwayStationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "railway_station"
+
+    def ready(self):
+        from railway_station import availability, fares, lookups, tasks  # noqa: F401
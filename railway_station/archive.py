@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from django.db import connection, transaction
+
+from railway_station.models import (
+    ArchivedJourney,
+    ArchivedTicket,
+    Crew,
+    Journey,
+    Ticket,
+)
+
+
+def archive_batch(cutoff: datetime, batch_size: int = 1000) -> int:
+    """
+    Move up to `batch_size` journeys that arrived before `cutoff`, with their
+    tickets and crew links, to the archive tables. Each batch is one short
+    transaction locking only its own journeys; returns how many moved.
+    """
+    journey = Journey._meta.db_table
+    ticket = Ticket._meta.db_table
+    crew_links = Crew.journey.through._meta.db_table
+    archived_crew_links = ArchivedJourney.crew.through._meta.db_table
+    with transaction.atomic():
+        ids = list(
+            # departure_time precedes arrival_time: the bound lets the
+            # (departure_time, arrival_time) index find the batch.
+            Journey.objects.filter(departure_time__lt=cutoff, arrival_time__lt=cutoff)
+            .order_by("departure_time")
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {ArchivedJourney._meta.db_table}"
+                " (id, route_id, train_id, departure_time, arrival_time, archived_at)"
+                " SELECT id, route_id, train_id, departure_time, arrival_time, now()"
+                f" FROM {journey} WHERE id = ANY(%s)",
+                [ids],
+            )
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {crew_links} WHERE journey_id = ANY(%s)"
+                " RETURNING crew_id, journey_id)"
+                f" INSERT INTO {archived_crew_links} (crew_id, archivedjourney_id)"
+                " SELECT crew_id, journey_id FROM moved",
+                [ids],
+            )
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {ticket} WHERE journey_id = ANY(%s)"
+                " RETURNING id, cargo, seat, journey_id, order_id, price)"
+                f" INSERT INTO {ArchivedTicket._meta.db_table}"
+                " (id, cargo, seat, journey_id, order_id, price)"
+                " SELECT id, cargo, seat, journey_id, order_id, price FROM moved",
+                [ids],
+            )
+            cursor.execute(f"DELETE FROM {journey} WHERE id = ANY(%s)", [ids])
+    return len(ids)
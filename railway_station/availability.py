@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import psycopg
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from railway_station.coalescing import forget_paths
+from railway_station.models import Ticket
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "journey_availability"
+
+# Events buffered per stream before it is told to resync from a fresh snapshot.
+QUEUE_SIZE = 1000
+
+RESYNC = {"type": "resync"}
+
+# How often an idle listener checks whether any stream is still open.
+IDLE_CHECK_SECONDS = 1
+
+
+def _put(queue: asyncio.Queue, event: dict) -> None:
+    if queue.full():
+        # A slow client: drop its backlog, it reloads the seat map instead.
+        while not queue.empty():
+            queue.get_nowait()
+        event = RESYNC
+    queue.put_nowait(event)
+
+
+class AvailabilityHub:
+    """
+    In-process pub/sub of seat changes per journey. One LISTEN connection per
+    process feeds every stream, so a sale costs one notification however many
+    clients watch the journey.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)  # journey id -> {(loop, queue)}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listening = threading.Event()
+
+    def subscribe(self, journey_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[journey_id].add((asyncio.get_running_loop(), queue))
+        self._start_listener()
+        return queue
+
+    def unsubscribe(self, journey_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(journey_id, set())
+            subscribers.discard((asyncio.get_running_loop(), queue))
+            if not subscribers:
+                self._subscribers.pop(journey_id, None)
+
+    def publish(self, event: dict) -> None:
+        """Hand `event` to the streams of its journey; safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event["journey"], ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put, queue, event)
+
+    def resync_all(self) -> None:
+        with self._lock:
+            subscribers = [
+                subscriber
+                for journey in self._subscribers.values()
+                for subscriber in journey
+            ]
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put, queue, RESYNC)
+
+    async def wait_listening(self, timeout: float = 5) -> None:
+        """Wait until the listener receives notifications."""
+        if connection.vendor == "postgresql":
+            await asyncio.to_thread(self._listening.wait, timeout)
+
+    def _start_listener(self) -> None:
+        if connection.vendor != "postgresql":
+            # Without LISTEN/NOTIFY, tickets publish to the hub directly.
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name="availability-listener", daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self) -> None:
+        params = connection.get_connection_params()
+        params.pop("cursor_factory", None)
+        while True:
+            try:
+                with psycopg.connect(**params, autocommit=True) as listener:
+                    listener.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    if self._listening.is_set():
+                        # Reconnected: changes in between were missed.
+                        self.resync_all()
+                    self._listening.set()
+                    while True:
+                        for notify in listener.notifies(timeout=IDLE_CHECK_SECONDS):
+                            self.publish(json.loads(notify.payload))
+                        with self._lock:
+                            if not self._subscribers:
+                                # The last stream closed: release the connection.
+                                self._listener = None
+                                self._listening.clear()
+                                return
+            except psycopg.Error:
+                logger.exception("Availability listener lost its connection")
+                time.sleep(1)
+
+    def wait_stopped(self, timeout: float = None) -> None:
+        """Wait for the listener to exit once no stream is open."""
+        listener = self._listener
+        if listener is not None:
+            listener.join(timeout)
+
+
+hub = AvailabilityHub()
+
+
+def _notify(event: dict) -> None:
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, json.dumps(event)]
+            )
+    else:
+        hub.publish(event)
+
+
+def journeys_delayed(events: list[dict]) -> None:
+    """Hand new estimated times to the streams of their journeys, one query for all."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, event) FROM unnest(%s::text[]) AS event",
+                [NOTIFY_CHANNEL, [json.dumps(event) for event in events]],
+            )
+    else:
+        for event in events:
+            hub.publish(event)
+
+
+def seat_changed(ticket: Ticket, change: str) -> None:
+    """
+    Announce a sold or released seat once the transaction commits, and stop
+    serving coalesced details of its journey with the old seat counts in this
+    process (see forget_paths).
+    """
+    event = {
+        "journey": ticket.journey_id,
+        "type": change,
+        "cargo": ticket.cargo,
+        "seat": ticket.seat,
+    }
+    path = reverse("railway_station:journey-detail", args=[ticket.journey_id])
+
+    def committed():
+        forget_paths({path})
+        _notify(event)
+
+    transaction.on_commit(committed)
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_sold(sender, instance, created, **kwargs):
+    if created:
+        seat_changed(instance, "sold")
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_released(sender, instance, **kwargs):
+    seat_changed(instance, "released")
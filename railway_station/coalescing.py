@@ -0,0 +1,160 @@
+import functools
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+# Followers give up waiting for a stuck leader and compute themselves.
+WAIT_TIMEOUT_SECONDS = 10
+
+# Completed results kept for stale reads, pruned beyond this many keys.
+MAX_RESULTS = 1024
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """
+    Share one computation between concurrent callers of the same key.
+
+    The first caller (the leader) computes; callers arriving meanwhile wait
+    for its result, or get the previous result right away while it is at most
+    `stale_seconds` old (stale-while-revalidate). Callers that find nothing
+    in flight always compute, so sequential requests never see stale data.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in flight
+        self._results = {}  # key -> (stale until, result)
+
+    def run(self, key, compute, stale_seconds: float = 0):
+        """
+        `compute` returns (result, shared): only shared results are handed to
+        waiting callers and kept for stale reads.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                leader = False
+                stale_until, result = self._results.get(key, (0, None))
+                if time.monotonic() < stale_until:
+                    return result
+
+        if not leader:
+            if call.done.wait(WAIT_TIMEOUT_SECONDS) and call.result is not None:
+                return call.result
+            return compute()[0]
+
+        try:
+            result, shared = compute()
+            if shared:
+                call.result = result
+            if shared and stale_seconds > 0:
+                with self._lock:
+                    self._store(key, result, time.monotonic() + stale_seconds)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _store(self, key, result, stale_until: float) -> None:
+        self._results.pop(key, None)
+        self._results[key] = (stale_until, result)
+        if len(self._results) > MAX_RESULTS:
+            now = time.monotonic()
+            for old_key, (old_until, _) in list(self._results.items()):
+                if old_until <= now or len(self._results) > MAX_RESULTS:
+                    del self._results[old_key]
+
+    def forget(self, match) -> None:
+        """Drop the stored results of the keys for which `match(key)` is true."""
+        with self._lock:
+            for key in [key for key in self._results if match(key)]:
+                del self._results[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+
+flights = SingleFlight()
+
+
+def flight_key(request, per_user: bool = False) -> tuple:
+    """
+    Host, path, query parameters in a canonical order, the negotiated format
+    (binary renderers get native datetimes) and the auth scope: the user for
+    `per_user` views, otherwise the role, as permissions are checked per
+    request before the shared computation.
+    """
+    user = request.user
+    if per_user and user.is_authenticated:
+        scope = f"user:{user.pk}"
+    elif user.is_staff:
+        scope = "staff"
+    else:
+        scope = "user" if user.is_authenticated else "anonymous"
+    query = tuple(sorted((name, tuple(values)) for name, values in request.GET.lists()))
+    return (
+        request.get_host(),
+        request.path,
+        query,
+        request.accepted_renderer.format,
+        scope,
+    )
+
+
+def forget_paths(paths: set[str]) -> None:
+    """
+    Stop serving stale results of these paths, whatever the query or scope.
+    Results live in each process: other workers may still hand a waiting
+    caller the previous result for up to SINGLE_FLIGHT_STALE_SECONDS, and only
+    while a newer run of the same request is in flight.
+    """
+    flights.forget(lambda key: key[1] in paths)
+
+
+def single_flight(per_user: bool = False):
+    """
+    Coalesce concurrent identical GETs of a view action (see SingleFlight):
+    they share one run of queries and serialization, each request renders the
+    shared data itself. Only 200 responses are shared, and served for up to
+    SINGLE_FLIGHT_STALE_SECONDS while a newer run is in flight.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            def compute():
+                response = method(view, request, *args, **kwargs)
+                if (
+                    not isinstance(response, Response)
+                    or response.status_code != status.HTTP_200_OK
+                ):
+                    return response, False
+                return (response.data, dict(response.items())), True
+
+            result = flights.run(
+                flight_key(request, per_user),
+                compute,
+                settings.SINGLE_FLIGHT_STALE_SECONDS,
+            )
+            if isinstance(result, Response):
+                return result
+            data, headers = result
+            return Response(data, headers=headers)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,472 @@
+import random
+from bisect import bisect_right
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+
+from railway_station.fares import CENT, invalidate_fares
+from railway_station.geo import distance_matrix, haversine_km
+from railway_station.models import (
+    Crew,
+    FareBand,
+    Journey,
+    Order,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+)
+
+FIRST_DEPARTURE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+SCHEDULE_DAYS = 730
+
+# (name, latitude, longitude) of the hubs stations are scattered around.
+CITIES = (
+    ("Kyiv", 50.4501, 30.5234),
+    ("Lviv", 49.8397, 24.0297),
+    ("Odesa", 46.4825, 30.7233),
+    ("Kharkiv", 49.9935, 36.2304),
+    ("Dnipro", 48.4647, 35.0462),
+    ("Zaporizhzhia", 47.8388, 35.1396),
+    ("Vinnytsia", 49.2331, 28.4682),
+    ("Poltava", 49.5883, 34.5514),
+    ("Chernihiv", 51.4982, 31.2893),
+    ("Cherkasy", 49.4444, 32.0598),
+    ("Zhytomyr", 50.2547, 28.6587),
+    ("Sumy", 50.9077, 34.7981),
+    ("Rivne", 50.6199, 26.2516),
+    ("Lutsk", 50.7472, 25.3254),
+    ("Ternopil", 49.5535, 25.5948),
+    ("Ivano-Frankivsk", 48.9226, 24.7111),
+    ("Uzhhorod", 48.6208, 22.2879),
+    ("Chernivtsi", 48.2921, 25.9358),
+    ("Khmelnytskyi", 49.4230, 26.9871),
+    ("Kropyvnytskyi", 48.5079, 32.2623),
+    ("Mykolaiv", 46.9750, 31.9946),
+    ("Kherson", 46.6354, 32.6169),
+    ("Kryvyi Rih", 47.9105, 33.3918),
+    ("Kremenchuk", 49.0659, 33.4104),
+)
+
+# name -> (cargo_num range, place_in_cargo range, average speed in km/h, fare multiplier)
+TRAIN_TYPES = {
+    "Intercity": ((6, 9), (50, 70), 120, Decimal("1.50")),
+    "Regional": ((3, 6), (60, 80), 70, Decimal("1.00")),
+    "Night": ((10, 16), (30, 40), 80, Decimal("1.30")),
+}
+
+# (min_distance in km, base fare)
+FARE_BANDS = (
+    (0, Decimal("45.00")),
+    (50, Decimal("110.00")),
+    (150, Decimal("240.00")),
+    (300, Decimal("390.00")),
+    (600, Decimal("620.00")),
+)
+
+FIRST_NAMES = (
+    "Andrii",
+    "Olena",
+    "Taras",
+    "Iryna",
+    "Oleh",
+    "Nataliia",
+    "Petro",
+    "Yulia",
+)
+LAST_NAMES = (
+    "Shevchenko",
+    "Kovalenko",
+    "Bondarenko",
+    "Tkachenko",
+    "Kravchenko",
+    "Melnyk",
+)
+
+
+@dataclass(frozen=True)
+class DataVolumes:
+    stations: int
+    routes: int
+    journeys: int
+    tickets: int
+    trains: int = 200
+    users: int = 1000
+    crews: int = 500
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+VOLUME_PRESETS = {
+    "tiny": DataVolumes(
+        stations=10, routes=20, journeys=50, tickets=200, trains=5, users=5, crews=10
+    ),
+    "small": DataVolumes(
+        stations=100, routes=1_000, journeys=10_000, tickets=50_000, trains=50
+    ),
+    "medium": DataVolumes(
+        stations=1_000, routes=20_000, journeys=100_000, tickets=1_000_000
+    ),
+    "large": DataVolumes(
+        stations=1_000, routes=20_000, journeys=500_000, tickets=5_000_000
+    ),
+}
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class RowWriter:
+    """
+    Write plain row tuples into a model's table.
+
+    PostgreSQL gets a single streaming COPY; other databases (or use_copy=False)
+    get bulk_create in batches. Either way memory stays bounded by the batch.
+    Note that bulk_create applies auto_now_add, so Order.created_at is "now"
+    without COPY.
+    """
+
+    def __init__(self, use_copy: bool, batch_size: int):
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.batch_size = batch_size
+
+    def reserve_ids(self, model, count: int) -> list[int]:
+        """Take `count` primary keys from the table's sequence."""
+        if not count:
+            return []
+        table = model._meta.db_table
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                    "FROM generate_series(1, %s)",
+                    [table, count],
+                )
+                return [row[0] for row in cursor.fetchall()]
+        last_id = model.objects.order_by("-id").values_list("id", flat=True).first()
+        start = (last_id or 0) + 1
+        return list(range(start, start + count))
+
+    def write(self, model, fields: tuple[str, ...], rows: Iterable[tuple]) -> int:
+        count = 0
+        if self.use_copy:
+            columns = ", ".join(
+                connection.ops.quote_name(model._meta.get_field(name).column)
+                for name in fields
+            )
+            table = connection.ops.quote_name(model._meta.db_table)
+            with connection.cursor() as cursor:
+                with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                        count += 1
+            return count
+
+        attnames = [model._meta.get_field(name).attname for name in fields]
+        for batch in _batches(rows, self.batch_size):
+            model.objects.bulk_create(
+                [model(**dict(zip(attnames, row))) for row in batch],
+                batch_size=self.batch_size,
+            )
+            count += len(batch)
+        return count
+
+
+def _stations(rng: random.Random, count: int) -> list[tuple]:
+    """(name, latitude, longitude) scattered around the hubs."""
+    stations = []
+    for number in range(count):
+        city, latitude, longitude = CITIES[number % len(CITIES)]
+        if number < len(CITIES):
+            stations.append((f"{city}-Pasazhyrskyi", latitude, longitude))
+            continue
+        stations.append(
+            (
+                f"{city} {number // len(CITIES)}",
+                round(latitude + rng.gauss(0, 0.35), 6),
+                round(longitude + rng.gauss(0, 0.5), 6),
+            )
+        )
+    return stations
+
+
+def _route_pairs(rng: random.Random, coordinates: list[tuple], count: int) -> list:
+    """
+    Pick station index pairs forming a connected graph: a spanning tree joining
+    every station to a near earlier one (both directions), then extra short
+    links until `count` routes exist.
+    """
+
+    def nearest(index: int, candidates: list[int]) -> int:
+        distances = distance_matrix(
+            coordinates[index], [coordinates[other] for other in candidates]
+        )
+        return candidates[int(np.argmin(distances))]
+
+    pairs = []
+    seen = set()
+
+    def add(source: int, destination: int) -> None:
+        if source != destination and (source, destination) not in seen:
+            seen.add((source, destination))
+            pairs.append((source, destination))
+
+    for index in range(1, len(coordinates)):
+        candidates = rng.sample(range(index), min(index, 8))
+        neighbour = nearest(index, candidates)
+        add(index, neighbour)
+        add(neighbour, index)
+
+    max_routes = len(coordinates) * (len(coordinates) - 1)
+    while len(pairs) < min(count, max_routes):
+        source = rng.randrange(len(coordinates))
+        candidates = [
+            other
+            for other in rng.sample(range(len(coordinates)), min(len(coordinates), 8))
+            if other != source and (source, other) not in seen
+        ]
+        if candidates:
+            add(source, nearest(source, candidates))
+    return pairs[:count]
+
+
+def generate_railway_data(
+    volumes: DataVolumes,
+    seed: int = 0,
+    batch_size: int = 10_000,
+    use_copy: bool = True,
+    log: Callable[[str], None] = lambda message: None,
+) -> None:
+    """
+    Fill the database with deterministic (for a given seed) data.
+
+    Rows bypass Ticket.save() / full_clean(), so the generator keeps the same
+    invariants itself: cargo within cargo_num, seat within place_in_cargo and
+    a seat is never sold twice per journey.
+    """
+    rng = random.Random(seed)
+    writer = RowWriter(use_copy=use_copy, batch_size=batch_size)
+
+    if not FareBand.objects.exists():
+        writer.write(
+            FareBand,
+            ("id", "min_distance", "price"),
+            (
+                (band_id, *band)
+                for band_id, band in zip(
+                    writer.reserve_ids(FareBand, len(FARE_BANDS)), FARE_BANDS
+                )
+            ),
+        )
+    train_type_ids = writer.reserve_ids(TrainType, len(TRAIN_TYPES))
+    writer.write(
+        TrainType,
+        ("id", "name", "fare_multiplier"),
+        (
+            (train_type_id, name, profile[3])
+            for train_type_id, (name, profile) in zip(
+                train_type_ids, TRAIN_TYPES.items()
+            )
+        ),
+    )
+    type_profiles = list(zip(train_type_ids, TRAIN_TYPES.values()))
+
+    trains = []  # (id, cargo_num, place_in_cargo, speed, fare multiplier)
+    train_rows = []
+    for train_id in writer.reserve_ids(Train, volumes.trains):
+        train_type_id, (cargos, places, speed, multiplier) = rng.choice(type_profiles)
+        cargo_num, place_in_cargo = rng.randint(*cargos), rng.randint(*places)
+        trains.append((train_id, cargo_num, place_in_cargo, speed, multiplier))
+        train_rows.append(
+            (train_id, f"Train {train_id}", cargo_num, place_in_cargo, train_type_id)
+        )
+    writer.write(
+        Train,
+        ("id", "name", "cargo_num", "place_in_cargo", "train_type"),
+        train_rows,
+    )
+    log(f"{len(trains)} trains")
+
+    stations = _stations(rng, volumes.stations)
+    station_ids = writer.reserve_ids(Station, len(stations))
+    writer.write(
+        Station,
+        ("id", "name", "latitude", "longitude"),
+        ((station_id, *station) for station_id, station in zip(station_ids, stations)),
+    )
+    log(f"{len(station_ids)} stations")
+
+    coordinates = [station[1:] for station in stations]
+    route_rows = []  # (id, source id, destination id, distance)
+    pairs = _route_pairs(rng, coordinates, volumes.routes)
+    # The great-circle distances, which `manage.py route_distances` audits.
+    ends = np.array(
+        [
+            (*coordinates[source], *coordinates[destination])
+            for source, destination in pairs
+        ],
+        dtype=float,
+    ).reshape(-1, 4)
+    distances = np.maximum(1, np.rint(haversine_km(*ends.T))).astype(int).tolist()
+    for route_id, (source, destination), distance in zip(
+        writer.reserve_ids(Route, len(pairs)), pairs, distances
+    ):
+        route_rows.append(
+            (route_id, station_ids[source], station_ids[destination], distance)
+        )
+    writer.write(Route, ("id", "source", "destination", "distance"), route_rows)
+    log(f"{len(route_rows)} routes")
+
+    crew_ids = writer.reserve_ids(Crew, volumes.crews)
+    crew_rows = []
+    for crew_id in crew_ids:
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        crew_rows.append((crew_id, first_name, last_name, f"{first_name} {last_name}"))
+    writer.write(Crew, ("id", "first_name", "last_name", "full_name"), crew_rows)
+    log(f"{len(crew_ids)} crews")
+
+    journey_ids = writer.reserve_ids(Journey, volumes.journeys)
+    journeys = []  # (id, train index, departure_time, ticket price)
+    band_distances = [min_distance for min_distance, _ in FARE_BANDS]
+
+    def journey_rows():
+        for journey_id in journey_ids:
+            route_id, source_id, destination_id, distance = rng.choice(route_rows)
+            train_index = rng.randrange(len(trains))
+            departure_time = FIRST_DEPARTURE + timedelta(
+                minutes=5 * rng.randrange(SCHEDULE_DAYS * 24 * 12)
+            )
+            arrival_time = departure_time + timedelta(
+                minutes=max(15, round(distance / trains[train_index][3] * 60))
+            )
+            base_fare = FARE_BANDS[bisect_right(band_distances, distance) - 1][1]
+            price = (base_fare * trains[train_index][4]).quantize(CENT)
+            journeys.append((journey_id, train_index, departure_time, price))
+            yield (
+                journey_id,
+                route_id,
+                trains[train_index][0],
+                departure_time,
+                arrival_time,
+                source_id,
+                destination_id,
+            )
+
+    writer.write(
+        Journey,
+        (
+            "id",
+            "route",
+            "train",
+            "departure_time",
+            "arrival_time",
+            "source_station",
+            "destination_station",
+        ),
+        journey_rows(),
+    )
+    log(f"{len(journeys)} journeys")
+
+    if crew_ids:
+        crew_links = writer.write(
+            Crew.journey.through,
+            ("crew", "journey"),
+            (
+                (crew_id, journey_id)
+                for journey_id in journey_ids
+                for crew_id in rng.sample(
+                    crew_ids, min(len(crew_ids), rng.randint(2, 4))
+                )
+            ),
+        )
+        log(f"{crew_links} crew assignments")
+
+    password = make_password(None)
+    user_ids = writer.reserve_ids(get_user_model(), volumes.users)
+    writer.write(
+        get_user_model(),
+        (
+            "id",
+            "email",
+            "password",
+            "is_active",
+            "is_staff",
+            "is_superuser",
+            "first_name",
+            "last_name",
+            "date_joined",
+        ),
+        (
+            (
+                user_id,
+                f"passenger{user_id}@example.com",
+                password,
+                True,
+                False,
+                False,
+                "",
+                "",
+                FIRST_DEPARTURE,
+            )
+            for user_id in user_ids
+        ),
+    )
+    log(f"{len(user_ids)} users")
+
+    def ticket_groups():
+        """Yield (journey_id, departure_time, price, [(cargo, seat), ...]) per order."""
+        per_journey, remainder = divmod(volumes.tickets, max(1, len(journeys)))
+        for index, (journey_id, train_index, departure_time, price) in enumerate(
+            journeys
+        ):
+            _, cargo_num, place_in_cargo, _, _ = trains[train_index]
+            count = min(per_journey + (index < remainder), place_in_cargo)
+            seats = rng.sample(range(1, place_in_cargo + 1), count)
+            while seats:
+                size = min(len(seats), rng.choice((1, 1, 1, 2, 2, 3, 4)))
+                group, seats = seats[:size], seats[size:]
+                cargo = rng.randint(1, cargo_num)
+                yield journey_id, departure_time, price, [
+                    (cargo, seat) for seat in group
+                ]
+
+    ticket_count = 0
+    order_count = 0
+    for batch in _batches(ticket_groups(), batch_size):
+        order_ids = writer.reserve_ids(Order, len(batch))
+        order_rows = []
+        ticket_rows = []
+        for order_id, (journey_id, departure_time, price, seats) in zip(
+            order_ids, batch
+        ):
+            created_at = departure_time - timedelta(
+                minutes=rng.randint(10, 60 * 24 * 45)
+            )
+            order_rows.append((order_id, created_at, rng.choice(user_ids)))
+            ticket_rows.extend(
+                (cargo, seat, journey_id, order_id, price) for cargo, seat in seats
+            )
+        order_count += writer.write(Order, ("id", "created_at", "user"), order_rows)
+        ticket_count += writer.write(
+            Ticket, ("cargo", "seat", "journey", "order", "price"), ticket_rows
+        )
+    log(f"{order_count} orders")
+    log(f"{ticket_count} tickets")
+    # Rows were copied in bulk, bypassing the signals that invalidate fares.
+    invalidate_fares()
@@ -0,0 +1,242 @@
+import io
+from typing import Iterator, NamedTuple
+
+import psycopg
+import pyarrow as pa
+import pyarrow.csv as csv
+import pyarrow.parquet as pq
+from django.db import connections
+
+from railway_station.models import ArchivedJourney, ArchivedTicket, Journey, Ticket
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+PRICE = pa.decimal128(10, 2)
+
+FORMATS = {
+    # format -> (media type, file extension)
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+# Rows per row group (Parquet) or record batch (Arrow): fetched, converted and
+# written one at a time, so memory is bounded by this many rows.
+ROW_GROUP_SIZE = 100_000
+
+
+class Column(NamedTuple):
+    name: str
+    lookup: str
+    type: pa.DataType
+    nullable: bool = False
+
+
+class Dataset(NamedTuple):
+    columns: tuple[Column, ...]
+    # (manager, value of the `archived` column): archived tickets reach the
+    # route and train through ArchivedJourney with the same lookups.
+    sources: tuple
+
+
+JOURNEY_COLUMNS = (
+    Column("route_id", "route_id", pa.int64()),
+    Column("source_station_id", "route__source_id", pa.int64()),
+    Column("destination_station_id", "route__destination_id", pa.int64()),
+    Column("distance", "route__distance", pa.int32()),
+    Column("train_id", "train_id", pa.int64()),
+    Column("train_name", "train__name", pa.string()),
+    Column("train_type_id", "train__train_type_id", pa.int64()),
+    Column("departure_time", "departure_time", TIMESTAMP),
+    Column("arrival_time", "arrival_time", TIMESTAMP),
+)
+
+DATASETS = {
+    "tickets": Dataset(
+        columns=(
+            Column("ticket_id", "id", pa.int64()),
+            Column("order_id", "order_id", pa.int64()),
+            Column("user_id", "order__user_id", pa.int64()),
+            Column("ordered_at", "order__created_at", TIMESTAMP),
+            Column("cargo", "cargo", pa.int32()),
+            Column("seat", "seat", pa.int32()),
+            Column("price", "price", PRICE, nullable=True),
+            Column("journey_id", "journey_id", pa.int64()),
+            *(
+                column._replace(lookup=f"journey__{column.lookup}")
+                for column in JOURNEY_COLUMNS
+            ),
+        ),
+        sources=((Ticket.objects, False), (ArchivedTicket.objects, True)),
+    ),
+    "journeys": Dataset(
+        columns=(Column("journey_id", "id", pa.int64()), *JOURNEY_COLUMNS),
+        sources=((Journey.objects, False), (ArchivedJourney.objects, True)),
+    ),
+}
+
+
+def arrow_schema(dataset: Dataset) -> pa.Schema:
+    return pa.schema(
+        [
+            pa.field(column.name, column.type, column.nullable)
+            for column in dataset.columns
+        ]
+        + [pa.field("archived", pa.bool_(), False)]
+    )
+
+
+class _CopyReader(io.RawIOBase):
+    """Readable stream over the data of a COPY ... TO STDOUT."""
+
+    def __init__(self, copy):
+        super().__init__()
+        self.chunks = iter(copy)
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = len(buffer)
+        if len(self.pending) < size:
+            parts, length = [self.pending], len(self.pending)
+            while length < size:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                parts.append(chunk)
+                length += len(chunk)
+            self.pending = b"".join(parts)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _copy_batches(queryset, schema: pa.Schema) -> Iterator[pa.RecordBatch]:
+    """Rows of `queryset` as CSV from COPY, parsed by Arrow's CSV reader."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        if params:
+            # COPY takes no bind parameters.
+            sql = psycopg.ClientCursor(connection.connection).mogrify(sql, params)
+        with cursor.copy(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)") as copy:
+            stream = io.BufferedReader(_CopyReader(copy), 1 << 20)
+            if not stream.peek(1):
+                return  # Arrow rejects an empty CSV.
+            reader = csv.open_csv(
+                stream,
+                read_options=csv.ReadOptions(column_names=schema.names),
+                convert_options=csv.ConvertOptions(
+                    column_types=schema, strings_can_be_null=False
+                ),
+            )
+            for batch in reader:
+                # The CSV reader makes every column nullable.
+                yield batch.cast(schema)
+
+
+def _fetch_batches(
+    queryset, schema: pa.Schema, row_group_size: int
+) -> Iterator[pa.RecordBatch]:
+    rows = []
+    for row in queryset.iterator(chunk_size=row_group_size):
+        rows.append(row)
+        if len(rows) == row_group_size:
+            yield _to_batch(schema, rows)
+            rows = []
+    if rows:
+        yield _to_batch(schema, rows)
+
+
+def _to_batch(schema: pa.Schema, rows: list[tuple]) -> pa.RecordBatch:
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(values, type=field.type)
+            for values, field in zip(zip(*rows), schema)
+        ],
+        schema=schema,
+    )
+
+
+def row_groups(
+    dataset: Dataset, row_group_size: int = ROW_GROUP_SIZE, use_copy: bool = True
+) -> Iterator[pa.Table]:
+    """
+    The dataset in primary key order, as tables of `row_group_size` rows (the
+    last one shorter). PostgreSQL streams a COPY in CSV through Arrow's C++
+    parser; other databases (or use_copy=False) are read with values_list()
+    through a server-side cursor, converting the rows in Python.
+    """
+    schema = arrow_schema(dataset)
+    columns = pa.schema(list(schema)[:-1])
+    lookups = [column.lookup for column in dataset.columns]
+    for manager, archived in dataset.sources:
+        queryset = manager.order_by("pk").values_list(*lookups)
+        if use_copy and connections[queryset.db].vendor == "postgresql":
+            batches = _copy_batches(queryset, columns)
+        else:
+            batches = _fetch_batches(queryset, columns, row_group_size)
+
+        pending = pa.Table.from_batches([], columns)
+        for batch in batches:
+            pending = pa.concat_tables([pending, pa.Table.from_batches([batch])])
+            while pending.num_rows >= row_group_size:
+                yield _with_archived(pending.slice(0, row_group_size), archived)
+                pending = pending.slice(row_group_size)
+        if pending.num_rows:
+            yield _with_archived(pending, archived)
+
+
+def _with_archived(table: pa.Table, archived: bool) -> pa.Table:
+    return table.append_column(
+        pa.field("archived", pa.bool_(), False),
+        pa.array([archived] * table.num_rows, type=pa.bool_()),
+    )
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink holding what a writer produced until it is drained."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_dataset(
+    name: str, file_format: str, row_group_size: int = ROW_GROUP_SIZE
+) -> Iterator[bytes]:
+    """
+    The dataset `name` as a Parquet (zstd) or Arrow IPC file, yielded in pieces
+    as each row group is written.
+    """
+    dataset = DATASETS[name]
+    schema = arrow_schema(dataset)
+    sink = _Drain()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(
+            sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+        )
+    for table in row_groups(dataset, row_group_size):
+        writer.write_table(table.combine_chunks())
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,84 @@
+import threading
+import uuid
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from railway_station.models import FareBand, Route, RouteFare, TrainType
+
+FARE_VERSION_KEY = "railway_station:fares:version"
+CENT = Decimal("0.01")
+
+
+class FareMatrix:
+    """
+    Price of every (route, train type) pair: the route's override or distance
+    band base fare times the train type multiplier. Routes below the first
+    band and without an override have no price.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        bands = list(FareBand.objects.values_list("min_distance", "price"))
+        band_distances = [min_distance for min_distance, _ in bands]
+        overrides = dict(RouteFare.objects.values_list("route_id", "price"))
+        multipliers = list(TrainType.objects.values_list("id", "fare_multiplier"))
+
+        self.prices = {}
+        for route_id, distance in Route.objects.values_list("id", "distance"):
+            base = overrides.get(route_id)
+            if base is None:
+                band = bisect_right(band_distances, distance) - 1
+                if band < 0:
+                    continue
+                base = bands[band][1]
+            for train_type_id, multiplier in multipliers:
+                self.prices[route_id, train_type_id] = (base * multiplier).quantize(
+                    CENT
+                )
+
+    def price(self, route_id: int, train_type_id: int) -> Decimal | None:
+        return self.prices.get((route_id, train_type_id))
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def fare_matrix() -> FareMatrix:
+    """
+    The process-wide FareMatrix, rebuilt when the fare version in the cache
+    changes. The default cache is the shared database cache (see CACHES), so a
+    change in any worker or management command reaches every process.
+    """
+    global _matrix
+    version = cache.get_or_set(FARE_VERSION_KEY, _new_version, timeout=None)
+    matrix = _matrix
+    if matrix is None or matrix.version != version:
+        with _lock:
+            if _matrix is None or _matrix.version != version:
+                _matrix = FareMatrix(version)
+            matrix = _matrix
+    return matrix
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex
+
+
+def invalidate_fares() -> None:
+    cache.set(FARE_VERSION_KEY, _new_version(), timeout=None)
+
+
+def _fare_rules_changed(sender, **kwargs):
+    invalidate_fares()
+    # Again after commit: a matrix built meanwhile saw the uncommitted state.
+    transaction.on_commit(invalidate_fares)
+
+
+for _model in (FareBand, RouteFare, Route, TrainType):
+    post_save.connect(_fare_rules_changed, sender=_model)
+    post_delete.connect(_fare_rules_changed, sender=_model)
@@ -0,0 +1,374 @@
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.permissions import SAFE_METHODS
+
+
+def query_param_list(request, name: str) -> list[str] | None:
+    """Comma-separated query parameter as a list, None when it is absent."""
+    value = getattr(request, "query_params", {}).get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class QuerysetPlan:
+    """
+    Columns (only), joins (select_related) and prefetches a serializer needs.
+
+    When some field cannot be traced to model fields (a SerializerMethodField
+    without `method_field_sources`, source="*"), `complete` is False and
+    only() is not applied, so nothing ends up deferred and lazily loaded.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.only = {model._meta.pk.name}
+        self.select = set()
+        self.prefetch = (
+            {}
+        )  # path -> nested QuerysetPlan, None to prefetch whole objects
+        self.complete = True
+
+    def add(self, parts: list[str]) -> "QuerysetPlan | None":
+        """
+        Register the lookup `parts`. Returns the nested plan when the path ends
+        on a to-many relation.
+        """
+        model, prefix = self.model, []
+        for index, part in enumerate(parts):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                # A property (e.g. Station.coordinates): load the whole object.
+                self.only.update(
+                    "__".join(prefix + [concrete.name])
+                    for concrete in model._meta.concrete_fields
+                )
+                return None
+
+            path = "__".join(prefix + [part])
+            if field.many_to_many or field.one_to_many:
+                if index < len(parts) - 1:
+                    # e.g. "crew.count": prefetch the objects, count in Python.
+                    self.prefetch.setdefault(path, None)
+                    return None
+                nested = self.prefetch.get(path)
+                if nested is None:
+                    nested = self.prefetch[path] = QuerysetPlan(field.related_model)
+                    if field.one_to_many:
+                        # Prefetching matches children by their foreign key.
+                        nested.only.add(field.field.name)
+                return nested
+
+            self.only.add(path)
+            if not field.is_relation or index == len(parts) - 1:
+                return None
+            self.select.add(path)
+            prefix.append(part)
+            model = field.related_model
+        return None
+
+    def add_serializer(self, serializer, prefix: list[str] = ()) -> None:
+        method_field_sources = getattr(serializer, "method_field_sources", {})
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in method_field_sources:
+                    self.complete = False
+                for source in method_field_sources.get(name, ()):
+                    self.add([*prefix, *source.split(".")])
+                continue
+            if field.source == "*":
+                self.complete = False
+                continue
+
+            parts = [*prefix, *field.source.split(".")]
+            if isinstance(field, serializers.ListSerializer):
+                for source in [field.source, *method_field_sources.get(name, ())]:
+                    nested = self.add([*prefix, *source.split(".")])
+                    if nested is not None:
+                        nested.add_serializer(field.child)
+            elif isinstance(field, serializers.BaseSerializer):
+                self.add(parts)
+                self.add_serializer(field, parts)
+            elif isinstance(field, serializers.ManyRelatedField):
+                nested = self.add(parts)
+                if nested is not None:
+                    nested.add(
+                        [
+                            getattr(
+                                field.child_relation,
+                                "slug_field",
+                                nested.model._meta.pk.name,
+                            )
+                        ]
+                    )
+            elif isinstance(field, serializers.SlugRelatedField):
+                self.add([*parts, field.slug_field])
+            else:
+                self.add(parts)
+
+    def apply(self, queryset):
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        for path, nested in sorted(self.prefetch.items()):
+            if nested is None:
+                queryset = queryset.prefetch_related(path)
+            else:
+                queryset = queryset.prefetch_related(
+                    Prefetch(
+                        path, queryset=nested.apply(nested.model._default_manager.all())
+                    )
+                )
+        if self.complete:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+class SparseFieldsetFilter(BaseFilterBackend):
+    """
+    Push ?fields= and ?expand= down into the queryset: the serializer's selected
+    fields decide only(), select_related and prefetch_related, so unrequested
+    relations are neither joined nor fetched.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if request.method not in SAFE_METHODS or not (
+            "fields" in request.query_params or "expand" in request.query_params
+        ):
+            return queryset
+        plan = QuerysetPlan(queryset.model)
+        plan.add_serializer(view.get_serializer())
+        return plan.apply(queryset)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": "fields",
+                "required": False,
+                "in": "query",
+                "description": "Comma-separated fields to return (ex. ?fields=id,departure_time)",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": "expand",
+                "required": False,
+                "in": "query",
+                "description": (
+                    "Comma-separated relations to nest, the others are returned "
+                    "as ids (ex. ?expand=route)"
+                ),
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class QueryFilter:
+    """A query parameter filtering `lookup`, declared in a view's `filter_fields`."""
+
+    schema = {"type": "integer"}
+
+    def __init__(self, lookup: str, description: str = ""):
+        self.lookup = lookup
+        self.description = description
+
+    def parse(self, value: str):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError(f"Expected an integer, got {value!r}.")
+
+    def filter(self, queryset, params: dict, name: str):
+        value = params.get(name)
+        if not value:
+            return queryset
+        return queryset.filter(**{self.lookup: self.parse(value)})
+
+    def schema_parameters(self, name: str) -> list[dict]:
+        return [
+            {
+                "name": name,
+                "required": False,
+                "in": "query",
+                "description": self.description,
+                "schema": self.schema,
+            }
+        ]
+
+
+class ListFilter(QueryFilter):
+    """
+    Comma-separated ids (?station=2,3), at most `max_items` of them. Long lists
+    are bound as one `= ANY(array)` parameter instead of an IN list.
+    """
+
+    max_items = 100
+    any_array_from = 10
+    schema = {"type": "array", "items": {"type": "integer"}}
+
+    def __init__(self, lookup: str, description: str = "", max_items: int = None):
+        super().__init__(lookup, description)
+        if max_items is not None:
+            self.max_items = max_items
+
+    def filter(self, queryset, params: dict, name: str):
+        value = params.get(name)
+        if not value:
+            return queryset
+        items = value.split(",")
+        if len(items) > self.max_items:
+            raise ValidationError(f"At most {self.max_items} values are allowed.")
+        ids = sorted({self.parse(item.strip()) for item in items})
+        lookup = "any" if len(ids) >= self.any_array_from else "in"
+        return queryset.filter(**{f"{self.lookup}__{lookup}": ids})
+
+    def schema_parameters(self, name: str) -> list[dict]:
+        parameters = super().schema_parameters(name)
+        parameters[0].update(style="form", explode=False)
+        return parameters
+
+
+class RangeFilter(QueryFilter):
+    """?name=exact, ?name_min= and ?name_max= (inclusive) as index range predicates."""
+
+    def filter(self, queryset, params: dict, name: str):
+        exact, low, high = (
+            params.get(param) for param in (name, f"{name}_min", f"{name}_max")
+        )
+        if exact:
+            queryset = queryset.filter(**{self.lookup: self.parse(exact)})
+        low = self.parse(low) if low else None
+        high = self.parse(high) if high else None
+        if low is not None and high is not None and low > high:
+            raise ValidationError(f"{name}_min must not be greater than {name}_max.")
+        if low is not None:
+            queryset = queryset.filter(**{f"{self.lookup}__gte": low})
+        if high is not None:
+            queryset = queryset.filter(**{f"{self.lookup}__lte": high})
+        return queryset
+
+    def schema_parameters(self, name: str) -> list[dict]:
+        parameters = super().schema_parameters(name)
+        for suffix, bound in (("min", "Minimum"), ("max", "Maximum")):
+            parameters += super().schema_parameters(f"{name}_{suffix}")
+            parameters[-1]["description"] = f"{bound} {name}, inclusive"
+        return parameters
+
+
+class DateFilter(QueryFilter):
+    """
+    ?name=YYYY-MM-DD as a half-open [day, next day) range on a datetime
+    column, which unlike a __date cast can use an index.
+    """
+
+    schema = {"type": "string", "format": "date"}
+
+    def parse(self, value: str):
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError(f"Expected a YYYY-MM-DD date, got {value!r}.")
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def filter(self, queryset, params: dict, name: str):
+        value = params.get(name)
+        if not value:
+            return queryset
+        start = self.parse(value)
+        return queryset.filter(
+            **{
+                f"{self.lookup}__gte": start,
+                f"{self.lookup}__lt": start + timedelta(days=1),
+            }
+        )
+
+
+class DateRangeFilter(DateFilter):
+    """
+    ?name_from= and ?name_to= (YYYY-MM-DD, both days included) as one
+    half-open [from, day after to) range on a datetime column.
+    """
+
+    def filter(self, queryset, params: dict, name: str):
+        low, high = params.get(f"{name}_from"), params.get(f"{name}_to")
+        low = self.parse(low) if low else None
+        high = self.parse(high) + timedelta(days=1) if high else None
+        if low is not None and high is not None and low >= high:
+            raise ValidationError(f"{name}_from must not be after {name}_to.")
+        if low is not None:
+            queryset = queryset.filter(**{f"{self.lookup}__gte": low})
+        if high is not None:
+            queryset = queryset.filter(**{f"{self.lookup}__lt": high})
+        return queryset
+
+    def schema_parameters(self, name: str) -> list[dict]:
+        parameters = []
+        for suffix, bound in (("from", "First"), ("to", "Last")):
+            parameters += super().schema_parameters(f"{name}_{suffix}")
+            parameters[-1]["description"] = f"{bound} {self.description}, inclusive"
+        return parameters
+
+
+class RelatedDateFilter(DateFilter):
+    """
+    DateFilter through to-many relations, matching when any of `lookups` falls
+    on the day. Each is tested in an IN (subquery) semi-join, so an object
+    with several matching rows is returned once without DISTINCT.
+    """
+
+    def __init__(self, lookups: list[str], description: str = ""):
+        super().__init__(lookups[0], description)
+        self.lookups = lookups
+
+    def filter(self, queryset, params: dict, name: str):
+        value = params.get(name)
+        if not value:
+            return queryset
+        start = self.parse(value)
+        matches = Q()
+        for lookup in self.lookups:
+            matches |= Q(
+                pk__in=queryset.model._default_manager.filter(
+                    **{
+                        f"{lookup}__gte": start,
+                        f"{lookup}__lt": start + timedelta(days=1),
+                    }
+                ).values("pk")
+            )
+        return queryset.filter(matches)
+
+
+class QueryParamFilter(BaseFilterBackend):
+    """
+    Apply the view's declarative `filter_fields` (query parameter -> QueryFilter),
+    answering invalid values with 400 instead of a 500 from int().
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        errors = {}
+        for name, query_filter in getattr(view, "filter_fields", {}).items():
+            try:
+                queryset = query_filter.filter(queryset, request.query_params, name)
+            except ValidationError as error:
+                errors[name] = error.detail
+        if errors:
+            raise ValidationError(errors)
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            parameter
+            for name, query_filter in getattr(view, "filter_fields", {}).items()
+            for parameter in query_filter.schema_parameters(name)
+        ]
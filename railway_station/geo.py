@@ -0,0 +1,52 @@
+import numpy as np
+
+from railway_station.models import Route
+
+# Mean Earth radius (IUGG).
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distances in km between points given in degrees. The
+    arguments broadcast like any NumPy operands, so whole columns (or a row
+    against a column) are computed in one pass.
+    """
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def distance_matrix(sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Distances in km from each (latitude, longitude) row of `sources` to each of `targets`."""
+    sources = np.asarray(sources, dtype=float).reshape(-1, 2)
+    targets = np.asarray(targets, dtype=float).reshape(-1, 2)
+    return haversine_km(
+        sources[:, 0, None], sources[:, 1, None], targets[:, 0], targets[:, 1]
+    )
+
+
+def route_distances(routes=None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ids, stored distances, great-circle distances in km) of `routes`."""
+    if routes is None:
+        routes = Route.objects.all()
+    rows = np.array(
+        list(
+            routes.order_by("id").values_list(
+                "id",
+                "distance",
+                "source__latitude",
+                "source__longitude",
+                "destination__latitude",
+                "destination__longitude",
+            )
+        ),
+        dtype=float,
+    ).reshape(-1, 6)
+    computed = haversine_km(rows[:, 2], rows[:, 3], rows[:, 4], rows[:, 5])
+    return rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64), computed
@@ -0,0 +1,530 @@
+"""
+GTFS (General Transit Feed Specification) import and export.
+
+Stops become stations (platforms are folded into their parent station), GTFS
+routes (lines) become trains and every trip running on a service date becomes
+one journey from its first to its last stop; intermediate stops are not
+modelled. Journeys reuse the route between the two stations, or get a new one
+with the great-circle distance. A journey's gtfs_id is its trip_id and service
+day ("<trip_id>@<YYYY-MM-DD>"), which exported feeds use as the trip_id.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef
+from django.db.models.functions import Right
+
+from railway_station.fares import invalidate_fares
+from railway_station.geo import haversine_km
+from railway_station.models import (
+    Journey,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+)
+
+# Route type of exported lines (2: rail).
+RAIL = 2
+
+WEEKDAYS = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+
+
+# The gtfs_id of a journey: its trip_id and service day.
+JOURNEY_GTFS_ID = re.compile(r".+@[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+
+class GTFSError(Exception):
+    pass
+
+
+class Feed:
+    """The text files of a feed directory or .zip archive."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.archive = zipfile.ZipFile(self.path) if self.path.is_file() else None
+
+    def has(self, name: str) -> bool:
+        if self.archive is not None:
+            return name in self.archive.namelist()
+        return (self.path / name).exists()
+
+    @contextmanager
+    def open(self, name: str):
+        if not self.has(name):
+            raise GTFSError(f"The feed has no {name}.")
+        if self.archive is not None:
+            with self.archive.open(name) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        else:
+            with open(self.path / name, encoding="utf-8-sig", newline="") as file:
+                yield file
+
+    def rows(self, name: str) -> Iterator[dict]:
+        with self.open(name) as file:
+            for row in csv.DictReader(file):
+                yield {key.strip(): (value or "").strip() for key, value in row.items()}
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def parse_time(value: str) -> timedelta:
+    """A GTFS time (H:MM:SS, may exceed 24:00:00) as an offset into the service day."""
+    hours, minutes, seconds = (int(part) for part in value.split(":"))
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+def format_time(offset: timedelta) -> str:
+    seconds = int(offset.total_seconds())
+    return f"{seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}"
+
+
+def service_day_start(day: date, zone: ZoneInfo) -> datetime:
+    # GTFS times count from "noon minus 12h", which differs from midnight on DST days.
+    return datetime.combine(day, time(12), zone) - timedelta(hours=12)
+
+
+class Counts(dict):
+    def add(self, model, created: int = 0, updated: int = 0, deleted: int = 0) -> None:
+        name = model._meta.verbose_name_plural
+        total = self.setdefault(name, [0, 0, 0])
+        total[0] += created
+        total[1] += updated
+        total[2] += deleted
+
+
+def _upsert(
+    model,
+    items: Iterable[tuple[str, dict]],
+    batch_size: int,
+    counts: Counts,
+    defaults: dict = None,
+) -> None:
+    """
+    Create (with `defaults`) or update `model` rows keyed on gtfs_id from
+    (gtfs_id, fields) pairs, a batch at a time; unchanged rows are not written.
+    """
+    for chunk in _chunks(items, batch_size):
+        existing = model.objects.in_bulk(
+            [gtfs_id for gtfs_id, _ in chunk], field_name="gtfs_id"
+        )
+        created, updated, changed_fields = [], [], set()
+        for gtfs_id, fields in chunk:
+            row = existing.get(gtfs_id)
+            if row is None:
+                created.append(model(gtfs_id=gtfs_id, **(defaults or {}), **fields))
+                continue
+            changed = {
+                name for name, value in fields.items() if getattr(row, name) != value
+            }
+            if changed:
+                for name in changed:
+                    setattr(row, name, fields[name])
+                updated.append(row)
+                changed_fields |= changed
+        model.objects.bulk_create(created)
+        if updated:
+            model.objects.bulk_update(updated, sorted(changed_fields))
+        counts.add(model, len(created), len(updated))
+
+
+def _gtfs_ids(model) -> dict[str, int]:
+    return dict(
+        model.objects.filter(gtfs_id__isnull=False).values_list("gtfs_id", "pk")
+    )
+
+
+def _service_days(feed: Feed, first_day: date, days: int) -> dict[str, list[date]]:
+    """Days in [first_day, first_day + days) each service_id runs on."""
+    window = [first_day + timedelta(days=offset) for offset in range(days)]
+    if not (feed.has("calendar.txt") or feed.has("calendar_dates.txt")):
+        raise GTFSError("The feed has neither calendar.txt nor calendar_dates.txt.")
+    services = {}
+    if feed.has("calendar.txt"):
+        for row in feed.rows("calendar.txt"):
+            start = datetime.strptime(row["start_date"], "%Y%m%d").date()
+            end = datetime.strptime(row["end_date"], "%Y%m%d").date()
+            services[row["service_id"]] = {
+                day
+                for day in window
+                if start <= day <= end and row[WEEKDAYS[day.weekday()]] == "1"
+            }
+    if feed.has("calendar_dates.txt"):
+        for row in feed.rows("calendar_dates.txt"):
+            day = datetime.strptime(row["date"], "%Y%m%d").date()
+            if day not in window:
+                continue
+            running = services.setdefault(row["service_id"], set())
+            if row["exception_type"] == "1":
+                running.add(day)
+            else:
+                running.discard(day)
+    return {service: sorted(running) for service, running in services.items()}
+
+
+def journey_gtfs_id(trip_id: str, day: date) -> str:
+    """The gtfs_id of a trip's journey on `day`: exported trip ids are one already."""
+    if JOURNEY_GTFS_ID.fullmatch(trip_id):
+        return trip_id
+    return f"{trip_id}@{day.isoformat()}"
+
+
+def _delete_stale_journeys(
+    first_day: date, days: int, zone: ZoneInfo, imported: set, counts: Counts
+) -> None:
+    """
+    Delete the journeys of service days in the window that the feed no longer
+    has (their trip or the day was dropped), unless tickets were sold for them.
+    """
+    last_day = first_day + timedelta(days=days - 1)
+    candidates = (
+        Journey.objects.filter(
+            # GTFS times count forward from the start of the service day.
+            departure_time__gte=service_day_start(first_day, zone),
+            gtfs_id__regex=f"^{JOURNEY_GTFS_ID.pattern}$",
+        )
+        .alias(day=Right("gtfs_id", 10))
+        .filter(day__gte=first_day.isoformat(), day__lte=last_day.isoformat())
+        .values_list("pk", "gtfs_id")
+    )
+    stale = [pk for pk, gtfs_id in candidates.iterator() if gtfs_id not in imported]
+    if stale:
+        _, deleted = (
+            Journey.objects.filter(pk__in=stale)
+            .exclude(Exists(Ticket.objects.filter(journey=OuterRef("pk"))))
+            .delete()
+        )
+        counts.add(Journey, deleted=deleted.get(Journey._meta.label, 0))
+
+
+def _trip_ends(feed: Feed) -> dict[str, list]:
+    """
+    trip_id -> [first stop_sequence, stop, departure, last stop_sequence,
+    stop, arrival], in one pass over stop_times.txt: memory grows with the
+    trips, not the stop times.
+    """
+    ends = {}
+    for row in feed.rows("stop_times.txt"):
+        sequence = int(row["stop_sequence"])
+        departure = row["departure_time"] or row["arrival_time"]
+        arrival = row["arrival_time"] or row["departure_time"]
+        end = ends.get(row["trip_id"])
+        if end is None:
+            stop = row["stop_id"]
+            ends[row["trip_id"]] = [sequence, stop, departure, sequence, stop, arrival]
+            continue
+        if sequence < end[0]:
+            end[0:3] = sequence, row["stop_id"], departure
+        if sequence > end[3]:
+            end[3:6] = sequence, row["stop_id"], arrival
+    return ends
+
+
+def import_feed(
+    path,
+    first_day: date,
+    days: int,
+    train_type: TrainType,
+    cargo_num: int = 10,
+    place_in_cargo: int = 50,
+    batch_size: int = 1000,
+) -> Counts:
+    """
+    Upsert the feed's stations, trains and the journeys of its trips running
+    in the `days` from `first_day`, in one transaction. Re-importing a feed
+    only writes what changed, and deletes the journeys in those days that it
+    no longer runs (but not those with tickets). New trains get `train_type`
+    and the given size.
+    """
+    feed = Feed(path)
+    counts = Counts()
+    zone = ZoneInfo(settings.TIME_ZONE)
+    if feed.has("agency.txt"):
+        agency = next(feed.rows("agency.txt"), {})
+        if agency.get("agency_timezone"):
+            zone = ZoneInfo(agency["agency_timezone"])
+
+    with transaction.atomic():
+        # Platforms (stops with a parent_station) are folded into the station.
+        parents = {}
+        station_rows = []
+        for row in feed.rows("stops.txt"):
+            if row.get("parent_station"):
+                parents[row["stop_id"]] = row["parent_station"]
+            elif row.get("location_type", "") in ("", "0", "1"):
+                station_rows.append(
+                    (
+                        row["stop_id"],
+                        {
+                            "name": row["stop_name"][:100],
+                            "latitude": float(row["stop_lat"]),
+                            "longitude": float(row["stop_lon"]),
+                        },
+                    )
+                )
+        _upsert(Station, station_rows, batch_size, counts)
+        stations = _gtfs_ids(Station)
+
+        def station(stop_id: str) -> int:
+            while stop_id in parents:
+                stop_id = parents[stop_id]
+            if stop_id not in stations:
+                raise GTFSError(f"Unknown stop {stop_id!r} in stop_times.txt.")
+            return stations[stop_id]
+
+        _upsert(
+            Train,
+            (
+                (
+                    row["route_id"],
+                    {
+                        "name": (
+                            row.get("route_short_name")
+                            or row.get("route_long_name")
+                            or row["route_id"]
+                        )[:100]
+                    },
+                )
+                for row in feed.rows("routes.txt")
+            ),
+            batch_size,
+            counts,
+            defaults={
+                "train_type": train_type,
+                "cargo_num": cargo_num,
+                "place_in_cargo": place_in_cargo,
+            },
+        )
+        trains = _gtfs_ids(Train)
+
+        service_days = _service_days(feed, first_day, days)
+        ends = _trip_ends(feed)
+        routes = {
+            (row["source"], row["destination"]): row["id"]
+            for row in Route.objects.values("source", "destination").annotate(
+                id=Min("id")
+            )
+        }
+        pairs = {(station(end[1]), station(end[4])) for end in ends.values()}
+        _create_routes(sorted(pairs - routes.keys()), routes, counts)
+
+        imported = set()
+
+        def journeys():
+            for trip in feed.rows("trips.txt"):
+                end = ends.get(trip["trip_id"])
+                train = trains.get(trip["route_id"])
+                if end is None or train is None:
+                    continue
+                source, destination = station(end[1]), station(end[4])
+                departure, arrival = parse_time(end[2]), parse_time(end[5])
+                for day in service_days.get(trip["service_id"], ()):
+                    start = service_day_start(day, zone)
+                    gtfs_id = journey_gtfs_id(trip["trip_id"], day)
+                    imported.add(gtfs_id)
+                    yield gtfs_id, {
+                        "route_id": routes[source, destination],
+                        "train_id": train,
+                        "source_station_id": source,
+                        "destination_station_id": destination,
+                        "departure_time": start + departure,
+                        "arrival_time": start + arrival,
+                    }
+
+        _upsert(Journey, journeys(), batch_size, counts)
+        _delete_stale_journeys(first_day, days, zone, imported, counts)
+    return counts
+
+
+def _create_routes(pairs: list, routes: dict, counts: Counts) -> None:
+    """Routes between the (source, destination) `pairs`, with the great-circle distance."""
+    if not pairs:
+        return
+    coordinates = Station.objects.in_bulk(
+        {station for pair in pairs for station in pair}
+    )
+    ends = np.array(
+        [
+            (
+                coordinates[source].latitude,
+                coordinates[source].longitude,
+                coordinates[destination].latitude,
+                coordinates[destination].longitude,
+            )
+            for source, destination in pairs
+        ]
+    )
+    distances = np.rint(haversine_km(*ends.T)).astype(int)
+    created = Route.objects.bulk_create(
+        Route(source_id=source, destination_id=destination, distance=max(1, distance))
+        for (source, destination), distance in zip(pairs, distances)
+    )
+    routes.update(
+        ((route.source_id, route.destination_id), route.pk) for route in created
+    )
+    counts.add(Route, created=len(created))
+    # bulk_create sends no post_save: fares follow the distance bands.
+    transaction.on_commit(invalidate_fares)
+
+
+def _write(directory: Path, name: str, header: list[str], rows: Iterable) -> None:
+    with open(directory / name, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def export_feed(
+    directory,
+    agency_name: str,
+    agency_url: str,
+    since: datetime | None = None,
+) -> int:
+    """
+    Write stations, trains and journeys (departing from `since` on) as a GTFS
+    feed into `directory`: every journey is a trip of two stop times, running
+    on its own service date. Imported journeys keep their trip_id@day, which
+    import_feed maps back to them. Returns the number of trips.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    zone = ZoneInfo(settings.TIME_ZONE)
+
+    def gtfs_id(row_id, external_id, prefix):
+        return external_id or f"{prefix}-{row_id}"
+
+    _write(
+        directory,
+        "agency.txt",
+        ["agency_id", "agency_name", "agency_url", "agency_timezone"],
+        [["railway", agency_name, agency_url, settings.TIME_ZONE]],
+    )
+    _write(
+        directory,
+        "stops.txt",
+        ["stop_id", "stop_name", "stop_lat", "stop_lon", "location_type"],
+        (
+            # Location type 0: stop times may only refer to stops.
+            [gtfs_id(pk, external, "station"), name, latitude, longitude, 0]
+            for pk, external, name, latitude, longitude in Station.objects.order_by(
+                "pk"
+            )
+            .values_list("pk", "gtfs_id", "name", "latitude", "longitude")
+            .iterator()
+        ),
+    )
+    _write(
+        directory,
+        "routes.txt",
+        ["route_id", "agency_id", "route_short_name", "route_type"],
+        (
+            [gtfs_id(pk, external, "train"), "railway", name, RAIL]
+            for pk, external, name in Train.objects.order_by("pk")
+            .values_list("pk", "gtfs_id", "name")
+            .iterator()
+        ),
+    )
+
+    journeys = Journey.objects.order_by("pk").values_list(
+        "pk",
+        "gtfs_id",
+        "train_id",
+        "train__gtfs_id",
+        "source_station_id",
+        "source_station__gtfs_id",
+        "destination_station_id",
+        "destination_station__gtfs_id",
+        "departure_time",
+        "arrival_time",
+    )
+    if since is not None:
+        journeys = journeys.filter(departure_time__gte=since)
+
+    service_dates = set()
+    trips = 0
+    with (
+        open(directory / "trips.txt", "w", encoding="utf-8", newline="") as trips_file,
+        open(
+            directory / "stop_times.txt", "w", encoding="utf-8", newline=""
+        ) as times_file,
+    ):
+        trip_writer, time_writer = csv.writer(trips_file), csv.writer(times_file)
+        trip_writer.writerow(["route_id", "service_id", "trip_id"])
+        time_writer.writerow(
+            ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"]
+        )
+        for (
+            pk,
+            external,
+            train,
+            train_external,
+            source,
+            source_external,
+            destination,
+            destination_external,
+            departure,
+            arrival,
+        ) in journeys.iterator(chunk_size=2000):
+            day = departure.astimezone(zone).date()
+            start = service_day_start(day, zone)
+            service = day.strftime("%Y%m%d")
+            service_dates.add(service)
+            trip = gtfs_id(pk, external, "journey")
+            trip_writer.writerow(
+                [gtfs_id(train, train_external, "train"), service, trip]
+            )
+            departs = format_time(departure - start)
+            arrives = format_time(arrival - start)
+            time_writer.writerows(
+                [
+                    [
+                        trip,
+                        departs,
+                        departs,
+                        gtfs_id(source, source_external, "station"),
+                        1,
+                    ],
+                    [
+                        trip,
+                        arrives,
+                        arrives,
+                        gtfs_id(destination, destination_external, "station"),
+                        2,
+                    ],
+                ]
+            )
+            trips += 1
+
+    _write(
+        directory,
+        "calendar_dates.txt",
+        ["service_id", "date", "exception_type"],
+        ([service, service, 1] for service in sorted(service_dates)),
+    )
+    return trips
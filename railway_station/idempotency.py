@@ -0,0 +1,105 @@
+import hashlib
+import json
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from railway_station.models import IdempotencyKey
+
+
+def request_hash(request) -> str:
+    """Hash of the parsed body, the same for a JSON and a MessagePack retry."""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def key_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+
+
+def content_type(request) -> str:
+    """The Content-Type DRF sends a response to `request` with."""
+    charset = request.accepted_renderer.charset
+    if charset is None:
+        return request.accepted_media_type
+    return f"{request.accepted_media_type}; charset={charset}"
+
+
+def render(request, response: Response) -> Response:
+    """Render `response` the way the view would, so its body can be stored."""
+    response.accepted_renderer = request.accepted_renderer
+    response.accepted_media_type = request.accepted_media_type
+    response.renderer_context = request.parser_context["view"].get_renderer_context()
+    # Rendered once: the view sends this content as is.
+    response.content = response.rendered_content
+    return response
+
+
+def replay(request, record: IdempotencyKey, body_hash: str):
+    if record.request_hash != body_hash:
+        return Response(
+            {"detail": "Idempotency-Key was already used with a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.content_type != content_type(request):
+        return Response(
+            {
+                "detail": f"The response to this request is only available as {record.content_type}."
+            },
+            status=status.HTTP_406_NOT_ACCEPTABLE,
+        )
+    # The stored bytes: a replay is identical to the original response.
+    return HttpResponse(
+        record.response_content,
+        status=record.status_code,
+        content_type=record.content_type,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def idempotent_response(request, key: str, create: Callable[[], Response]):
+    """
+    Run `create` at most once per (user, key) within the TTL and replay its
+    successful response to retries, byte for byte in the negotiated format
+    (a retry asking for another one is answered with 406). Failed attempts are
+    not stored, so they can be retried with the same key.
+    """
+    if not key or len(key) > 255:
+        raise ValidationError({"Idempotency-Key": "Must be 1 to 255 characters."})
+    body_hash = request_hash(request)
+    keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+
+    # Retries of a completed request: one indexed lookup, no transaction.
+    record = keys.filter(created_at__gte=key_cutoff()).first()
+    if record is not None:
+        return replay(request, record, body_hash)
+
+    with transaction.atomic():
+        keys.filter(created_at__lt=key_cutoff()).delete()
+        # Concurrent duplicates block on the unique (user, key) index until
+        # this transaction commits, then replay the stored response.
+        record, created = IdempotencyKey.objects.get_or_create(
+            user=request.user,
+            key=key,
+            defaults={"request_hash": body_hash, "status_code": 0},
+        )
+        if not created:
+            return replay(request, record, body_hash)
+
+        response = render(request, create())
+        record.status_code = response.status_code
+        record.response_content = response.content
+        record.content_type = response["Content-Type"]
+        record.order_id = response.data.get("id")
+        record.save(
+            update_fields=["status_code", "response_content", "content_type", "order"]
+        )
+    return response
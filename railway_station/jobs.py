@@ -0,0 +1,126 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from railway_station.models import Job
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "railway_jobs"
+
+# name -> (function, max_attempts)
+registry: dict[str, tuple[Callable[[dict], None], int]] = {}
+
+
+def job(name: str, max_attempts: int = 5):
+    """
+    Register a function taking the job payload as a background job.
+
+    Jobs run at least once: one outliving JOB_TIMEOUT_SECONDS is taken for
+    the job of a dead worker and runs again, so functions must be idempotent.
+    """
+
+    def register(function):
+        registry[name] = (function, max_attempts)
+        return function
+
+    return register
+
+
+def _notify_workers() -> None:
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"NOTIFY {NOTIFY_CHANNEL}")
+
+
+def enqueue(name: str, payload: dict = None, delay: timedelta = None) -> Job:
+    """
+    Insert a job in the current transaction (a transactional outbox): it is
+    only visible to workers, and they are only woken, once that commits.
+    """
+    _, max_attempts = registry[name]
+    queued = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=max_attempts,
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+    transaction.on_commit(_notify_workers)
+    return queued
+
+
+def backoff(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, capped at JOB_MAX_BACKOFF_SECONDS."""
+    seconds = min(settings.JOB_MAX_BACKOFF_SECONDS, 2**attempts)
+    return timedelta(seconds=seconds * random.uniform(0.5, 1.0))
+
+
+def claim(limit: int = 10) -> list[Job]:
+    """
+    Lock and mark due jobs running. SKIP LOCKED lets workers claim in parallel;
+    running jobs not finished within JOB_TIMEOUT_SECONDS (a dead worker) are
+    claimed again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.QUEUED, run_at__lte=now)
+                | Q(status=Job.RUNNING, locked_at__lt=stale)
+            )
+            .order_by("run_at")[:limit]
+        )
+        for claimed in jobs:
+            claimed.status = Job.RUNNING
+            claimed.locked_at = now
+            claimed.attempts += 1
+        Job.objects.bulk_update(jobs, ["status", "locked_at", "attempts"])
+    return jobs
+
+
+def run(claimed: Job) -> None:
+    """
+    Run a claimed job, then delete it if it succeeded or queue it again with
+    a backoff (until max_attempts) if it failed. The outcome is dropped if the
+    job was claimed again meanwhile: the newer run records its own.
+    """
+    owned = Job.objects.filter(pk=claimed.pk, locked_at=claimed.locked_at)
+    try:
+        function, _ = registry[claimed.name]
+        function(claimed.payload)
+    except Exception:
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts < claimed.max_attempts:
+            claimed.status = Job.QUEUED
+            claimed.run_at = timezone.now() + backoff(claimed.attempts)
+        else:
+            claimed.status = Job.FAILED
+        recorded = owned.update(
+            status=claimed.status,
+            run_at=claimed.run_at,
+            locked_at=None,
+            last_error=claimed.last_error,
+        )
+        if recorded and claimed.status == Job.FAILED:
+            logger.error("Job %s failed for good:\n%s", claimed, claimed.last_error)
+    else:
+        recorded, _ = owned.delete()
+    if not recorded:
+        logger.warning("Job %s was claimed again before it finished.", claimed)
+
+
+def run_pending(limit: int = 10) -> int:
+    """Claim and run one batch of due jobs, returning how many ran."""
+    jobs = claim(limit)
+    for claimed in jobs:
+        run(claimed)
+    return len(jobs)
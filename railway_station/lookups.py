@@ -0,0 +1,19 @@
+from django.db.models import Field, ForeignObject
+from django.db.models.lookups import In
+
+
+@ForeignObject.register_lookup
+@Field.register_lookup
+class AnyArray(In):
+    """
+    `field__any=[...]`: `field = ANY(%s)` with the values bound as a single
+    array parameter on PostgreSQL, so long id lists produce one statement
+    shape instead of one per list length. Other backends fall back to IN.
+    """
+
+    lookup_name = "any"
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        db_type = self.lhs.output_field.cast_db_type(connection)
+        return f"{lhs} = ANY(%s::{db_type}[])", (*lhs_params, list(self.rhs))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from railway_station.archive import archive_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Move journeys that arrived more than ARCHIVE_AFTER_DAYS ago, their "
+        "tickets and crew links to the archive tables, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days", type=int, default=settings.ARCHIVE_AFTER_DAYS
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        archived = 0
+        while moved := archive_batch(cutoff, options["batch_size"]):
+            archived += moved
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} journeys."))
@@ -0,0 +1,238 @@
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from railway_service.metrics import QueryStats
+from railway_station.data_generator import (
+    FIRST_DEPARTURE,
+    VOLUME_PRESETS,
+    generate_railway_data,
+)
+from railway_station.models import Journey, Order, Route, Station, Train
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a benchmark database with reproducible data volumes, drive the API "
+        "endpoints through the test client and report p50/p95/p99 latency, "
+        "queries per request and peak memory as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--volume", choices=VOLUME_PRESETS, default="small")
+        for name in VOLUME_PRESETS["small"].as_dict():
+            parser.add_argument(
+                f"--{name}", type=int, help=f"Override the number of {name}."
+            )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument(
+            "--baseline", help="Compare the results with a stored JSON run."
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            default=None,
+            help="Fail if any p95 latency is this many percent slower than the baseline.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep (and reuse) the seeded benchmark database between runs.",
+        )
+        parser.add_argument(
+            "--in-place",
+            action="store_true",
+            help="Use the configured database instead of a separate benchmark database.",
+        )
+
+    def handle(self, *args, **options):
+        volumes = VOLUME_PRESETS[options["volume"]]
+        volumes = replace(
+            volumes,
+            **{
+                name: options[name]
+                for name in volumes.as_dict()
+                if options.get(name) is not None
+            },
+        )
+
+        old_name = None
+        if not options["in_place"]:
+            old_name = connection.settings_dict["NAME"]
+            old_test_settings = connection.settings_dict["TEST"]
+            # Not test_<NAME>: a benchmark must not clobber the database of a
+            # test run (or the other way around).
+            connection.settings_dict["TEST"] = {
+                **old_test_settings,
+                "NAME": f"benchmark_{old_name}",
+            }
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, keepdb=options["keepdb"], serialize=False
+            )
+        try:
+            if Station.objects.exists():
+                self.stdout.write("Reusing the existing benchmark data.")
+            else:
+                generate_railway_data(
+                    volumes, seed=options["seed"], log=self.stdout.write
+                )
+            results = self.run_benchmarks(options["iterations"])
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=options["keepdb"]
+                )
+                connection.settings_dict["TEST"] = old_test_settings
+
+        report = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "volumes": volumes.as_dict(),
+            "seed": options["seed"],
+            "iterations": options["iterations"],
+            "results": results,
+        }
+        self.print_results(results)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options["max_regression"])
+
+    def benchmark_cases(self) -> dict[str, str]:
+        journey = Journey.objects.order_by("id").first()
+        route = Route.objects.order_by("id").first()
+        train = Train.objects.order_by("id").first()
+        order = Order.objects.order_by("id").first()
+        return {
+            "journey-list": reverse("railway_station:journey-list")
+            + f"?route={journey.route_id}&date_from={FIRST_DEPARTURE:%Y-%m-%d}",
+            "journey-detail": reverse(
+                "railway_station:journey-detail", args=[journey.id]
+            ),
+            "route-list": reverse("railway_station:route-list")
+            + f"?source={route.source_id}",
+            "route-detail": reverse("railway_station:route-detail", args=[route.id]),
+            "train-list": reverse("railway_station:train-list"),
+            "train-detail": reverse("railway_station:train-detail", args=[train.id]),
+            "station-list": reverse("railway_station:station-list"),
+            "order-list": reverse("railway_station:order-list"),
+            "order-detail": reverse("railway_station:order-detail", args=[order.id]),
+        }
+
+    def run_benchmarks(self, iterations: int) -> dict:
+        order = Order.objects.order_by("id").select_related("user").first()
+        client = APIClient()
+        client.force_authenticate(
+            user=order.user if order else get_user_model().objects.first()
+        )
+
+        results = {}
+        # Debug tooling would dominate the measurements. The caches are kept
+        # (fares, schema and throttles rely on them), in process memory so
+        # the benchmark leaves the configured cache alone.
+        with override_settings(
+            ALLOWED_HOSTS=["testserver"],
+            DEBUG=False,
+            NPLUSONE_DETECTION=False,
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "benchmark",
+                },
+                "local": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "benchmark-local",
+                },
+            },
+        ):
+            for name, url in self.benchmark_cases().items():
+                # Every endpoint starts below the throttle rates.
+                caches["local"].clear()
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(
+                        f"{name}: GET {url} returned {response.status_code}"
+                    )
+
+                queries = QueryStats()
+                with connection.execute_wrapper(queries):
+                    client.get(url)
+
+                tracemalloc.start()
+                client.get(url)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                timings = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                results[name] = {
+                    "url": url,
+                    "p50_ms": round(percentile(timings, 0.50), 3),
+                    "p95_ms": round(percentile(timings, 0.95), 3),
+                    "p99_ms": round(percentile(timings, 0.99), 3),
+                    "mean_ms": round(statistics.fmean(timings), 3),
+                    "queries": queries.count,
+                    "peak_memory_kb": round(peak_memory / 1024, 1),
+                    "response_bytes": len(response.content),
+                }
+        return results
+
+    def print_results(self, results: dict) -> None:
+        self.stdout.write(
+            f"{'endpoint':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>9}{'peak KB':>10}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<16}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                f"{result['p99_ms']:>10}{result['queries']:>9}{result['peak_memory_kb']:>10}"
+            )
+
+    def compare(self, results: dict, baseline_path: str, max_regression) -> None:
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+        regressions = []
+        self.stdout.write(f"\nCompared with {baseline_path} (p95, queries):")
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            change = (
+                (result["p95_ms"] / before["p95_ms"] - 1) * 100
+                if before["p95_ms"]
+                else 0
+            )
+            self.stdout.write(
+                f"{name:<16}{before['p95_ms']:>10} -> {result['p95_ms']:<10}"
+                f"({change:+.1f}%)  queries {before['queries']} -> {result['queries']}"
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(name)
+
+        if regressions:
+            raise CommandError(
+                f"p95 regression above {max_regression}%: {', '.join(regressions)}"
+            )
@@ -0,0 +1,77 @@
+import json
+import time
+
+import cbor2
+import msgpack
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from railway_station.renderers import CBORRenderer, MessagePackRenderer
+from railway_station.serializers import (
+    JourneyListValuesSerializer,
+    RouteListValuesSerializer,
+)
+from railway_station.views import JourneyViewSet, RouteViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSON, MessagePack and CBOR payload size, encode and decode time "
+        "for the journey and route lists on the existing data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        formats = (
+            ("json", JSONRenderer(), json.loads),
+            (
+                "msgpack",
+                MessagePackRenderer(),
+                lambda content: msgpack.unpackb(content, timestamp=3),
+            ),
+            ("cbor", CBORRenderer(), cbor2.loads),
+        )
+        cases = (
+            ("journey", JourneyViewSet.queryset, JourneyListValuesSerializer),
+            ("route", RouteViewSet.queryset, RouteListValuesSerializer),
+        )
+
+        def best_of(function) -> float:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - started)
+            return min(timings) * 1000
+
+        self.stdout.write(
+            f"{'list':<9}{'format':<9}{'bytes':>10}{'size':>7}{'encode ms':>11}{'decode ms':>11}"
+        )
+        for name, queryset, serializer_class in cases:
+            json_size = None
+            for format_name, renderer, decode in formats:
+                request = Request(APIRequestFactory().get("/"))
+                request.accepted_renderer = renderer
+                data = serializer_class(
+                    serializer_class.setup_queryset(queryset.all())[:rows],
+                    context={"request": request},
+                ).data
+                if not data:
+                    raise CommandError(
+                        f"No {name} rows: run generate_railway_data first."
+                    )
+
+                content = renderer.render(data)
+                json_size = json_size or len(content)
+                encode_ms = best_of(lambda: renderer.render(data))
+                decode_ms = best_of(lambda: decode(content))
+                self.stdout.write(
+                    f"{name:<9}{format_name:<9}{len(content):>10}"
+                    f"{len(content) / json_size:>7.0%}{encode_ms:>11.2f}{decode_ms:>11.2f}"
+                )
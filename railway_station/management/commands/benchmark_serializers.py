@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from railway_station.serializers import (
+    JourneyListValuesSerializer,
+    RouteListValuesSerializer,
+    TrainListValuesSerializer,
+)
+from railway_station.views import JourneyViewSet, RouteViewSet, TrainViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the ModelSerializer and values() list serialization on the "
+        "existing data (fetch + serialize + render), in ms per 1k rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        context = {"request": RequestFactory().get("/")}
+        renderer = JSONRenderer()
+        cases = (
+            ("journey", JourneyViewSet.queryset, JourneyListValuesSerializer),
+            ("route", RouteViewSet.queryset, RouteListValuesSerializer),
+            (
+                "train",
+                TrainViewSet.queryset.select_related("train_type"),
+                TrainListValuesSerializer,
+            ),
+        )
+
+        def best_of(serialize) -> float:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                content = renderer.render(serialize())
+                timings.append(time.perf_counter() - started)
+            return min(timings), content
+
+        self.stdout.write(
+            f"{'list':<10}{'rows':>7}{'model ms/1k':>14}{'values ms/1k':>14}{'speedup':>9}"
+        )
+        for name, queryset, values_serializer in cases:
+            count = len(queryset.all()[:rows].values_list("id"))
+            if not count:
+                raise CommandError(f"No {name} rows: run generate_railway_data first.")
+
+            model_time, model_content = best_of(
+                lambda: values_serializer.model_serializer_class(
+                    queryset.all()[:rows], many=True, context=context
+                ).data
+            )
+            values_time, values_content = best_of(
+                lambda: values_serializer(
+                    values_serializer.setup_queryset(queryset.all())[:rows],
+                    context=context,
+                ).data
+            )
+            if len(model_content) != len(values_content):
+                raise CommandError(f"{name}: the two outputs differ.")
+
+            per_1k = 1000 / count * 1000
+            self.stdout.write(
+                f"{name:<10}{count:>7}{model_time * per_1k:>14.2f}"
+                f"{values_time * per_1k:>14.2f}{model_time / values_time:>8.1f}x"
+            )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from railway_station.export import DATASETS, FORMATS, ROW_GROUP_SIZE, export_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Write tickets (joined with their journey, route and train) or journeys, "
+        "archived ones included, to a Parquet or Arrow IPC file, one row group "
+        "at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=sorted(FORMATS),
+            help="Defaults to arrow for .arrow and .feather paths, parquet otherwise.",
+        )
+        parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["file_format"] or (
+            "arrow" if path.endswith((".arrow", ".feather")) else "parquet"
+        )
+        size = 0
+        with open(path, "wb") as output:
+            for chunk in export_dataset(
+                options["dataset"], file_format, options["row_group_size"]
+            ):
+                output.write(chunk)
+                size += len(chunk)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {options['dataset']} to {path} ({size} bytes).")
+        )
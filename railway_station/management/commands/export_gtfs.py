@@ -0,0 +1,39 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from railway_station.gtfs import export_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Write stations, trains and journeys as a GTFS feed into a directory, "
+        "each journey as a trip with its own service date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Only journeys departing on or after this date (YYYY-MM-DD).",
+        )
+        parser.add_argument("--agency-name", default="Railway station")
+        parser.add_argument("--agency-url", default="https://railway.local")
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        trips = export_feed(
+            options["directory"],
+            options["agency_name"],
+            options["agency_url"],
+            since=(
+                timezone.make_aware(datetime.combine(since, time.min))
+                if since
+                else None
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {trips} trips to {options['directory']}.")
+        )
@@ -0,0 +1,53 @@
+import time
+from dataclasses import replace
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from railway_station.data_generator import VOLUME_PRESETS, generate_railway_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate stations, a connected route graph, trains, journeys with crews, "
+        "orders and tickets. Uses PostgreSQL COPY (bulk_create elsewhere) and a "
+        "fixed seed, so runs are reproducible."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--volume", choices=VOLUME_PRESETS, default="small")
+        for name in VOLUME_PRESETS["small"].as_dict():
+            parser.add_argument(
+                f"--{name}", type=int, help=f"Override the number of {name}."
+            )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk_create even when PostgreSQL COPY is available.",
+        )
+
+    def handle(self, *args, **options):
+        volumes = VOLUME_PRESETS[options["volume"]]
+        volumes = replace(
+            volumes,
+            **{
+                name: options[name]
+                for name in volumes.as_dict()
+                if options.get(name) is not None
+            },
+        )
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            generate_railway_data(
+                volumes,
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                use_copy=not options["no_copy"],
+                log=self.stdout.write,
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated in {time.perf_counter() - started:.1f}s.")
+        )
@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from railway_station.gtfs import GTFSError, import_feed
+from railway_station.models import TrainType
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a GTFS feed (directory or .zip): stops as stations, routes as "
+        "trains and the trips running in the given days as journeys. Rows are "
+        "upserted in batches on their GTFS ids, unchanged rows are not written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("feed")
+        parser.add_argument(
+            "--start-date",
+            type=date.fromisoformat,
+            help="First service day to import (YYYY-MM-DD), today by default.",
+        )
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument(
+            "--train-type", default="GTFS", help="Train type name of new trains."
+        )
+        parser.add_argument("--cargo-num", type=int, default=10)
+        parser.add_argument("--place-in-cargo", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        train_type, _ = TrainType.objects.get_or_create(name=options["train_type"])
+        try:
+            counts = import_feed(
+                options["feed"],
+                options["start_date"] or timezone.localdate(),
+                options["days"],
+                train_type,
+                cargo_num=options["cargo_num"],
+                place_in_cargo=options["place_in_cargo"],
+                batch_size=options["batch_size"],
+            )
+        except GTFSError as error:
+            raise CommandError(error)
+        for name, (created, updated, deleted) in counts.items():
+            self.stdout.write(
+                f"{name}: {created} created, {updated} updated, {deleted} deleted"
+            )
+        self.stdout.write(self.style.SUCCESS("Imported the feed."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from railway_station.idempotency import key_cutoff
+from railway_station.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete idempotency keys older than IDEMPOTENCY_KEY_TTL_SECONDS."
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(
+            created_at__lt=key_cutoff()
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} idempotency keys."))
@@ -0,0 +1,49 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from railway_station.fares import invalidate_fares
+from railway_station.geo import route_distances
+from railway_station.models import Route
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare each route's distance with the great-circle distance between "
+        "its stations and list the routes that differ by more than --tolerance "
+        "km; with --fix, store the computed distance instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tolerance", type=float, default=1.0)
+        parser.add_argument("--fix", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ids, stored, computed = route_distances()
+        computed = np.rint(computed).astype(np.int64)
+        mismatched = np.flatnonzero(np.abs(stored - computed) > options["tolerance"])
+
+        for index in mismatched:
+            self.stdout.write(
+                f"Route {ids[index]}: {stored[index]} km stored, "
+                f"{computed[index]} km computed"
+            )
+        if not options["fix"]:
+            self.stdout.write(
+                f"{len(mismatched)} of {len(ids)} routes differ by more than "
+                f"{options['tolerance']} km."
+            )
+            return
+
+        routes = [
+            Route(id=int(ids[index]), distance=int(computed[index]))
+            for index in mismatched
+        ]
+        with transaction.atomic():
+            Route.objects.bulk_update(
+                routes, ["distance"], batch_size=options["batch_size"]
+            )
+            # bulk_update sends no post_save: fares follow the distance bands.
+            transaction.on_commit(invalidate_fares)
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(routes)} routes."))
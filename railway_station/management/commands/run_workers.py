@@ -0,0 +1,91 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from railway_station.jobs import NOTIFY_CHANNEL, run_pending
+
+
+def wait_for_jobs(timeout: float) -> None:
+    """Sleep until a job is enqueued (PostgreSQL NOTIFY) or `timeout` passes."""
+    if connection.vendor != "postgresql":
+        multiprocessing.Event().wait(timeout)
+        return
+    connection.ensure_connection()
+    for _ in connection.connection.notifies(timeout=timeout, stop_after=1):
+        pass
+
+
+def run_burst(batch_size: int) -> int:
+    """Run due jobs until none are left, returning how many ran."""
+    total = 0
+    while ran := run_pending(batch_size):
+        total += ran
+    return total
+
+
+def work(batch_size: int, poll_interval: float) -> None:
+    # Connections inherited from the parent process must not be shared.
+    connections.close_all()
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        while True:
+            run_burst(batch_size)
+            wait_for_jobs(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs (railway_station.jobs) in a pool of worker "
+        "processes, woken by PostgreSQL NOTIFY and polling as a fallback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2)
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds between polls when no notification arrives.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Run the due jobs in this process and exit when none are left.",
+        )
+
+    def handle(self, *args, **options):
+        if options["burst"]:
+            ran = run_burst(options["batch_size"])
+            self.stdout.write(f"Ran {ran} jobs.")
+            return
+
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=work,
+                args=(options["batch_size"], options["poll_interval"]),
+                daemon=True,
+            )
+            for _ in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} workers.")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
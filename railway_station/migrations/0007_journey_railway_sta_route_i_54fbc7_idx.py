@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-19 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0006_order_ticket"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["route", "departure_time"],
+                name="railway_sta_route_i_54fbc7_idx",
+            ),
+        ),
+    ]
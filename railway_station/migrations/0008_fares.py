@@ -0,0 +1,71 @@
+# Generated by Django 5.2 on 2026-10-19 06:26
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0007_journey_railway_sta_route_i_54fbc7_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FareBand",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("min_distance", models.PositiveIntegerField(unique=True)),
+                ("price", models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                "ordering": ["min_distance"],
+            },
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="traintype",
+            name="fare_multiplier",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("1.00"), max_digits=5
+            ),
+        ),
+        migrations.CreateModel(
+            name="RouteFare",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("price", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "route",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fare",
+                        to="railway_station.route",
+                    ),
+                ),
+            ],
+        ),
+    ]
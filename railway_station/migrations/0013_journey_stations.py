@@ -0,0 +1,86 @@
+# Generated by Django 5.2 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_route_stations(apps, schema_editor):
+    Journey = apps.get_model("railway_station", "Journey")
+    Route = apps.get_model("railway_station", "Route")
+    route = Route.objects.filter(pk=OuterRef("route"))
+    Journey.objects.update(
+        source_station=Subquery(route.values("source")[:1]),
+        destination_station=Subquery(route.values("destination")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0012_order_history_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="source_station",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="departures",
+                to="railway_station.station",
+            ),
+        ),
+        migrations.AddField(
+            model_name="journey",
+            name="destination_station",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="arrivals",
+                to="railway_station.station",
+            ),
+        ),
+        migrations.RunPython(copy_route_stations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="journey",
+            name="source_station",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="departures",
+                to="railway_station.station",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="journey",
+            name="destination_station",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="arrivals",
+                to="railway_station.station",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["source_station", "departure_time"],
+                name="railway_sta_source__92e05c_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["destination_station", "arrival_time"],
+                name="railway_sta_destina_378f78_idx",
+            ),
+        ),
+    ]
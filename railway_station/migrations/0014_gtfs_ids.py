@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0013_journey_stations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="gtfs_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="station",
+            name="gtfs_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="train",
+            name="gtfs_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0014_gtfs_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="estimated_arrival_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="journey",
+            name="estimated_departure_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-19 08:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0015_journey_estimated_times"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TicketScan",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("gate", models.CharField(blank=True, max_length=64)),
+                ("scanned_at", models.DateTimeField()),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "ticket",
+                    models.OneToOneField(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="scan",
+                        to="railway_station.ticket",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 08:56
+
+from django.db import migrations, models
+
+
+def delete_keys(apps, schema_editor):
+    # Stored responses cannot be rendered after the fact; the keys only
+    # live for IDEMPOTENCY_KEY_TTL_SECONDS anyway.
+    apps.get_model("railway_station", "IdempotencyKey").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0016_ticketscan"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="idempotencykey",
+            name="response_body",
+        ),
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="content_type",
+            field=models.CharField(default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="response_content",
+            field=models.BinaryField(default=b""),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-19 08:58
+
+from django.db import migrations, models
+
+
+def delete_done_jobs(apps, schema_editor):
+    apps.get_model("railway_station", "Job").objects.filter(status="done").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("railway_station", "0017_idempotencykey_rendered_response"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_done_jobs, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="order",
+            name="confirmation_sent_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="job",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("running", "Running"),
+                    ("failed", "Failed"),
+                ],
+                default="queued",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -1,6 +1,8 @@
 import pathlib
 import uuid
+from decimal import Decimal
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.text import slugify
@@ -10,6 +12,9 @@ from railway_service import settings
 
 class TrainType(models.Model):
     name = models.CharField(max_length=100)
+    fare_multiplier = models.DecimalField(
+        max_digits=5, decimal_places=2, default=Decimal("1.00")
+    )
 
     class Meta:
         verbose_name_plural = "train_types"
@@ -33,6 +38,8 @@ class Train(models.Model):
         TrainType, related_name="trains", on_delete=models.CASCADE
     )
     image = models.ImageField(null=True, upload_to=train_image_path)
+    # route_id of the GTFS line imported as this train (see railway_station.gtfs).
+    gtfs_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
 
     class Meta:
         verbose_name_plural = "trains"
@@ -45,6 +52,8 @@ class Station(models.Model):
     name = models.CharField(max_length=100)
     latitude = models.FloatField()
     longitude = models.FloatField()
+    # GTFS stop_id this station was imported from.
+    gtfs_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
 
     class Meta:
         verbose_name_plural = "stations"
@@ -75,17 +84,78 @@ class Route(models.Model):
     def __str__(self):
         return f"Route: {self.source} - {self.destination} ({self.distance})"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            # Keep the stations copied onto the journeys in step.
+            self.journeys.exclude(
+                source_station=self.source_id, destination_station=self.destination_id
+            ).update(
+                source_station=self.source_id, destination_station=self.destination_id
+            )
+
+
+class FareBand(models.Model):
+    """Base fare for routes of at least `min_distance` km, up to the next band."""
+
+    min_distance = models.PositiveIntegerField(unique=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ["min_distance"]
+
+    def __str__(self):
+        return f"Fare band: from {self.min_distance} km - {self.price}"
+
+
+class RouteFare(models.Model):
+    """Base fare of a route replacing its distance band."""
+
+    route = models.OneToOneField(Route, on_delete=models.CASCADE, related_name="fare")
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"Route fare: {self.route_id} - {self.price}"
+
 
 class Journey(models.Model):
-    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="journeys")
+    # Indexed by the composite indexes below, which lead with route.
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="journeys", db_index=False
+    )
     train = models.ForeignKey(Train, on_delete=models.CASCADE, related_name="journeys")
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    # The route's stations, copied in save(): a station board is then one
+    # range scan of (station, time) instead of a scan per route.
+    source_station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name="departures",
+        editable=False,
+        db_index=False,
+    )
+    destination_station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name="arrivals",
+        editable=False,
+        db_index=False,
+    )
+    # GTFS trip_id and service date ("trip@YYYY-MM-DD") this journey was imported from.
+    gtfs_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    # Realtime estimates (see railway_station.realtime), null while on time.
+    estimated_departure_time = models.DateTimeField(null=True, blank=True)
+    estimated_arrival_time = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["route", "train"]),
+            models.Index(fields=["route", "departure_time"]),
             models.Index(fields=["departure_time", "arrival_time"]),
+            models.Index(fields=["source_station", "departure_time"]),
+            models.Index(fields=["destination_station", "arrival_time"]),
         ]
         ordering = ["-departure_time"]
 
@@ -97,6 +167,11 @@ class Journey(models.Model):
             f" arrival: {self.arrival_time})"
         )
 
+    def save(self, *args, **kwargs):
+        self.source_station_id = self.route.source_id
+        self.destination_station_id = self.route.destination_id
+        super().save(*args, **kwargs)
+
 
 class Crew(models.Model):
     first_name = models.CharField(max_length=100)
@@ -122,14 +197,23 @@ class Crew(models.Model):
 
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    confirmation_sent_at = models.DateTimeField(null=True, blank=True)
+    # Indexed by (user, created_at, id), which serves the order history.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False
+    )
 
     class Meta:
-        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["user", "created_at", "id"])]
+        ordering = ["-created_at", "-id"]
 
     def __str__(self):
         return f"Order: {self.created_at}"
 
+    def all_tickets(self) -> list:
+        """Tickets including the archived ones (ArchivedTicket)."""
+        return [*self.tickets.all(), *self.archived_tickets.all()]
+
 
 class Ticket(models.Model):
     cargo = models.IntegerField(validators=[MinValueValidator(1)])
@@ -138,6 +222,8 @@ class Ticket(models.Model):
         Journey, on_delete=models.CASCADE, related_name="tickets"
     )
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="tickets")
+    # Fare at the time of purchase.
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
     class Meta:
         verbose_name_plural = "tickets"
@@ -180,3 +266,124 @@ class Ticket(models.Model):
         return super(Ticket, self).save(
             force_insert, force_update, using, update_fields
         )
+
+
+class TicketScan(models.Model):
+    """The first gate scan of a ticket: any later scan of it is a duplicate use."""
+
+    # No database constraint: archived tickets keep their scan, and a refunded
+    # ticket's id is never reused.
+    ticket = models.OneToOneField(
+        Ticket,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="scan",
+    )
+    gate = models.CharField(max_length=64, blank=True)
+    scanned_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Ticket {self.ticket_id} scanned at {self.gate} ({self.scanned_at})"
+
+
+class ArchivedJourney(models.Model):
+    """A completed Journey moved out of the hot table (see railway_station.archive)."""
+
+    id = models.BigIntegerField(primary_key=True)
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="archived_journeys"
+    )
+    train = models.ForeignKey(
+        Train, on_delete=models.CASCADE, related_name="archived_journeys"
+    )
+    departure_time = models.DateTimeField()
+    arrival_time = models.DateTimeField()
+    crew = models.ManyToManyField(Crew, related_name="archived_journeys")
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["departure_time"])]
+        ordering = ["-departure_time"]
+
+    def __str__(self):
+        return (
+            f"Archived journey: {self.route}"
+            f" (departure: {self.departure_time}, arrival: {self.arrival_time})"
+        )
+
+
+class ArchivedTicket(models.Model):
+    """A Ticket of an ArchivedJourney, still listed in its order."""
+
+    id = models.BigIntegerField(primary_key=True)
+    cargo = models.IntegerField()
+    seat = models.IntegerField()
+    journey = models.ForeignKey(
+        ArchivedJourney, on_delete=models.CASCADE, related_name="tickets"
+    )
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="archived_tickets"
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        ordering = ["seat"]
+
+    def __str__(self):
+        return f"{self.journey} - seat: {self.seat}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a request sent with an Idempotency-Key header, replayed to
+    retries of the same user and key until IDEMPOTENCY_KEY_TTL_SECONDS pass.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    # The response as rendered for the original request.
+    response_content = models.BinaryField(default=b"")
+    content_type = models.CharField(max_length=255, default="")
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"Idempotency key: {self.key} ({self.status_code})"
+
+
+class Job(models.Model):
+    """
+    Background job, claimed by `manage.py run_workers` (see railway_station.jobs).
+    Deleted once it succeeds.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"Job: {self.name} #{self.id} ({self.status})"
@@ -0,0 +1,180 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset) -> int | None:
+    """
+    The planner's row estimate for `queryset`: pg_class.reltuples for a whole
+    table, the EXPLAIN row estimate when filtered. None when there is none.
+    """
+    if not isinstance(queryset, QuerySet):
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.is_sliced:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            estimate = cursor.fetchone()[0]
+            # -1: the table was never analyzed.
+            return estimate if estimate >= 0 else None
+        sql, params = query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator reporting the planner's row estimate instead of running COUNT(*)
+    once the estimate reaches APPROXIMATE_COUNT_THRESHOLD, so paging a huge
+    table does not scan all of it. Smaller results keep exact counts.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.APPROXIMATE_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """
+    Page-number pagination over ApproximateCountPaginator, enabled per request
+    with ?page_size= so unpaginated responses keep their shape.
+    """
+
+    django_paginator_class = ApproximateCountPaginator
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if isinstance(queryset, QuerySet) and not queryset.ordered:
+            # Pages of an unordered query may overlap.
+            queryset = queryset.order_by("pk")
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response_schema(self, schema):
+        # Lists are only paginated when ?page_size= is given.
+        return {"oneOf": [schema, super().get_paginated_response_schema(schema)]}
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first pages over the `ordering` columns (unique together), each
+    continuing below the last row of the previous one:
+    created_at <= %s AND (created_at < %s OR id < %s). With an index on those
+    columns a deep page costs the same as the first, unlike OFFSET.
+
+    Enabled per request with ?page_size=, continued with the `next` link.
+    """
+
+    ordering = ("created_at", "id")
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_size_query_param not in request.query_params:
+            return None
+        try:
+            self.page_size = int(request.query_params[self.page_size_query_param])
+        except ValueError:
+            self.page_size = 0
+        if self.page_size < 1:
+            raise ValidationError({self.page_size_query_param: "Invalid page size."})
+        self.page_size = min(self.page_size, self.max_page_size)
+        self.request = request
+
+        queryset = queryset.order_by(*(f"-{field}" for field in self.ordering))
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(queryset.model, cursor))
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def after(self, model, cursor: str) -> Q:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, values, strict=True)
+            ]
+        except (binascii.Error, ValueError, TypeError, DjangoValidationError):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
+        # (a, b) < (x, y), led by a <= x: a range on the index's leading column.
+        condition = Q(**{f"{self.ordering[-1]}__lt": values[-1]})
+        for field, value in zip(self.ordering[-2::-1], values[-2::-1]):
+            condition = Q(**{f"{field}__lt": value}) | (Q(**{field: value}) & condition)
+        return Q(**{f"{self.ordering[0]}__lte": values[0]}) & condition
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = base64.urlsafe_b64encode(
+            # str() keeps microseconds, which DjangoJSONEncoder drops.
+            json.dumps(
+                [getattr(last, field) for field in self.ordering], default=str
+            ).encode()
+        ).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "oneOf": [
+                schema,
+                {
+                    "type": "object",
+                    "required": ["results"],
+                    "properties": {
+                        "next": {"type": "string", "nullable": True, "format": "uri"},
+                        "results": schema,
+                    },
+                },
+            ]
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results per page, enables pagination",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Position of the page, taken from the `next` link",
+                "schema": {"type": "string"},
+            },
+        ]
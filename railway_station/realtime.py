@@ -0,0 +1,113 @@
+"""
+Realtime delays: estimated departure and arrival times of journeys.
+
+Updates are applied in batches, each in its own short transaction; only the
+journeys whose estimates changed are written and announced afterwards.
+"""
+
+from datetime import datetime
+from functools import partial
+from typing import Iterable, NamedTuple
+
+from django.db import transaction
+from django.urls import reverse
+
+from railway_station.availability import journeys_delayed
+from railway_station.coalescing import forget_paths
+from railway_station.models import Journey
+
+# Journeys locked and updated per transaction.
+BATCH_SIZE = 1000
+
+ESTIMATED_FIELDS = ("estimated_departure_time", "estimated_arrival_time")
+
+
+class DelayUpdate(NamedTuple):
+    journey: int
+    # None: as planned.
+    departure_time: datetime | None = None
+    arrival_time: datetime | None = None
+
+
+class DelayResult(NamedTuple):
+    updated: list[int]
+    unchanged: int
+    missing: list[int]
+
+
+def apply_delays(
+    updates: Iterable[DelayUpdate], batch_size: int = BATCH_SIZE
+) -> DelayResult:
+    """
+    Store the estimated times of `updates` (the last one of a journey wins).
+    Unknown journeys are skipped and reported as missing.
+    """
+    latest = {update.journey: update for update in updates}
+    ids = sorted(latest)
+    updated, unchanged, missing = [], 0, []
+    for start in range(0, len(ids), batch_size):
+        stop = start + batch_size
+        chunk = ids[start:stop]
+        with transaction.atomic():
+            # Locked in primary key order, so concurrent ingests of
+            # overlapping batches cannot deadlock.
+            current = {
+                pk: (departure, arrival)
+                for pk, departure, arrival in Journey.objects.select_for_update()
+                .filter(pk__in=chunk)
+                .order_by("pk")
+                .values_list("pk", *ESTIMATED_FIELDS)
+            }
+            changed = []
+            for pk in chunk:
+                update = latest[pk]
+                if pk not in current:
+                    missing.append(pk)
+                elif current[pk] == (update.departure_time, update.arrival_time):
+                    unchanged += 1
+                else:
+                    changed.append(update)
+            if changed:
+                Journey.objects.bulk_update(
+                    [
+                        Journey(
+                            pk=update.journey,
+                            estimated_departure_time=update.departure_time,
+                            estimated_arrival_time=update.arrival_time,
+                        )
+                        for update in changed
+                    ],
+                    ESTIMATED_FIELDS,
+                )
+                transaction.on_commit(partial(_delays_changed, changed))
+        updated.extend(update.journey for update in changed)
+    return DelayResult(updated, unchanged, missing)
+
+
+def _delays_changed(updates: list[DelayUpdate]) -> None:
+    """
+    Refresh what was derived from the changed journeys only: their seat
+    streams in every process, and their coalesced detail responses in this
+    one (see forget_paths). Boards and journey search read the rows directly.
+    """
+    forget_paths(
+        {
+            reverse("railway_station:journey-detail", args=[update.journey])
+            for update in updates
+        }
+    )
+    journeys_delayed(
+        [
+            {
+                "journey": update.journey,
+                "type": "delayed",
+                "estimated_departure_time": isoformat(update.departure_time),
+                "estimated_arrival_time": isoformat(update.arrival_time),
+            }
+            for update in updates
+        ]
+    )
+
+
+def isoformat(value: datetime | None) -> str | None:
+    return None if value is None else value.isoformat()
@@ -0,0 +1,64 @@
+import datetime
+import decimal
+import uuid
+
+import cbor2
+import msgpack
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+
+def to_builtin(obj):
+    """Convert values neither MessagePack nor CBOR encode natively (like DRF's JSONEncoder)."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__iter__"):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack renderer: binary, without repeated JSON punctuation.
+    Datetimes are encoded as native MessagePack timestamps (extension type -1).
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    # Serializers hand datetime objects (not ISO strings) to this renderer.
+    native_datetimes = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, datetime=True, default=to_builtin)
+
+
+class CBORRenderer(BaseRenderer):
+    """CBOR (RFC 8949) renderer, datetimes are encoded as epoch timestamps (tag 1)."""
+
+    media_type = "application/cbor"
+    format = "cbor"
+    charset = None
+    render_style = "binary"
+    native_datetimes = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return cbor2.dumps(
+            data,
+            datetime_as_timestamp=True,
+            default=lambda encoder, value: encoder.encode(to_builtin(value)),
+        )
@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+from django.db import connection
+
+from railway_station.models import Ticket, TicketScan
+from railway_station.tokens import InvalidToken, signing_key, verify_token
+
+VALID = "valid"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+
+
+class Scan(NamedTuple):
+    token: str
+    scanned_at: datetime
+    gate: str = ""
+
+
+def _first_scans(scans: list[tuple[int, Scan]]) -> dict[int, tuple]:
+    """
+    Record the scans of (ticket, scan) pairs, the earliest per ticket, unless
+    the ticket was scanned before. One statement for the whole batch:
+    existing ticket id -> (inserted now, first scan time, first scan gate).
+    """
+    ticket_table = Ticket._meta.db_table
+    scan_table = TicketScan._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"WITH inserted AS ("
+            f" INSERT INTO {scan_table} (ticket_id, gate, scanned_at, received_at)"
+            " SELECT scan.ticket_id, scan.gate, scan.scanned_at, now()"
+            " FROM unnest(%s::bigint[], %s::varchar[], %s::timestamptz[])"
+            " WITH ORDINALITY AS scan (ticket_id, gate, scanned_at, position)"
+            f" JOIN {ticket_table} AS ticket ON ticket.id = scan.ticket_id"
+            " ORDER BY scan.scanned_at, scan.position"
+            " ON CONFLICT (ticket_id) DO NOTHING"
+            " RETURNING ticket_id, gate, scanned_at)"
+            " SELECT ticket.id, inserted.ticket_id IS NOT NULL,"
+            " coalesce(inserted.scanned_at, earlier.scanned_at),"
+            " coalesce(inserted.gate, earlier.gate)"
+            f" FROM {ticket_table} AS ticket"
+            " LEFT JOIN inserted ON inserted.ticket_id = ticket.id"
+            f" LEFT JOIN {scan_table} AS earlier ON earlier.ticket_id = ticket.id"
+            " WHERE ticket.id = ANY(%s)",
+            [
+                [ticket for ticket, _ in scans],
+                [scan.gate for _, scan in scans],
+                [scan.scanned_at for _, scan in scans],
+                list({ticket for ticket, _ in scans}),
+            ],
+        )
+        first_scans = {row[0]: row[1:] for row in cursor.fetchall()}
+    # A concurrent batch that scanned a ticket first made the insert skip it,
+    # but committed after the statement's snapshot: read its scan again.
+    raced = [
+        ticket
+        for ticket, (inserted, scanned_at, _) in first_scans.items()
+        if not inserted and scanned_at is None
+    ]
+    for ticket, scanned_at, gate in TicketScan.objects.filter(
+        ticket_id__in=raced
+    ).values_list("ticket_id", "scanned_at", "gate"):
+        first_scans[ticket] = (False, scanned_at, gate)
+    return first_scans
+
+
+def record_scans(scans: Iterable[Scan]) -> list[dict]:
+    """
+    Verify and record a batch of gate scans, returning a result per scan in
+    order: valid for the first use of a ticket, duplicate for any other
+    (with the first use), invalid for bad or expired tokens and unknown for
+    tickets refunded or archived since.
+    """
+    key = signing_key()
+    results, verified = [], []
+    for position, scan in enumerate(scans):
+        try:
+            claims = verify_token(scan.token, scan.scanned_at, key)
+        except InvalidToken as error:
+            results.append({"status": INVALID, "detail": str(error)})
+            continue
+        results.append({"status": UNKNOWN, "ticket": claims.ticket})
+        verified.append((position, claims.ticket, scan))
+    if not verified:
+        return results
+
+    first_scans = _first_scans([(ticket, scan) for _, ticket, scan in verified])
+    # The earliest scan of a ticket in the batch is the one recorded.
+    verified.sort(key=lambda item: (item[2].scanned_at, item[0]))
+    accepted = set()
+    for position, ticket, scan in verified:
+        if ticket not in first_scans:
+            continue
+        inserted, first_scanned_at, first_gate = first_scans[ticket]
+        if inserted and ticket not in accepted:
+            accepted.add(ticket)
+            results[position]["status"] = VALID
+        else:
+            results[position].update(
+                status=DUPLICATE,
+                first_scanned_at=first_scanned_at,
+                first_gate=first_gate,
+            )
+    return results
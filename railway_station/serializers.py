@@ -1,6 +1,10 @@
 from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 
+from railway_station.fares import fare_matrix
+from railway_station.filters import query_param_list
 from railway_station.models import (
     Crew,
     Journey,
@@ -11,16 +15,97 @@ from railway_station.models import (
     Train,
     TrainType,
 )
+from railway_station.tokens import issue_token
 
 
-class TrainTypeSerializer(serializers.ModelSerializer):
+def renders_native_datetimes(context: dict) -> bool:
+    """Whether the negotiated renderer encodes datetimes natively (MessagePack, CBOR)."""
+    renderer = getattr(context.get("request"), "accepted_renderer", None)
+    return getattr(renderer, "native_datetimes", False)
+
+
+def context_fare_matrix(context: dict):
+    """The FareMatrix for the whole request, so the fare version is checked once."""
+    if "fare_matrix" not in context:
+        context["fare_matrix"] = fare_matrix()
+    return context["fare_matrix"]
+
+
+# Formats prices the way a DecimalField of Ticket.price does.
+PRICE_FIELD = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class NativeDateTimeField(serializers.DateTimeField):
+    """DateTimeField handing datetime objects to binary renderers, ISO 8601 strings to the rest."""
+
+    def to_representation(self, value):
+        if value and renders_native_datetimes(self.context):
+            return self.enforce_timezone(value)
+        return super().to_representation(value)
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields=a,b keeps only the listed fields of the top-level serializer.
+    ?expand=x,y nests only the listed `expandable_fields`, the other
+    expandable relations are returned as ids. Without the parameters (and
+    for writes) the output is unchanged.
+    """
+
+    # Nested by default, switched to ids by ?expand= when not listed.
+    expandable_fields = ()
+    # SerializerMethodField name -> lookups it reads, for queryset pushdown.
+    # For a nested list, further relations it reads with the same serializer.
+    method_field_sources = {}
+
+    def _is_top_level(self) -> bool:
+        return self.parent is None or (
+            isinstance(self.parent, serializers.ListSerializer)
+            and self.parent.parent is None
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if (
+            request is None
+            or request.method not in ("GET", "HEAD", "OPTIONS")
+            or not self._is_top_level()
+        ):
+            return fields
+
+        expand = query_param_list(request, "expand")
+        if expand is not None:
+            unknown = set(expand) - set(self.expandable_fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {"expand": f"Cannot expand: {', '.join(sorted(unknown))}."}
+                )
+            for name in self.expandable_fields:
+                if name in fields and name not in expand:
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        read_only=True, source=fields[name].source
+                    )
+
+        selected = query_param_list(request, "fields")
+        if selected is not None:
+            unknown = set(selected) - set(fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {"fields": f"Unknown fields: {', '.join(sorted(unknown))}."}
+                )
+            fields = {name: fields[name] for name in fields if name in selected}
+        return fields
+
+
+class TrainTypeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = TrainType
-        fields = ("id", "name")
+        fields = ("id", "name", "fare_multiplier")
 
 
-class TrainSerializer(serializers.ModelSerializer):
+class TrainSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     image = serializers.ImageField(required=False)
 
     class Meta:
@@ -52,16 +137,17 @@ class TrainListSerializer(TrainSerializer):
 
 class TrainRetrieveSerializer(TrainSerializer):
     train_type = TrainTypeSerializer()
+    expandable_fields = ("train_type",)
 
 
-class StationSerializer(serializers.ModelSerializer):
+class StationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Station
         fields = ("id", "name", "latitude", "longitude")
 
 
-class RouteSerializer(serializers.ModelSerializer):
+class RouteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Route
@@ -78,7 +164,7 @@ class RouteSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class RouteListSerializer(serializers.ModelSerializer):
+class RouteListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     source = serializers.SlugRelatedField(read_only=True, slug_field="name")
     destination = serializers.SlugRelatedField(read_only=True, slug_field="name")
 
@@ -87,11 +173,15 @@ class RouteListSerializer(serializers.ModelSerializer):
         fields = ("id", "source", "destination", "distance")
 
 
-class RouteRetrieveSerializer(serializers.ModelSerializer):
+class RouteRetrieveSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     source_name = serializers.CharField(source="source.name", read_only=True)
     destination_name = serializers.CharField(source="destination.name", read_only=True)
     source_coordinates = serializers.SerializerMethodField()
     destination_coordinates = serializers.SerializerMethodField()
+    method_field_sources = {
+        "source_coordinates": ("source.coordinates",),
+        "destination_coordinates": ("destination.coordinates",),
+    }
 
     class Meta:
         model = Route
@@ -115,21 +205,50 @@ class RouteRetrieveSerializer(serializers.ModelSerializer):
         return None
 
 
-class CrewSerializer(serializers.ModelSerializer):
+class CrewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Crew
         fields = ("id", "first_name", "last_name")
 
 
-class JourneySerializer(serializers.ModelSerializer):
+class JourneyPriceMixin(serializers.Serializer):
+    """Read-only `price` from the fare matrix: one dictionary lookup per journey."""
+
+    price = serializers.SerializerMethodField()
+    method_field_sources = {"price": ("route", "train.train_type")}
+
+    def get_price(self, obj) -> str | None:
+        price = context_fare_matrix(self.context).price(
+            obj.route_id, obj.train.train_type_id
+        )
+        if price is None:
+            return None
+        return PRICE_FIELD.to_representation(price)
+
+
+class JourneySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     crew = serializers.SlugRelatedField(
         many=True, queryset=Crew.objects.all(), slug_field="full_name", required=False
     )
+    departure_time = NativeDateTimeField()
+    arrival_time = NativeDateTimeField()
+    # Set by the realtime delay feed only.
+    estimated_departure_time = NativeDateTimeField(read_only=True)
+    estimated_arrival_time = NativeDateTimeField(read_only=True)
 
     class Meta:
         model = Journey
-        fields = ("id", "route", "train", "departure_time", "arrival_time", "crew")
+        fields = (
+            "id",
+            "route",
+            "train",
+            "departure_time",
+            "arrival_time",
+            "estimated_departure_time",
+            "estimated_arrival_time",
+            "crew",
+        )
 
     def create(self, validated_data):
         crew_data = validated_data.pop("crew", [])
@@ -145,7 +264,7 @@ class JourneySerializer(serializers.ModelSerializer):
         return instance
 
 
-class JourneyListSerializer(JourneySerializer):
+class JourneyListSerializer(JourneyPriceMixin, JourneySerializer):
     route_source = serializers.CharField(source="route.source.name", read_only=True)
     route_destination = serializers.CharField(
         source="route.destination.name", read_only=True
@@ -162,20 +281,85 @@ class JourneyListSerializer(JourneySerializer):
             "train",
             "departure_time",
             "arrival_time",
+            "estimated_departure_time",
+            "estimated_arrival_time",
             "crew_count",
+            "price",
         )
 
 
-class JourneyRetrieveSerializer(JourneySerializer):
+class JourneyRetrieveSerializer(JourneyPriceMixin, JourneySerializer):
     train = TrainRetrieveSerializer(many=False, read_only=True)
     route = RouteRetrieveSerializer(many=False, read_only=True)
     crew = serializers.SlugRelatedField(
         many=True, read_only=True, slug_field="full_name"
     )
+    expandable_fields = ("route", "train")
 
     class Meta:
         model = Journey
-        fields = ("id", "route", "train", "departure_time", "arrival_time", "crew")
+        fields = (
+            "id",
+            "route",
+            "train",
+            "departure_time",
+            "arrival_time",
+            "estimated_departure_time",
+            "estimated_arrival_time",
+            "crew",
+            "price",
+        )
+
+
+class StationBoardSerializer(serializers.ModelSerializer):
+    """A row of a station's departure or arrival board."""
+
+    source = serializers.CharField(source="source_station.name", read_only=True)
+    destination = serializers.CharField(
+        source="destination_station.name", read_only=True
+    )
+    train = serializers.SlugRelatedField(read_only=True, slug_field="name")
+    departure_time = NativeDateTimeField(read_only=True)
+    arrival_time = NativeDateTimeField(read_only=True)
+    estimated_departure_time = NativeDateTimeField(read_only=True)
+    estimated_arrival_time = NativeDateTimeField(read_only=True)
+
+    class Meta:
+        model = Journey
+        fields = (
+            "id",
+            "source",
+            "destination",
+            "train",
+            "departure_time",
+            "arrival_time",
+            "estimated_departure_time",
+            "estimated_arrival_time",
+        )
+
+
+class DelayUpdateSerializer(serializers.Serializer):
+    """Estimated times of a journey from the realtime feed, null when as planned."""
+
+    journey = serializers.IntegerField(min_value=1)
+    departure_time = serializers.DateTimeField(allow_null=True, default=None)
+    arrival_time = serializers.DateTimeField(allow_null=True, default=None)
+
+    def validate(self, attrs):
+        departure, arrival = attrs["departure_time"], attrs["arrival_time"]
+        if departure and arrival and arrival < departure:
+            raise serializers.ValidationError(
+                {"arrival_time": "Must not be before departure_time."}
+            )
+        return attrs
+
+
+class TicketScanSerializer(serializers.Serializer):
+    """A gate scan of a ticket token."""
+
+    token = serializers.CharField(max_length=128)
+    scanned_at = serializers.DateTimeField()
+    gate = serializers.CharField(max_length=64, allow_blank=True, default="")
 
 
 class TicketSerializer(serializers.ModelSerializer):
@@ -183,11 +367,30 @@ class TicketSerializer(serializers.ModelSerializer):
     destination = serializers.CharField(
         source="journey.route.destination.name", read_only=True
     )
-    journey = serializers.PrimaryKeyRelatedField(queryset=Journey.objects.all())
+    journey = serializers.PrimaryKeyRelatedField(
+        queryset=Journey.objects.select_related("train")
+    )
+    token = serializers.SerializerMethodField()
 
     class Meta:
         model = Ticket
-        fields = ("id", "cargo", "seat", "journey", "source", "destination")
+        fields = (
+            "id",
+            "cargo",
+            "seat",
+            "journey",
+            "source",
+            "destination",
+            "price",
+            "token",
+        )
+        read_only_fields = ("price",)
+
+    def get_token(self, ticket) -> str | None:
+        """Signed token for the gate scanners; none for archived tickets."""
+        if not isinstance(ticket, Ticket):
+            return None
+        return issue_token(ticket)
 
     def validate(self, attrs):
         journey = attrs.get("journey")
@@ -207,17 +410,201 @@ class TicketSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class OrderSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+class OrderTicketListSerializer(serializers.ListSerializer):
+    """Tickets of an order, followed by the archived ones of past journeys."""
+
+    def get_attribute(self, instance):
+        return instance.all_tickets()
+
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    tickets = OrderTicketListSerializer(
+        child=TicketSerializer(), read_only=False, allow_empty=False
+    )
+    created_at = NativeDateTimeField(read_only=True)
+    total = serializers.SerializerMethodField()
+    method_field_sources = {
+        "tickets": ("archived_tickets",),
+        "total": ("tickets.price", "archived_tickets.price"),
+    }
 
     class Meta:
         model = Order
-        fields = ("id", "created_at", "tickets")
+        fields = ("id", "created_at", "tickets", "total")
+
+    def get_total(self, obj) -> str | None:
+        prices = [ticket.price for ticket in obj.all_tickets()]
+        if not prices or None in prices:
+            return None
+        return PRICE_FIELD.to_representation(sum(prices))
 
     def create(self, validated_data):
+        fares = context_fare_matrix(self.context)
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
             order = Order.objects.create(**validated_data)
             for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
+                journey = ticket_data["journey"]
+                Ticket.objects.create(
+                    order=order,
+                    price=fares.price(journey.route_id, journey.train.train_type_id),
+                    **ticket_data,
+                )
             return order
+
+
+class ValuesListSerializer:
+    """
+    Read-only fast path for high-volume list actions.
+
+    Fetches exactly the needed columns with values_list() and builds plain
+    dicts, skipping the per-row field machinery of ModelSerializer. The output
+    must stay identical to `model_serializer_class`.
+    """
+
+    model_serializer_class = None
+    # output key -> ORM lookup, in output order; None for values computed in
+    # to_representation(), which must come last
+    fields = {}
+    # fetched after `fields` for computed values, not part of the output
+    hidden_fields = {}
+    annotations = {}
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, instance, context=None, fields=None):
+        self.instance = instance
+        self.context = context or {}
+        self.native_datetimes = renders_native_datetimes(self.context)
+        if fields is not None:
+            self.fields = fields
+        self.columns = [
+            key for key, lookup in self.fields.items() if lookup is not None
+        ] + list(self.hidden_fields)
+
+    @classmethod
+    def select_fields(cls, request) -> dict:
+        """The subset of `fields` requested with ?fields=, all of them by default."""
+        selected = query_param_list(request, "fields")
+        if selected is None:
+            return cls.fields
+        unknown = set(selected) - set(cls.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": f"Unknown fields: {', '.join(sorted(unknown))}."}
+            )
+        return {key: lookup for key, lookup in cls.fields.items() if key in selected}
+
+    @classmethod
+    def setup_queryset(cls, queryset, fields=None):
+        fields = cls.fields if fields is None else fields
+        if not queryset.query.order_by:
+            # Meta.ordering is not applied to GROUP BY queries (annotations).
+            queryset = queryset.order_by(*queryset.model._meta.ordering)
+        annotations = {
+            name: expression
+            for name, expression in cls.annotations.items()
+            if name in fields.values()
+        }
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .annotate(**annotations)
+            .values_list(
+                *(lookup for lookup in fields.values() if lookup is not None),
+                *cls.hidden_fields.values(),
+            )
+        )
+
+    def to_representation(self, row: tuple) -> dict:
+        return dict(zip(self.columns, row))
+
+    @property
+    def data(self) -> list[dict]:
+        return [self.to_representation(row) for row in self.instance]
+
+
+class RouteListValuesSerializer(ValuesListSerializer):
+    model_serializer_class = RouteListSerializer
+    fields = {
+        "id": "id",
+        "source": "source__name",
+        "destination": "destination__name",
+        "distance": "distance",
+    }
+
+
+class TrainListValuesSerializer(ValuesListSerializer):
+    model_serializer_class = TrainListSerializer
+    fields = {
+        "id": "id",
+        "name": "name",
+        "cargo_num": "cargo_num",
+        "place_in_cargo": "place_in_cargo",
+        "train_type": "train_type__name",
+        "image": "image",
+    }
+    image_storage = Train._meta.get_field("image").storage
+
+    def to_representation(self, row: tuple) -> dict:
+        data = dict(zip(self.columns, row))
+        if "image" not in data:
+            return data
+        if data["image"]:
+            url = self.image_storage.url(data["image"])
+            request = self.context.get("request")
+            data["image"] = request.build_absolute_uri(url) if request else url
+        else:
+            data["image"] = None
+        return data
+
+
+class JourneyListValuesSerializer(ValuesListSerializer):
+    model_serializer_class = JourneyListSerializer
+    fields = {
+        "id": "id",
+        "route_source": "route__source__name",
+        "route_destination": "route__destination__name",
+        "train": "train__name",
+        "departure_time": "departure_time",
+        "arrival_time": "arrival_time",
+        "estimated_departure_time": "estimated_departure_time",
+        "estimated_arrival_time": "estimated_arrival_time",
+        "crew_count": "crew_count",
+        "price": None,
+    }
+    hidden_fields = {"route_id": "route_id", "train_type_id": "train__train_type_id"}
+    datetime_keys = (
+        "departure_time",
+        "arrival_time",
+        "estimated_departure_time",
+        "estimated_arrival_time",
+    )
+    # A correlated subquery is only evaluated for the returned rows, while
+    # Count("crew") would group the whole (filtered) table before the LIMIT.
+    annotations = {
+        "crew_count": Coalesce(
+            Subquery(
+                Crew.journey.through.objects.filter(journey=OuterRef("pk"))
+                .values("journey")
+                .annotate(count=Count("*"))
+                .values("count"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+    }
+
+    def __init__(self, instance, context=None, fields=None):
+        super().__init__(instance, context, fields)
+        self.fare_matrix = context_fare_matrix(self.context)
+
+    def to_representation(self, row: tuple) -> dict:
+        data = dict(zip(self.columns, row))
+        price = self.fare_matrix.price(data.pop("route_id"), data.pop("train_type_id"))
+        if "price" in self.fields:
+            data["price"] = None if price is None else str(price)
+        if not self.native_datetimes:
+            for key in self.datetime_keys:
+                if key in data:
+                    data[key] = self.datetime_field.to_representation(data[key])
+        return data
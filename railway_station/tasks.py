@@ -0,0 +1,58 @@
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from railway_station.jobs import enqueue, job
+from railway_station.models import Order, Ticket
+
+# Side effects of a new order, separate jobs so each one retries on its own.
+ORDER_CREATED_JOBS = ["send_order_confirmation"]
+
+
+@job("order_created")
+def order_created(payload: dict) -> None:
+    """Fan out the order's side effects, so booking enqueues a single job."""
+    with transaction.atomic():
+        for name in ORDER_CREATED_JOBS:
+            enqueue(name, payload)
+
+
+@job("send_order_confirmation")
+def send_order_confirmation(payload: dict) -> None:
+    with transaction.atomic():
+        # The update locks the order: a second run of the job waits for this
+        # one and then finds the confirmation sent. A failed send rolls it back.
+        if not Order.objects.filter(
+            id=payload["order_id"], confirmation_sent_at__isnull=True
+        ).update(confirmation_sent_at=timezone.now()):
+            return
+        _send_order_confirmation(payload["order_id"])
+
+
+def _send_order_confirmation(order_id: int) -> None:
+    order = (
+        Order.objects.select_related("user")
+        .prefetch_related(
+            Prefetch(
+                "tickets",
+                queryset=Ticket.objects.select_related(
+                    "journey__route__source", "journey__route__destination"
+                ),
+            )
+        )
+        .get(id=order_id)
+    )
+    lines = [
+        f"{ticket.journey.route.source.name} - "
+        f"{ticket.journey.route.destination.name}, "
+        f"{ticket.journey.departure_time:%Y-%m-%d %H:%M}, "
+        f"cargo {ticket.cargo}, seat {ticket.seat}"
+        for ticket in order.tickets.all()
+    ]
+    send_mail(
+        subject=f"Order #{order.id} confirmation",
+        message="Your tickets:\n" + "\n".join(lines),
+        from_email=None,
+        recipient_list=[order.user.email],
+    )
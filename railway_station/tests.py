@@ -1,8 +1,47 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import cbor2
+import msgpack
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.utils.timezone import make_aware
 from rest_framework import status
 
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 from django.urls import reverse
 from railway_station.models import (
     TrainType,
@@ -13,9 +52,38 @@ from railway_station.models import (
     Journey,
     Order,
     Ticket,
+    FareBand,
+    RouteFare,
+    IdempotencyKey,
+    Job,
+    ArchivedJourney,
+    ArchivedTicket,
+    TicketScan,
 )
 from django.contrib.auth import get_user_model
-from datetime import datetime
+from django.db.models import F
+from railway_station.serializers import (
+    JourneyListSerializer,
+    RouteListSerializer,
+    TrainListSerializer,
+)
+from datetime import datetime, timedelta
+
+from railway_service import metrics
+from railway_station import jobs
+from railway_station.availability import hub
+from railway_station.export import DATASETS, row_groups
+from railway_station.fares import fare_matrix
+from railway_station.coalescing import SingleFlight, flights
+from railway_station.geo import distance_matrix, haversine_km, route_distances
+from railway_station.pagination import ApproximateCountPaginator, estimate_count
+from railway_station.realtime import DelayUpdate, apply_delays
+from railway_station.scans import Scan, record_scans
+from railway_station.tokens import InvalidToken, issue_token, verify_token
+from railway_service.schema import CachedSchemaView
+from railway_service.db_routers import PrimaryReplicaRouter, use_primary
+from railway_service.middleware import ReplicaRoutingMiddleware
+from railway_service.nplusone import NPlusOneError, detect_n_plus_one, fingerprint
 
 User = get_user_model()
 
@@ -215,6 +283,32 @@ class JourneyTests(BaseTestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 401)
 
+    def test_journey_list_in_msgpack_uses_native_timestamps(self):
+        self.authenticate()
+        url = reverse("railway_station:journey-list")
+        params = {"date_from": "2025-01-01"}
+        response = self.client.get(url, params, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, 200)
+        journeys = msgpack.unpackb(response.content, timestamp=3)
+        self.assertEqual(
+            {journey["departure_time"] for journey in journeys},
+            {self.journey1.departure_time, self.journey2.departure_time},
+        )
+        self.assertLess(
+            len(response.content), len(self.client.get(url, params).content)
+        )
+
+    def test_journey_detail_in_cbor(self):
+        self.authenticate()
+        response = self.client.get(
+            reverse("railway_station:journey-detail", args=[self.journey1.id]),
+            HTTP_ACCEPT="application/cbor",
+        )
+        self.assertEqual(response.status_code, 200)
+        journey = cbor2.loads(response.content)
+        self.assertEqual(journey["arrival_time"], self.journey1.arrival_time)
+        self.assertEqual(journey["route"]["source_name"], "Station A")
+
     def test_filter_journeys_authenticated(self):
         self.authenticate()
         url = reverse("railway_station:journey-list")
@@ -230,6 +324,151 @@ class JourneyTests(BaseTestCase):
         self.assertNotIn(self.journey2.id, ids)
 
 
+class JourneySearchTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        train = Train.objects.create(
+            name="TrainA",
+            train_type=TrainType.objects.create(name="TypeA"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        self.route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        back = Route.objects.create(
+            source=self.station_b, destination=self.station_a, distance=100
+        )
+
+        def journey(route, *moment):
+            departure_time = make_aware(datetime(*moment))
+            return Journey.objects.create(
+                train=train,
+                route=route,
+                departure_time=departure_time,
+                arrival_time=departure_time + timedelta(hours=3),
+            )
+
+        self.morning = journey(self.route, 2030, 6, 1, 8, 0)
+        self.night = journey(self.route, 2030, 6, 1, 23, 30)
+        self.next_day = journey(self.route, 2030, 6, 2, 1, 0)
+        self.return_trip = journey(back, 2030, 6, 1, 9, 0)
+        self.past = journey(self.route, 2020, 6, 1, 8, 0)
+        self.authenticate()
+
+    def search(self, **params):
+        response = self.client.get(reverse("railway_station:journey-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return {journey["id"] for journey in response.json()}
+
+    def test_upcoming_journeys_by_default(self):
+        self.assertNotIn(self.past.id, self.search())
+        self.assertIn(self.past.id, self.search(date_from="2020-01-01"))
+
+    def test_search_by_station_pair_and_dates(self):
+        self.assertEqual(
+            self.search(
+                from_station=self.station_a.id,
+                to_station=self.station_b.id,
+                date_from="2030-06-01",
+                date_to="2030-06-01",
+            ),
+            {self.morning.id, self.night.id},
+        )
+        self.assertEqual(
+            self.search(start="2030-06-02"),
+            {self.next_day.id},
+        )
+
+    def test_time_of_day_window(self):
+        dates = {"date_from": "2030-06-01", "date_to": "2030-06-02"}
+        self.assertEqual(
+            self.search(time_from="06:00", time_to="12:00", **dates),
+            {self.morning.id, self.return_trip.id},
+        )
+        self.assertEqual(
+            self.search(time_from="22:00", time_to="02:00", **dates),
+            {self.night.id, self.next_day.id},
+        )
+        self.assertEqual(
+            self.search(time_from="22:00", time_to="02:00"),
+            {self.night.id, self.next_day.id},
+        )
+
+    def test_invalid_search_parameters(self):
+        url = reverse("railway_station:journey-list")
+        for params in (
+            {"date_from": "01.06.2030"},
+            {"from_station": "a"},
+            {"date_from": "2030-06-02", "date_to": "2030-06-01"},
+        ):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def explain_search(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            self.search(**params)
+        (sql,) = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and 'FROM "railway_station_journey"' in query["sql"]
+        ]
+        with connection.cursor() as cursor:
+            # Fresh statistics, or the plan depends on when autovacuum ran.
+            cursor.execute("ANALYZE railway_station_journey, railway_station_route")
+            # The test tables are tiny: make any usable index win over a scan.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def test_station_search_uses_route_departure_index(self):
+        # A daily journey on each of ten routes for months: neither the route
+        # nor the dates alone narrow the search, both together do.
+        routes = [self.route] + [
+            Route.objects.create(
+                source=Station.objects.create(
+                    name=f"Station {index}", latitude=50, longitude=30
+                ),
+                destination=self.station_b,
+                distance=100,
+            )
+            for index in range(9)
+        ]
+        Journey.objects.bulk_create(
+            Journey(
+                train=self.morning.train,
+                route=route,
+                source_station_id=route.source_id,
+                destination_station_id=route.destination_id,
+                departure_time=self.morning.departure_time + timedelta(days=day),
+                arrival_time=self.morning.arrival_time + timedelta(days=day),
+            )
+            for route in routes
+            for day in range(-50, 50)
+        )
+        plan = self.explain_search(
+            from_station=self.station_a.id,
+            to_station=self.station_b.id,
+            date_from="2030-06-01",
+            date_to="2030-06-07",
+            time_from="06:00",
+            time_to="12:00",
+        )
+        index_name = next(
+            index.name
+            for index in Journey._meta.indexes
+            if index.fields == ["route", "departure_time"]
+        )
+        self.assertIn(index_name, plan)
+        self.assertNotIn("Seq Scan on railway_station_journey", plan)
+
+    def test_date_search_uses_departure_index(self):
+        plan = self.explain_search(start="2030-06-01")
+        self.assertNotIn("Seq Scan on railway_station_journey", plan)
+        self.assertIn("Index", plan)
+
+
 class OrderTests(BaseTestCase):
     def setUp(self):
         super().setUp()
@@ -271,6 +510,22 @@ class OrderTests(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_list_orders_query_count_does_not_scale_with_tickets(self):
+        for seat in range(2, 10):
+            journey = Journey.objects.create(
+                train=self.train,
+                route=Route.objects.create(
+                    source=self.station_a, destination=self.station_b, distance=seat
+                ),
+                departure_time=self.journey.departure_time,
+                arrival_time=self.journey.arrival_time,
+            )
+            Ticket.objects.create(cargo=1, seat=seat, journey=journey, order=self.order)
+        self.authenticate()
+        response = self.client.get(reverse("railway_station:order-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data[0]["tickets"]), 9)
+
     def test_unauthenticated_user_cannot_list_orders(self):
         url = reverse("railway_station:order-list")
         response = self.client.get(url)
@@ -285,6 +540,27 @@ class OrderTests(BaseTestCase):
         self.assertEqual(Order.objects.count(), 2)
         self.assertEqual(Ticket.objects.count(), 2)
 
+    def test_admin_can_create_order_with_msgpack(self):
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse("railway_station:order-list")
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": seat, "journey": self.journey.id}
+                for seat in (5, 6, 7)
+            ]
+        }
+        response = self.client.post(
+            url,
+            msgpack.packb(payload),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        order = msgpack.unpackb(response.content, timestamp=3)
+        self.assertEqual(len(order["tickets"]), 3)
+        self.assertIsInstance(order["created_at"], datetime)
+
     def test_admin_create_order_with_invalid_seat(self):
         self.client.force_authenticate(user=self.admin_user)
         url = reverse("railway_station:order-list")
@@ -300,3 +576,2069 @@ class OrderTests(BaseTestCase):
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("cargo", str(response.data))
+
+    def post_order(self, key, seat=2, **headers):
+        return self.client.post(
+            reverse("railway_station:order-list"),
+            {"tickets": [{"cargo": 1, "seat": seat, "journey": self.journey.id}]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+            **headers,
+        )
+
+    def test_idempotency_key_replays_response(self):
+        self.client.force_authenticate(user=self.admin_user)
+        first = self.post_order("order-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            retry = self.post_order("order-1")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.filter(user=self.admin_user).count(), 1)
+
+    def test_idempotency_key_replays_binary_response_as_is(self):
+        self.client.force_authenticate(user=self.admin_user)
+        first = self.post_order("order-1", HTTP_ACCEPT="application/msgpack")
+        retry = self.post_order("order-1", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry["Content-Type"], "application/msgpack")
+        self.assertEqual(retry.content, first.content)
+        order = msgpack.unpackb(retry.content, timestamp=3)
+        self.assertIsInstance(order["created_at"], datetime)
+
+        response = self.post_order("order-1", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+        self.assertEqual(Order.objects.filter(user=self.admin_user).count(), 1)
+
+    def test_idempotency_key_reused_with_other_request(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.post_order("order-1")
+        response = self.post_order("order-1", seat=3)
+        self.assertEqual(response.status_code, 422)
+
+    def test_failed_request_can_be_retried_with_same_key(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertEqual(self.post_order("order-1", seat=99).status_code, 400)
+        self.assertEqual(self.post_order("order-1", seat=3).status_code, 201)
+
+    def test_expired_idempotency_key_is_reused(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.post_order("order-1")
+        with override_settings(IDEMPOTENCY_KEY_TTL_SECONDS=-1):
+            response = self.post_order("order-1", seat=3)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertNotIn("Idempotent-Replayed", response)
+            call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class IdempotencyConcurrencyTests(TransactionTestCase):
+    def test_concurrent_duplicates_create_one_order(self):
+        user = User.objects.create_user(email="admin@example.com", password="x")
+        user.is_staff = True
+        user.save()
+        train = Train.objects.create(
+            name="T-1",
+            train_type=TrainType.objects.create(name="Express"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        station_a = Station.objects.create(name="A", latitude=50, longitude=30)
+        station_b = Station.objects.create(name="B", latitude=51, longitude=31)
+        journey = Journey.objects.create(
+            train=train,
+            route=Route.objects.create(
+                source=station_a, destination=station_b, distance=100
+            ),
+            departure_time=make_aware(datetime(2030, 5, 20, 8, 0)),
+            arrival_time=make_aware(datetime(2030, 5, 20, 10, 0)),
+        )
+        barrier = threading.Barrier(4)
+        responses = []
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(user=user)
+            barrier.wait()
+            try:
+                responses.append(
+                    client.post(
+                        reverse("railway_station:order-list"),
+                        {"tickets": [{"cargo": 1, "seat": 1, "journey": journey.id}]},
+                        format="json",
+                        HTTP_IDEMPOTENCY_KEY="same-order",
+                    )
+                )
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([response.status_code for response in responses], [201] * 4)
+        self.assertEqual(len({response.json()["id"] for response in responses}), 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class AvailabilityStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", password="x")
+        self.order = Order.objects.create(user=self.user)
+        self.journey = Journey.objects.create(
+            train=Train.objects.create(
+                name="T-1",
+                train_type=TrainType.objects.create(name="Express"),
+                cargo_num=2,
+                place_in_cargo=10,
+            ),
+            route=Route.objects.create(
+                source=Station.objects.create(name="A", latitude=50, longitude=30),
+                destination=Station.objects.create(name="B", latitude=51, longitude=31),
+                distance=100,
+            ),
+            departure_time=make_aware(datetime(2030, 5, 20, 8, 0)),
+            arrival_time=make_aware(datetime(2030, 5, 20, 10, 0)),
+        )
+        Ticket.objects.create(cargo=1, seat=1, journey=self.journey, order=self.order)
+        self.url = reverse(
+            "railway_station:journey-availability-stream", args=[self.journey.id]
+        )
+
+    @staticmethod
+    def parse(chunk: bytes) -> tuple[str, dict]:
+        lines = dict(
+            line.split(": ", 1) for line in chunk.decode().strip().splitlines()
+        )
+        return lines["event"], json.loads(lines["data"])
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_is_not_served_over_wsgi(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    async def test_streams_seat_changes(self):
+        response = await AsyncClient().get(
+            self.url,
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+
+        async def next_event():
+            return self.parse(await asyncio.wait_for(anext(events), timeout=5))
+
+        self.assertEqual(
+            await next_event(),
+            (
+                "snapshot",
+                {
+                    "journey": self.journey.id,
+                    "capacity": 20,
+                    "available": 19,
+                    "taken": [[1, 1]],
+                    "estimated_departure_time": None,
+                    "estimated_arrival_time": None,
+                },
+            ),
+        )
+
+        ticket = await sync_to_async(Ticket.objects.create)(
+            cargo=2, seat=5, journey=self.journey, order=self.order
+        )
+        self.assertEqual(
+            await next_event(), ("sold", {"cargo": 2, "seat": 5, "available": 18})
+        )
+
+        await sync_to_async(ticket.delete)()
+        self.assertEqual(
+            await next_event(), ("released", {"cargo": 2, "seat": 5, "available": 19})
+        )
+
+        delayed = make_aware(datetime(2030, 5, 20, 8, 25))
+        await sync_to_async(apply_delays)([DelayUpdate(self.journey.id, delayed)])
+        self.assertEqual(
+            await next_event(),
+            (
+                "delayed",
+                {
+                    "estimated_departure_time": delayed.isoformat(),
+                    "estimated_arrival_time": None,
+                },
+            ),
+        )
+        # A disconnecting client cancels the pending read, closing the stream.
+        reading = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        reading.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reading
+        await asyncio.to_thread(hub.wait_stopped, 5)
+
+
+class ApproximateCountPaginationTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        Station.objects.bulk_create(
+            Station(name=f"Station {index}", latitude=50, longitude=30)
+            for index in range(30)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE railway_station_station")
+
+    def count_queries(self, paginator) -> tuple[int, list[str]]:
+        with CaptureQueriesContext(connection) as queries:
+            count = paginator.count
+        return count, [query["sql"] for query in queries]
+
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=10)
+    def test_large_tables_use_the_planner_estimate(self):
+        count, queries = self.count_queries(
+            ApproximateCountPaginator(Station.objects.order_by("id"), 10)
+        )
+        self.assertEqual(count, 32)
+        self.assertIn("reltuples", queries[0])
+        self.assertFalse(any("COUNT(" in query for query in queries))
+
+        count, queries = self.count_queries(
+            ApproximateCountPaginator(
+                Station.objects.filter(latitude=50).order_by("id"), 10
+            )
+        )
+        self.assertEqual(count, estimate_count(Station.objects.filter(latitude=50)))
+        self.assertTrue(queries[0].startswith("EXPLAIN"))
+        self.assertFalse(any("COUNT(" in query for query in queries))
+
+    def test_small_results_are_counted_exactly(self):
+        count, queries = self.count_queries(
+            ApproximateCountPaginator(Station.objects.order_by("id"), 10)
+        )
+        self.assertEqual(count, 32)
+        self.assertIn("COUNT(", queries[-1])
+
+    def test_api_lists_paginate_on_request(self):
+        self.authenticate()
+        url = reverse("railway_station:station-list")
+        self.assertEqual(len(self.client.get(url).data), 32)
+
+        response = self.client.get(url, {"page_size": 5, "page": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 32)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_admin_changelists_run_constant_queries(self):
+        admin = User.objects.create_superuser(email="admin@example.com", password="x")
+        self.client.force_login(admin)
+        journey = Journey.objects.create(
+            train=Train.objects.create(
+                name="T-1",
+                train_type=TrainType.objects.create(name="Express"),
+                cargo_num=9,
+                place_in_cargo=50,
+            ),
+            route=Route.objects.create(
+                source=self.station_a, destination=self.station_b, distance=100
+            ),
+            departure_time=make_aware(datetime(2030, 5, 20, 8, 0)),
+            arrival_time=make_aware(datetime(2030, 5, 20, 10, 0)),
+        )
+        order = Order.objects.create(user=self.user)
+
+        def changelist_queries(model: str) -> int:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    reverse(f"admin:railway_station_{model}_changelist")
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        Ticket.objects.create(cargo=1, seat=1, journey=journey, order=order)
+        queries = {model: changelist_queries(model) for model in ("ticket", "journey")}
+        for seat in range(2, 6):
+            Ticket.objects.create(cargo=1, seat=seat, journey=journey, order=order)
+            Journey.objects.create(
+                train=journey.train,
+                route=journey.route,
+                departure_time=journey.departure_time,
+                arrival_time=journey.arrival_time,
+            )
+        for model, expected in queries.items():
+            self.assertEqual(changelist_queries(model), expected)
+
+
+class OrderHistoryTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate()
+        train = Train.objects.create(
+            name="T-1",
+            train_type=TrainType.objects.create(name="Express"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        self.journeys = [
+            Journey.objects.create(
+                train=train,
+                route=route,
+                departure_time=make_aware(datetime(2030, 5, day, 8, 0)),
+                arrival_time=make_aware(datetime(2030, 5, day, 10, 0)),
+            )
+            for day in (20, 21)
+        ]
+        self.orders = []
+        for day, seats in ((1, (1, 2)), (2, (3,)), (2, (4,)), (3, (5,)), (4, (6,))):
+            order = Order.objects.create(user=self.user)
+            Order.objects.filter(id=order.id).update(
+                created_at=make_aware(datetime(2025, 5, day, 12, 0))
+            )
+            for seat in seats:
+                Ticket.objects.create(
+                    cargo=1,
+                    seat=seat,
+                    journey=self.journeys[seat % 2],
+                    order=order,
+                )
+            self.orders.append(order)
+
+    def order_ids(self, **params) -> list[int]:
+        response = self.client.get(reverse("railway_station:order-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [order["id"] for order in response.data]
+
+    def test_filter_by_creation_range(self):
+        ids = [order.id for order in self.orders]
+        self.assertEqual(
+            self.order_ids(created_from="2025-05-02", created_to="2025-05-03"),
+            [ids[3], ids[2], ids[1]],
+        )
+        self.assertEqual(self.order_ids(created_to="2025-05-01"), [ids[0]])
+        response = self.client.get(
+            reverse("railway_station:order-list"),
+            {"created_from": "2025-05-03", "created_to": "2025-05-02"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_travel_date(self):
+        ids = [order.id for order in self.orders]
+        # The first order has a ticket on each day, it is listed once.
+        self.assertEqual(
+            self.order_ids(travel_date="2030-05-20"), [ids[4], ids[2], ids[0]]
+        )
+        self.assertEqual(
+            self.order_ids(travel_date="2030-05-21"), [ids[3], ids[1], ids[0]]
+        )
+
+    def test_keyset_pages(self):
+        url = reverse("railway_station:order-list")
+        pages, params = [], {"page_size": 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([order["id"] for order in response.data["results"]])
+            url, params = response.data["next"], None
+        self.assertEqual(
+            pages,
+            [
+                [self.orders[4].id, self.orders[3].id],
+                [self.orders[2].id, self.orders[1].id],
+                [self.orders[0].id],
+            ],
+        )
+
+        response = self.client.get(
+            reverse("railway_station:order-list"), {"page_size": 2, "cursor": "x"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keyset_page_uses_user_created_at_index(self):
+        response = self.client.get(
+            reverse("railway_station:order-list"), {"page_size": 2}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data["next"])
+        (sql,) = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "railway_station_order"')
+        ]
+        with connection.cursor() as cursor:
+            # Tiny table: rule out the scans a real history would not use.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("railway_sta_user_id_dc3438_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+
+class ArchiveTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.train = Train.objects.create(
+            name="T-1",
+            train_type=TrainType.objects.create(name="Express"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        self.route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        self.crew = Crew.objects.create(first_name="Ivan", last_name="Petrenko")
+        self.order = Order.objects.create(user=self.user)
+        now = timezone.now()
+        self.past = [
+            self.create_journey(now - timedelta(days=days)) for days in (90, 60, 40)
+        ]
+        self.recent = self.create_journey(now - timedelta(days=2))
+        for seat, journey in enumerate([*self.past, self.recent], start=1):
+            journey.crew.add(self.crew)
+            Ticket.objects.create(
+                cargo=1, seat=seat, journey=journey, order=self.order, price=10
+            )
+
+    def create_journey(self, departure_time):
+        return Journey.objects.create(
+            train=self.train,
+            route=self.route,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=2),
+        )
+
+    def test_completed_journeys_move_in_batches(self):
+        call_command("archive_journeys", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(list(Journey.objects.all()), [self.recent])
+        self.assertEqual(
+            sorted(ArchivedJourney.objects.values_list("id", flat=True)),
+            sorted(journey.id for journey in self.past),
+        )
+        self.assertEqual(
+            list(self.crew.archived_journeys.order_by("id")),
+            list(ArchivedJourney.objects.order_by("id")),
+        )
+        self.assertEqual(list(self.crew.journey.all()), [self.recent])
+        self.assertEqual(
+            list(ArchivedTicket.objects.values_list("seat", "journey_id")),
+            [(seat, journey.id) for seat, journey in enumerate(self.past, start=1)],
+        )
+        self.assertEqual(list(self.order.tickets.values_list("seat", flat=True)), [4])
+
+    def test_archived_orders_stay_readable(self):
+        call_command("archive_journeys", stdout=StringIO())
+        self.authenticate()
+
+        response = self.client.get(reverse("railway_station:order-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tickets = response.data[0]["tickets"]
+        self.assertEqual([ticket["seat"] for ticket in tickets], [4, 1, 2, 3])
+        self.assertEqual(tickets[1]["journey"], self.past[0].id)
+        self.assertEqual(tickets[1]["source"], "Station A")
+        self.assertEqual(response.data[0]["total"], "40.00")
+
+        response = self.client.get(
+            reverse("railway_station:order-list"), {"fields": "id,tickets,total"}
+        )
+        self.assertEqual(len(response.data[0]["tickets"]), 4)
+        self.assertEqual(response.data[0]["total"], "40.00")
+
+
+class RouteDistanceTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.station_c = Station.objects.create(
+            name="Station C", latitude=49.8397, longitude=24.0297
+        )
+        self.route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=132
+        )
+        self.wrong_route = Route.objects.create(
+            source=self.station_a, destination=self.station_c, distance=100
+        )
+
+    def test_haversine(self):
+        # Kyiv - Lviv.
+        self.assertAlmostEqual(
+            float(haversine_km(50.4501, 30.5234, 49.8397, 24.0297)), 467.5, delta=0.5
+        )
+        matrix = distance_matrix([[50.0, 30.0], [51.0, 31.0]], [[51.0, 31.0]])
+        self.assertEqual(matrix.shape, (2, 1))
+        self.assertAlmostEqual(matrix[0, 0], 131.8, delta=0.1)
+        self.assertEqual(matrix[1, 0], 0)
+
+    def test_command_audits_and_fixes_distances(self):
+        out = StringIO()
+        call_command("route_distances", stdout=out)
+        self.assertIn(f"Route {self.wrong_route.id}: 100 km stored", out.getvalue())
+        self.assertNotIn(f"Route {self.route.id}:", out.getvalue())
+        self.wrong_route.refresh_from_db()
+        self.assertEqual(self.wrong_route.distance, 100)
+
+        call_command("route_distances", fix=True, stdout=StringIO())
+        self.wrong_route.refresh_from_db()
+        self.assertAlmostEqual(self.wrong_route.distance, 430, delta=5)
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.distance, 132)
+
+    def test_distance_matrix_endpoint(self):
+        self.authenticate()
+        url = reverse("railway_station:station-distances")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.get(url, {"target": "x"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+        response = self.client.get(
+            url,
+            {
+                "station": f"{self.station_a.id},{self.station_c.id}",
+                "target": f"{self.station_b.id},{self.station_a.id}",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["sources"], [self.station_a.id, self.station_c.id])
+        self.assertEqual(data["targets"], [self.station_a.id, self.station_b.id])
+        self.assertEqual(data["distances"][0], [0.0, 131.8])
+        self.assertEqual(len(data["distances"][1]), 2)
+
+
+class StationBoardTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        train_type = TrainType.objects.create(name="Intercity")
+        self.train = Train.objects.create(
+            name="IC-1", cargo_num=5, place_in_cargo=50, train_type=train_type
+        )
+        self.route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        now = timezone.now()
+        self.past = self.create_journey(now - timedelta(hours=3))
+        self.later = self.create_journey(now + timedelta(hours=5))
+        self.sooner = self.create_journey(now + timedelta(hours=1))
+
+    def create_journey(self, departure_time):
+        return Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=2),
+        )
+
+    def board(self, name, station, **params):
+        url = reverse(f"railway_station:station-{name}", args=[station.id])
+        return self.client.get(url, params)
+
+    def test_journeys_copy_route_stations(self):
+        self.assertEqual(self.sooner.source_station, self.station_a)
+        self.assertEqual(self.sooner.destination_station, self.station_b)
+
+        self.route.source = self.station_b
+        self.route.destination = self.station_a
+        self.route.save()
+        self.sooner.refresh_from_db()
+        self.assertEqual(self.sooner.source_station, self.station_b)
+        self.assertEqual(self.sooner.destination_station, self.station_a)
+
+    def test_departures_and_arrivals(self):
+        self.authenticate()
+        response = self.board("departures", self.station_a)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [journey["id"] for journey in response.json()],
+            [self.sooner.id, self.later.id],
+        )
+        self.assertEqual(response.json()[0]["destination"], "Station B")
+        self.assertEqual(response.json()[0]["train"], "IC-1")
+        self.assertEqual(self.board("departures", self.station_b).json(), [])
+
+        arrivals = self.board("arrivals", self.station_b, limit=1).json()
+        self.assertEqual([journey["id"] for journey in arrivals], [self.sooner.id])
+        since = (self.past.departure_time - timedelta(minutes=1)).isoformat()
+        arrivals = self.board("arrivals", self.station_b, since=since).json()
+        self.assertEqual(len(arrivals), 3)
+
+    @override_settings(TIME_ZONE="Europe/Kyiv")
+    def test_naive_since_is_local_time(self):
+        self.authenticate()
+        since = timezone.localtime(self.past.departure_time - timedelta(minutes=1))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            departures = self.board(
+                "departures",
+                self.station_a,
+                since=since.replace(tzinfo=None).isoformat(),
+            ).json()
+        self.assertEqual(
+            [journey["id"] for journey in departures],
+            [self.past.id, self.sooner.id, self.later.id],
+        )
+
+    def test_invalid_board_requests(self):
+        self.authenticate()
+        self.assertEqual(
+            self.board("departures", self.station_a, limit=0).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.board("departures", self.station_a, since="soon").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        url = reverse("railway_station:station-departures", args=[0])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_board_scans_station_index(self):
+        # Upcoming departures every few minutes from each of twenty stations:
+        # neither the station nor the time alone narrows the board.
+        stations = [self.station_a] + [
+            Station.objects.create(name=f"Station {index}", latitude=50, longitude=30)
+            for index in range(19)
+        ]
+        Journey.objects.bulk_create(
+            Journey(
+                route=self.route,
+                train=self.train,
+                source_station=station,
+                destination_station=self.station_b,
+                departure_time=self.sooner.departure_time + timedelta(minutes=minute),
+                arrival_time=self.sooner.arrival_time + timedelta(minutes=minute),
+            )
+            for station in stations
+            for minute in range(1, 1000, 3)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE railway_station_journey")
+        journeys = Journey.objects.filter(
+            source_station=self.station_a, departure_time__gte=timezone.now()
+        ).order_by("departure_time")[:20]
+        plan = journeys.explain()
+        index_name = next(
+            index.name
+            for index in Journey._meta.indexes
+            if index.fields == ["source_station", "departure_time"]
+        )
+        self.assertIn(index_name, plan)
+        self.assertNotIn("Sort", plan)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def compute(self, result, shared=True):
+        def compute():
+            self.runs += 1
+            self.started.set()
+            self.release.wait(5)
+            return result, shared
+
+        return compute
+
+    def start_leader(self, result, shared=True, stale_seconds=0):
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(
+                self.flight.run("key", self.compute(result, shared), stale_seconds)
+            )
+        )
+        leader.start()
+        self.addCleanup(leader.join, 5)
+        self.addCleanup(self.release.set)
+        self.assertTrue(self.started.wait(5))
+        return leader, results
+
+    def test_concurrent_callers_share_one_run(self):
+        leader, results = self.start_leader("fresh")
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.flight.run("key", self.compute("other"))
+                )
+            )
+            for _ in range(5)
+        ]
+        for follower in followers:
+            follower.start()
+        self.release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+        self.assertEqual(results, ["fresh"] * 6)
+        self.assertEqual(self.runs, 1)
+
+    def test_stale_result_is_served_while_revalidating(self):
+        self.release.set()
+        self.flight.run("key", self.compute("old"), stale_seconds=60)
+        self.release.clear()
+        self.started.clear()
+
+        leader, results = self.start_leader("new", stale_seconds=60)
+        self.assertEqual(self.flight.run("key", self.compute("other")), "old")
+        self.release.set()
+        leader.join(5)
+        self.assertEqual(results, ["new"])
+        self.assertEqual(self.runs, 2)
+
+    def test_sequential_and_unshared_runs_compute(self):
+        self.release.set()
+        self.assertEqual(self.flight.run("key", self.compute(1), 60), 1)
+        self.assertEqual(self.flight.run("key", self.compute(2), 60), 2)
+        self.flight.clear()
+        self.release.clear()
+        self.started.clear()
+
+        leader, results = self.start_leader("error", shared=False)
+        follower = threading.Thread(
+            target=lambda: results.append(self.flight.run("key", self.compute("own")))
+        )
+        follower.start()
+        self.release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(sorted(results), ["error", "own"])
+        self.assertEqual(self.runs, 4)
+
+
+class SingleFlightViewTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        self.authenticate()
+
+    def keys(self, *queries):
+        url = reverse("railway_station:route-list")
+        with mock.patch.object(flights, "run", wraps=flights.run) as run:
+            responses = [self.client.get(f"{url}?{query}") for query in queries]
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [call.args[0] for call in run.call_args_list]
+
+    def test_requests_are_keyed_on_normalized_query_and_scope(self):
+        first, reordered, other_format = self.keys(
+            "distance_min=1&source=1", "source=1&distance_min=1", "format=msgpack"
+        )
+        self.assertEqual(first, reordered)
+        self.assertNotEqual(first, other_format)
+
+        self.user.is_staff = True
+        self.user.save()
+        (staff,) = self.keys("distance_min=1&source=1")
+        self.assertNotEqual(first, staff)
+
+    def test_seat_changes_forget_coalesced_journey_details(self):
+        journey = Journey.objects.create(
+            train=Train.objects.create(
+                name="T-1",
+                train_type=TrainType.objects.create(name="Express"),
+                cargo_num=2,
+                place_in_cargo=10,
+            ),
+            route=Route.objects.first(),
+            departure_time=make_aware(datetime(2030, 5, 20, 8, 0)),
+            arrival_time=make_aware(datetime(2030, 5, 20, 10, 0)),
+        )
+        detail = reverse("railway_station:journey-detail", args=[journey.id])
+        flights.clear()
+        self.addCleanup(flights.clear)
+        flights.run(("testserver", detail), lambda: ("cached", True), 60)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(
+                cargo=1,
+                seat=1,
+                journey=journey,
+                order=Order.objects.create(user=self.user),
+            )
+        self.assertEqual(list(flights._results), [])
+
+        flights.run(("testserver", detail), lambda: ("cached", True), 60)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        self.assertEqual(list(flights._results), [])
+
+    def test_sequential_requests_see_changes(self):
+        url = reverse("railway_station:route-list")
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        Route.objects.create(
+            source=self.station_b, destination=self.station_a, distance=100
+        )
+        self.assertEqual(len(self.client.get(url).json()), 2)
+
+
+class AnalyticsExportTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.train = Train.objects.create(
+            name="T-1",
+            train_type=TrainType.objects.create(name="Express"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        self.route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        order = Order.objects.create(user=self.user)
+        now = timezone.now().replace(microsecond=123456)
+        for seat, (days, price) in enumerate(
+            ((60, None), (-2, Decimal("12.50")), (-3, 10)), start=1
+        ):
+            journey = Journey.objects.create(
+                train=self.train,
+                route=self.route,
+                departure_time=now - timedelta(days=days),
+                arrival_time=now - timedelta(days=days, hours=-2),
+            )
+            Ticket.objects.create(
+                cargo=2, seat=seat, journey=journey, order=order, price=price
+            )
+        call_command("archive_journeys", stdout=StringIO())
+        self.departure = now + timedelta(days=2)
+
+    def test_admin_streams_parquet(self):
+        url = reverse("railway_station:analytics-export", args=["tickets"])
+        self.authenticate()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.parquet")
+        table = pq.read_table(pa.BufferReader(b"".join(response.streaming_content)))
+
+        schema = table.schema
+        self.assertEqual(schema.field("ticket_id").type, pa.int64())
+        self.assertEqual(schema.field("seat").type, pa.int32())
+        self.assertEqual(schema.field("price").type, pa.decimal128(10, 2))
+        self.assertEqual(
+            schema.field("departure_time").type, pa.timestamp("us", tz="UTC")
+        )
+        rows = table.to_pylist()
+        self.assertEqual([row["archived"] for row in rows], [False, False, True])
+        self.assertEqual(rows[0]["departure_time"], self.departure)
+        self.assertEqual(rows[0]["price"], Decimal("12.50"))
+        self.assertIsNone(rows[2]["price"])
+        self.assertEqual(rows[2]["source_station_id"], self.station_a.id)
+        self.assertEqual(rows[2]["train_name"], "T-1")
+
+        self.assertEqual(
+            self.client.get(url, {"file_format": "csv"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        url = reverse("railway_station:analytics-export", args=["users"])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_streams_row_groups_under_asgi(self):
+        self.user.is_staff = True
+        await self.user.asave()
+        pulled = []
+
+        def export(dataset, file_format):
+            for chunk in (b"first", b"second"):
+                pulled.append(chunk)
+                yield chunk
+
+        with mock.patch("railway_station.views.export_dataset", export):
+            response = await AsyncClient().get(
+                reverse("railway_station:analytics-export", args=["tickets"]),
+                headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+            )
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(await anext(chunks), b"first")
+            self.assertEqual(pulled, [b"first"])
+            self.assertEqual([chunk async for chunk in chunks], [b"second"])
+
+        response = await AsyncClient().get(
+            reverse("railway_station:analytics-export", args=["tickets"]),
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(pq.read_table(pa.BufferReader(content)).num_rows, 3)
+
+    def test_copy_and_python_conversion_agree(self):
+        for dataset in DATASETS.values():
+            copied = pa.concat_tables(row_groups(dataset, row_group_size=2))
+            fetched = pa.concat_tables(
+                row_groups(dataset, row_group_size=2, use_copy=False)
+            )
+            self.assertEqual(copied.num_rows, 3)
+            self.assertTrue(copied.equals(fetched))
+
+    def test_command_writes_row_groups(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "journeys.parquet")
+            call_command(
+                "export_analytics",
+                "journeys",
+                path,
+                row_group_size=2,
+                stdout=StringIO(),
+            )
+            parquet = pq.ParquetFile(path)
+            self.assertEqual(parquet.metadata.num_rows, 3)
+            # Two live journeys, then the archived one.
+            self.assertEqual(parquet.num_row_groups, 2)
+
+            path = os.path.join(directory, "tickets.arrow")
+            call_command("export_analytics", "tickets", path, stdout=StringIO())
+            with pa.ipc.open_file(path) as reader:
+                table = reader.read_all()
+            self.assertEqual(table.num_rows, 3)
+            self.assertEqual(table.schema.field("cargo").type, pa.int32())
+
+
+class GTFSTests(BaseTestCase):
+    FEED = {
+        "agency.txt": "agency_id,agency_name,agency_url,agency_timezone\n"
+        "uz,UZ,https://uz.example,Europe/Kyiv\n",
+        "stops.txt": "stop_id,stop_name,stop_lat,stop_lon,location_type,parent_station\n"
+        "KYIV,Kyiv,50.4403,30.4892,1,\n"
+        "KYIV-1,Kyiv platform 1,50.4403,30.4892,0,KYIV\n"
+        "LVIV,Lviv,49.8397,23.9944,,\n",
+        "routes.txt": "route_id,route_short_name,route_type\nIC,Intercity 743,2\n",
+        "trips.txt": "route_id,service_id,trip_id\nIC,WEEKDAY,IC743\n",
+        "stop_times.txt": "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        "IC743,25:40:00,25:40:00,LVIV,3\n"
+        "IC743,,07:00:00,KYIV-1,1\n",
+        "calendar.txt": "service_id,monday,tuesday,wednesday,thursday,friday,"
+        "saturday,sunday,start_date,end_date\n"
+        "WEEKDAY,1,1,1,1,1,0,0,20261001,20261231\n",
+        "calendar_dates.txt": "service_id,date,exception_type\n" "WEEKDAY,20261021,2\n",
+    }
+
+    def write_feed(self, directory, **files):
+        for name, content in {**self.FEED, **files}.items():
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as file:
+                file.write(content)
+
+    def import_feed(self, directory):
+        out = StringIO()
+        # Monday 2026-10-19 to Sunday 2026-10-25, without Wednesday.
+        call_command(
+            "import_gtfs",
+            directory,
+            "--start-date=2026-10-19",
+            days=7,
+            batch_size=2,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_import_is_idempotent(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_feed(directory)
+            output = self.import_feed(directory)
+            self.assertIn("journeys: 4 created, 0 updated", output)
+
+            kyiv = Station.objects.get(gtfs_id="KYIV")
+            lviv = Station.objects.get(gtfs_id="LVIV")
+            self.assertFalse(Station.objects.filter(gtfs_id="KYIV-1").exists())
+            train = Train.objects.get(gtfs_id="IC")
+            self.assertEqual(train.name, "Intercity 743")
+            self.assertEqual(train.train_type.name, "GTFS")
+            route = Route.objects.get(source=kyiv, destination=lviv)
+            self.assertAlmostEqual(route.distance, 468, delta=1)
+
+            journey = Journey.objects.get(gtfs_id="IC743@2026-10-19")
+            self.assertEqual(journey.route, route)
+            self.assertEqual(journey.source_station, kyiv)
+            self.assertEqual(journey.destination_station, lviv)
+            # 07:00 Kyiv time (UTC+3), arriving past midnight.
+            self.assertEqual(
+                journey.departure_time, make_aware(datetime(2026, 10, 19, 4))
+            )
+            self.assertEqual(
+                journey.arrival_time, make_aware(datetime(2026, 10, 19, 22, 40))
+            )
+            self.assertFalse(
+                Journey.objects.filter(gtfs_id="IC743@2026-10-21").exists()
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                output = self.import_feed(directory)
+            self.assertNotIn("1 created", output)
+            self.assertNotIn("1 updated", output)
+            self.assertFalse(
+                [q for q in queries if q["sql"].startswith(("INSERT", "UPDATE"))]
+            )
+
+            self.write_feed(
+                directory,
+                **{"stops.txt": self.FEED["stops.txt"].replace("Lviv,", "Lviv Main,")},
+            )
+            self.assertIn("stations: 0 created, 1 updated", self.import_feed(directory))
+            self.assertEqual(Station.objects.get(gtfs_id="LVIV").name, "Lviv Main")
+            self.assertEqual(Route.objects.filter(source=kyiv).count(), 1)
+
+    def test_reimport_deletes_journeys_the_feed_no_longer_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_feed(directory)
+            self.import_feed(directory)
+            Ticket.objects.create(
+                cargo=1,
+                seat=1,
+                journey=Journey.objects.get(gtfs_id="IC743@2026-10-23"),
+                order=Order.objects.create(user=self.user),
+            )
+            later = Journey.objects.get(gtfs_id="IC743@2026-10-19")
+            later.pk, later.gtfs_id = None, "IC743@2026-10-26"
+            later.save()
+
+            self.write_feed(
+                directory,
+                **{
+                    "calendar_dates.txt": self.FEED["calendar_dates.txt"]
+                    + "WEEKDAY,20261022,2\nWEEKDAY,20261023,2\n"
+                },
+            )
+            output = self.import_feed(directory)
+        self.assertIn("journeys: 0 created, 0 updated, 1 deleted", output)
+        self.assertEqual(
+            set(Journey.objects.values_list("gtfs_id", flat=True)),
+            {
+                "IC743@2026-10-19",
+                "IC743@2026-10-20",
+                # Sold tickets keep their journey, the import window ends before.
+                "IC743@2026-10-23",
+                "IC743@2026-10-26",
+            },
+        )
+
+    def test_exported_feed_maps_back_to_its_journeys(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_feed(directory)
+            self.import_feed(directory)
+        journeys = set(Journey.objects.values_list("gtfs_id", "departure_time"))
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("export_gtfs", directory, stdout=StringIO())
+            with open(os.path.join(directory, "stops.txt")) as file:
+                stops = {
+                    row["stop_id"]: row["location_type"]
+                    for row in csv.DictReader(file)
+                }
+            with open(os.path.join(directory, "stop_times.txt")) as file:
+                for row in csv.DictReader(file):
+                    self.assertEqual(stops[row["stop_id"]], "0")
+
+            output = self.import_feed(directory)
+        self.assertIn("journeys: 0 created, 0 updated, 0 deleted", output)
+        self.assertEqual(
+            set(Journey.objects.values_list("gtfs_id", "departure_time")), journeys
+        )
+
+    def test_unknown_stop(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_feed(
+                directory,
+                **{
+                    "stop_times.txt": self.FEED["stop_times.txt"].replace(
+                        "LVIV,3", "ODESA,3"
+                    )
+                },
+            )
+            with self.assertRaisesMessage(CommandError, "ODESA"):
+                self.import_feed(directory)
+        self.assertFalse(Station.objects.filter(gtfs_id="KYIV").exists())
+
+    def test_export_round_trip(self):
+        train = Train.objects.create(
+            name="Night 91",
+            train_type=TrainType.objects.create(name="Sleeper"),
+            cargo_num=12,
+            place_in_cargo=36,
+        )
+        route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=140
+        )
+        departure = make_aware(datetime(2026, 10, 20, 22, 30))
+        Journey.objects.create(
+            train=train,
+            route=route,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=3),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("export_gtfs", directory, stdout=StringIO())
+            with open(os.path.join(directory, "stop_times.txt")) as file:
+                self.assertIn("25:30:00", file.read())
+
+            Station.objects.all().delete()
+            Train.objects.all().delete()
+            call_command(
+                "import_gtfs",
+                directory,
+                "--start-date=2026-10-20",
+                days=1,
+                stdout=StringIO(),
+            )
+        journey = Journey.objects.select_related("train", "route__source").get()
+        self.assertEqual(journey.train.name, "Night 91")
+        self.assertEqual(journey.route.source.name, "Station A")
+        self.assertEqual(journey.destination_station.name, "Station B")
+        self.assertEqual(journey.departure_time, departure)
+        self.assertEqual(journey.arrival_time, departure + timedelta(hours=3))
+        self.assertEqual(Station.objects.count(), 2)
+
+
+class RealtimeDelayTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.train = Train.objects.create(
+            name="T-1",
+            train_type=TrainType.objects.create(name="Express"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        self.departure = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+        self.journeys = Journey.objects.bulk_create(
+            Journey(
+                train=self.train,
+                route=route,
+                source_station=self.station_a,
+                destination_station=self.station_b,
+                departure_time=self.departure + timedelta(hours=index),
+                arrival_time=self.departure + timedelta(hours=index + 2),
+            )
+            for index in range(3)
+        )
+        self.url = reverse("railway_station:journey-delays")
+
+    def post(self, updates):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, updates, format="json")
+
+    def test_admin_only(self):
+        self.authenticate()
+        response = self.client.post(self.url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @mock.patch("railway_station.realtime.journeys_delayed")
+    def test_updates_only_changed_journeys(self, journeys_delayed):
+        self.user.is_staff = True
+        self.user.save()
+        self.authenticate()
+        first, second, third = self.journeys
+        delayed = self.departure + timedelta(minutes=15)
+        updates = [
+            {"journey": first.id, "departure_time": delayed.isoformat()},
+            {"journey": second.id, "departure_time": None, "arrival_time": None},
+            {"journey": 999999, "departure_time": delayed.isoformat()},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(updates)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, {"updated": 1, "unchanged": 1, "missing": [999999]}
+        )
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("UPDATE")]), 1)
+        first.refresh_from_db()
+        self.assertEqual(first.estimated_departure_time, delayed)
+        self.assertIsNone(first.estimated_arrival_time)
+        journeys_delayed.assert_called_once_with(
+            [
+                {
+                    "journey": first.id,
+                    "type": "delayed",
+                    "estimated_departure_time": delayed.isoformat(),
+                    "estimated_arrival_time": None,
+                }
+            ]
+        )
+
+        journeys_delayed.reset_mock()
+        response = self.post(updates[:1])
+        self.assertEqual(response.data["unchanged"], 1)
+        journeys_delayed.assert_not_called()
+
+        board = self.client.get(
+            reverse("railway_station:station-departures", args=[self.station_a.id])
+        )
+        self.assertEqual(
+            [row["estimated_departure_time"] for row in board.data],
+            [delayed.isoformat().replace("+00:00", "Z"), None, None],
+        )
+
+    def test_rejects_arrival_before_departure(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.authenticate()
+        response = self.post(
+            [
+                {
+                    "journey": self.journeys[0].id,
+                    "departure_time": self.departure.isoformat(),
+                    "arrival_time": (self.departure - timedelta(hours=1)).isoformat(),
+                }
+            ]
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            Journey.objects.filter(estimated_departure_time__isnull=False).exists()
+        )
+
+    def test_forgets_coalesced_journey_details(self):
+        self.authenticate()
+        detail = reverse("railway_station:journey-detail", args=[self.journeys[0].id])
+        other = reverse("railway_station:journey-detail", args=[self.journeys[1].id])
+        flights.clear()
+        self.addCleanup(flights.clear)
+        for path in (detail, other):
+            flights.run(("testserver", path), lambda: ("cached", True), 60)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_delays(
+                [DelayUpdate(self.journeys[0].id, self.departure)], batch_size=1
+            )
+        self.assertEqual(list(flights._results), [("testserver", other)])
+
+
+class TicketTokenTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.departure = make_aware(datetime(2030, 5, 20, 8, 0))
+        train = Train.objects.create(
+            name="T-1",
+            train_type=TrainType.objects.create(name="Express"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        self.journey = Journey.objects.create(
+            train=train,
+            route=Route.objects.create(
+                source=self.station_a, destination=self.station_b, distance=100
+            ),
+            departure_time=self.departure,
+            arrival_time=self.departure + timedelta(hours=2),
+        )
+        order = Order.objects.create(user=self.user)
+        self.tickets = [
+            Ticket.objects.create(cargo=2, seat=seat, journey=self.journey, order=order)
+            for seat in (1, 2, 3)
+        ]
+        self.tokens = [issue_token(ticket) for ticket in self.tickets]
+
+    def test_verifies_offline(self):
+        token = self.tokens[0]
+        self.assertEqual(len(token), 60)
+        claims = verify_token(token, self.departure)
+        self.assertEqual(claims[:4], (self.tickets[0].id, self.journey.id, 2, 1))
+        self.assertEqual(claims.valid_from, self.departure - timedelta(hours=3))
+        self.assertEqual(claims.valid_until, self.departure + timedelta(hours=5))
+
+        with self.assertRaisesMessage(InvalidToken, "validity window"):
+            verify_token(token, self.departure + timedelta(hours=6))
+        with self.assertRaisesMessage(InvalidToken, "signature"):
+            verify_token(token, self.departure, key=b"another key")
+        tampered = issue_token(self.tickets[0], key=b"another key")
+        with self.assertRaisesMessage(InvalidToken, "signature"):
+            verify_token(tampered, self.departure)
+        with self.assertRaisesMessage(InvalidToken, "Malformed"):
+            verify_token("not a token", self.departure)
+
+    def test_order_tickets_carry_tokens(self):
+        self.authenticate()
+        response = self.client.get(reverse("railway_station:order-list"))
+        tokens = {
+            ticket["id"]: ticket["token"]
+            for order in response.data
+            for ticket in order["tickets"]
+        }
+        self.assertEqual(tokens, dict(zip([t.id for t in self.tickets], self.tokens)))
+
+    def test_batch_scan_detects_duplicates(self):
+        url = reverse("railway_station:ticket-scans")
+        self.authenticate()
+        self.assertEqual(
+            self.client.post(url, [], format="json").status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.user.is_staff = True
+        self.user.save()
+
+        first, second, refunded = self.tickets
+        refunded.delete()
+        at = self.departure - timedelta(minutes=10)
+        scans = [
+            {"token": self.tokens[1], "scanned_at": at + timedelta(seconds=5)},
+            {"token": self.tokens[0], "scanned_at": at, "gate": "A1"},
+            {"token": self.tokens[1], "scanned_at": at, "gate": "B2"},
+            {"token": self.tokens[2], "scanned_at": at},
+            {"token": self.tokens[0][:-2] + "AA", "scanned_at": at},
+            {"token": self.tokens[0], "scanned_at": at - timedelta(hours=4)},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, scans, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([q for q in queries if "ticketscan" in q["sql"]]), 1)
+        self.assertEqual(
+            [result["status"] for result in response.data],
+            ["duplicate", "valid", "valid", "unknown", "invalid", "invalid"],
+        )
+        self.assertEqual(response.data[0]["first_gate"], "B2")
+        self.assertEqual(response.data[0]["first_scanned_at"], at)
+
+        response = self.client.post(
+            url,
+            [{"token": self.tokens[0], "scanned_at": at + timedelta(minutes=1)}],
+            format="json",
+        )
+        self.assertEqual(
+            response.data,
+            [
+                {
+                    "status": "duplicate",
+                    "ticket": first.id,
+                    "first_scanned_at": at,
+                    "first_gate": "A1",
+                }
+            ],
+        )
+        self.assertEqual(
+            set(TicketScan.objects.values_list("ticket_id", "gate")),
+            {(first.id, "A1"), (second.id, "B2")},
+        )
+
+
+class TicketScanRaceTests(TransactionTestCase):
+    def test_duplicate_of_a_concurrent_batch_reports_its_first_scan(self):
+        user = User.objects.create_user(email="gate@example.com", password="x")
+        departure = timezone.now() + timedelta(hours=1)
+        ticket = Ticket.objects.create(
+            cargo=1,
+            seat=1,
+            order=Order.objects.create(user=user),
+            journey=Journey.objects.create(
+                train=Train.objects.create(
+                    name="T-1",
+                    train_type=TrainType.objects.create(name="Express"),
+                    cargo_num=2,
+                    place_in_cargo=10,
+                ),
+                route=Route.objects.create(
+                    source=Station.objects.create(name="A", latitude=50, longitude=30),
+                    destination=Station.objects.create(
+                        name="B", latitude=51, longitude=31
+                    ),
+                    distance=100,
+                ),
+                departure_time=departure,
+                arrival_time=departure + timedelta(hours=2),
+            ),
+        )
+        token = issue_token(ticket)
+        first_at = timezone.now().replace(microsecond=0)
+        recorded, commit, results = threading.Event(), threading.Event(), []
+
+        def first_gate():
+            try:
+                with transaction.atomic():
+                    record_scans([Scan(token, first_at, "A1")])
+                    recorded.set()
+                    commit.wait(5)
+            finally:
+                connection.close()
+
+        def second_gate():
+            try:
+                results.extend(
+                    record_scans([Scan(token, first_at + timedelta(seconds=1), "B2")])
+                )
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=first_gate)]
+        threads[0].start()
+        self.assertTrue(recorded.wait(5))
+        threads.append(threading.Thread(target=second_gate))
+        threads[1].start()
+        # Wait until the second batch's insert blocks on the first one's row.
+        for _ in range(100):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity"
+                    " WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                )
+                if cursor.fetchone()[0]:
+                    break
+            time.sleep(0.05)
+        commit.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(
+            results,
+            [
+                {
+                    "status": "duplicate",
+                    "ticket": ticket.id,
+                    "first_scanned_at": first_at,
+                    "first_gate": "A1",
+                }
+            ],
+        )
+
+
+class SchemaTests(SimpleTestCase):
+    def setUp(self):
+        CachedSchemaView._schema = None
+        CachedSchemaView._rendered = {}
+        self.addCleanup(setattr, CachedSchemaView, "_schema", None)
+        self.addCleanup(setattr, CachedSchemaView, "_rendered", {})
+
+    def test_schema_is_generated_once_and_revalidated(self):
+        url = reverse("schema")
+        with mock.patch.object(
+            CachedSchemaView, "get_schema", wraps=CachedSchemaView().get_schema
+        ) as get_schema:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(b"/api/railway/journey/", response.content)
+            etag = response["ETag"]
+
+            self.assertEqual(self.client.get(url).content, response.content)
+            not_modified = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(not_modified["ETag"], etag)
+
+            json_response = self.client.get(url, {"format": "json"})
+            self.assertEqual(
+                json_response["Content-Type"], "application/vnd.oai.openapi+json"
+            )
+            self.assertNotEqual(json_response["ETag"], etag)
+        self.assertEqual(get_schema.call_count, 1)
+
+    def test_schema_is_read_from_the_precomputed_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yml", delete=False) as schema:
+            schema.write("openapi: 3.0.3\ninfo:\n  title: Precomputed\n")
+        self.addCleanup(os.remove, schema.name)
+        with override_settings(OPENAPI_SCHEMA_FILE=schema.name):
+            response = self.client.get(reverse("schema"), {"format": "json"})
+        self.assertEqual(response.json()["info"]["title"], "Precomputed")
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class DatabaseRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.read_databases = []
+
+        def get_response(request):
+            self.read_databases.append(self.router.db_for_read(Order))
+            return HttpResponse(status=201 if request.method == "POST" else 200)
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def test_reads_use_replica_only_when_allowed(self):
+        self.assertEqual(self.router.db_for_read(Journey), "default")
+        with use_primary(False):
+            self.assertEqual(self.router.db_for_read(Journey), "replica_1")
+            self.assertEqual(self.router.db_for_write(Journey), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_use_primary_without_replicas(self):
+        with use_primary(False):
+            self.assertEqual(self.router.db_for_read(Journey), "default")
+
+    def test_client_is_pinned_to_primary_after_write(self):
+        auth = {"HTTP_AUTHORIZATION": "Bearer first"}
+        self.middleware(self.factory.get("/api/railway/order/", **auth))
+        self.middleware(self.factory.post("/api/railway/order/", **auth))
+        self.middleware(self.factory.get("/api/railway/order/", **auth))
+        self.middleware(
+            self.factory.get("/api/railway/order/", HTTP_AUTHORIZATION="Bearer other")
+        )
+        self.assertEqual(
+            self.read_databases, ["replica_1", "default", "default", "replica_1"]
+        )
+
+    def test_pin_is_shared_between_workers(self):
+        self.middleware(
+            self.factory.post("/api/railway/order/", HTTP_AUTHORIZATION="Bearer first")
+        )
+        # Another worker has its own cache connection, but the same table.
+        other_worker = caches.create_connection("default")
+        with use_primary(False):
+            self.assertEqual(
+                self.router.db_for_read(other_worker.cache_model_class), "default"
+            )
+            self.assertIs(
+                other_worker.get(
+                    ReplicaRoutingMiddleware._pin_key(
+                        self.factory.get("/", HTTP_AUTHORIZATION="Bearer first")
+                    )
+                ),
+                True,
+            )
+
+
+class ServerTimingTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+
+    def test_response_has_server_timing_header(self):
+        self.authenticate()
+        response = self.client.get(reverse("railway_station:station-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries"'
+        )
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    def test_rendering_is_timed_apart_from_the_view(self):
+        self.authenticate()
+        response = self.client.get(reverse("railway_station:station-list"))
+        self.assertRegex(
+            response["Server-Timing"], r"render;dur=[\d.]+, app;dur=[\d.]+"
+        )
+        response = self.client.get(reverse("metrics"))
+        self.assertIn(
+            'http_request_render_duration_seconds_count{view="railway_station:station-list",'
+            'action="list"} 1',
+            response.content.decode(),
+        )
+
+    def test_metrics_endpoint_exposes_histograms_per_action(self):
+        self.authenticate()
+        self.client.get(reverse("railway_station:station-list"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_request_duration_seconds_count{view="railway_station:station-list",'
+            'action="list"} 1',
+            response.content.decode(),
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_endpoint_rejects_unknown_clients(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 403)
+
+
+class NPlusOneDetectorTests(BaseTestCase):
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            fingerprint("SELECT * FROM t WHERE id = 25 AND name = 'b'"),
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s)"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s)"),
+        )
+
+    def test_repeated_query_raises(self):
+        for _ in range(3):
+            Route.objects.create(
+                source=self.station_a, destination=self.station_b, distance=10
+            )
+        with self.assertRaises(NPlusOneError):
+            with detect_n_plus_one(threshold=2):
+                [route.source.name for route in Route.objects.all()]
+
+    def test_select_related_passes(self):
+        for _ in range(3):
+            Route.objects.create(
+                source=self.station_a, destination=self.station_b, distance=10
+            )
+        with detect_n_plus_one(threshold=2):
+            [route.source.name for route in Route.objects.select_related("source")]
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_benchmark_writes_json_report(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "benchmark_api",
+                volume="tiny",
+                in_place=True,
+                iterations=3,
+                output=output.name,
+                stdout=StringIO(),
+            )
+            report = json.load(output)
+        self.assertEqual(report["volumes"]["stations"], 10)
+        for name in ("journey-list", "route-detail", "order-list"):
+            self.assertIn("p95_ms", report["results"][name])
+            self.assertGreater(report["results"][name]["queries"], 0)
+
+
+class GenerateRailwayDataCommandTests(TestCase):
+    def generate(self, **options):
+        call_command(
+            "generate_railway_data",
+            volume="tiny",
+            stdout=StringIO(),
+            **options,
+        )
+
+    def assert_generated_data_is_valid(self):
+        self.assertEqual(Station.objects.count(), 10)
+        self.assertEqual(Route.objects.count(), 20)
+        self.assertEqual(Journey.objects.count(), 50)
+        self.assertEqual(Ticket.objects.count(), 200)
+        self.assertFalse(
+            Ticket.objects.filter(seat__gt=F("journey__train__place_in_cargo")).exists()
+        )
+        self.assertFalse(
+            Ticket.objects.filter(cargo__gt=F("journey__train__cargo_num")).exists()
+        )
+        self.assertFalse(Journey.objects.filter(crew__isnull=True).exists())
+
+        # Every station is reachable from the first one.
+        edges = {}
+        for source, destination in Route.objects.values_list("source", "destination"):
+            edges.setdefault(source, set()).add(destination)
+        reached = {Station.objects.order_by("id").first().id}
+        pending = list(reached)
+        while pending:
+            for station in edges.get(pending.pop(), ()):
+                if station not in reached:
+                    reached.add(station)
+                    pending.append(station)
+        self.assertEqual(reached, set(Station.objects.values_list("id", flat=True)))
+
+        # The distances pass the audit of `manage.py route_distances`.
+        _, stored, computed = route_distances()
+        self.assertLessEqual(np.abs(stored - computed).max(), 1)
+
+    def test_generate_with_copy(self):
+        self.generate()
+        self.assert_generated_data_is_valid()
+
+    def test_generate_with_bulk_create(self):
+        self.generate(no_copy=True)
+        self.assert_generated_data_is_valid()
+
+    def test_generation_is_deterministic(self):
+        self.generate(seed=7)
+        first = list(Route.objects.order_by("id").values_list("distance", flat=True))
+        Station.objects.all().delete()
+        self.generate(seed=7)
+        second = list(Route.objects.order_by("id").values_list("distance", flat=True))
+        self.assertEqual(first, second)
+
+
+class ValuesListSerializerTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        train_type = TrainType.objects.create(name="Intercity")
+        self.train = Train.objects.create(
+            name="Hyundai", train_type=train_type, cargo_num=9, place_in_cargo=50
+        )
+        Train.objects.create(
+            name="Tarpan",
+            train_type=train_type,
+            cargo_num=3,
+            place_in_cargo=60,
+            image="uploads/train/tarpan.jpg",
+        )
+        route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        Route.objects.create(
+            source=self.station_b, destination=self.station_a, distance=101
+        )
+        crew = Crew.objects.create(first_name="John", last_name="Doe")
+        for hour in (8, 9):
+            journey = Journey.objects.create(
+                train=self.train,
+                route=route,
+                departure_time=make_aware(datetime(2025, 5, 20, hour, 0, 30)),
+                arrival_time=make_aware(datetime(2025, 5, 20, hour + 3, 15)),
+            )
+        journey.crew.add(crew)
+        self.authenticate()
+
+    def assert_same_json_rows(self, url_name, serializer_class, queryset):
+        response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        expected = serializer_class(
+            queryset, many=True, context={"request": response.wsgi_request}
+        ).data
+        renderer = JSONRenderer()
+        self.assertEqual(
+            {row["id"]: renderer.render(row) for row in response.json()},
+            {row["id"]: renderer.render(row) for row in expected},
+        )
+        self.assertEqual(len(response.content), len(renderer.render(expected)))
+
+    def test_route_list_matches_model_serializer(self):
+        self.assert_same_json_rows(
+            "railway_station:route-list", RouteListSerializer, Route.objects.all()
+        )
+
+    def test_train_list_matches_model_serializer(self):
+        self.assert_same_json_rows(
+            "railway_station:train-list", TrainListSerializer, Train.objects.all()
+        )
+
+    def test_journey_list_matches_model_serializer(self):
+        response = self.client.get(
+            reverse("railway_station:journey-list"), {"date_from": "2025-01-01"}
+        )
+        expected = JourneyListSerializer(Journey.objects.all(), many=True).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+
+class SparseFieldsetTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.train = Train.objects.create(
+            name="Hyundai",
+            train_type=TrainType.objects.create(name="Intercity"),
+            cargo_num=9,
+            place_in_cargo=50,
+        )
+        route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        self.journey = Journey.objects.create(
+            train=self.train,
+            route=route,
+            departure_time=make_aware(datetime(2025, 5, 20, 8, 0)),
+            arrival_time=make_aware(datetime(2025, 5, 20, 11, 0)),
+        )
+        self.journey.crew.add(Crew.objects.create(first_name="John", last_name="Doe"))
+        self.order = Order.objects.create(user=self.user)
+        Ticket.objects.create(cargo=1, seat=1, journey=self.journey, order=self.order)
+        self.authenticate()
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, " ".join(query["sql"] for query in queries)
+
+    def test_fields_limit_payload_and_columns(self):
+        url = reverse("railway_station:journey-detail", args=[self.journey.id])
+        response, sql = self.get(url, {"fields": "id,departure_time"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {"id", "departure_time"})
+        self.assertNotIn('"railway_station_train"', sql)
+        self.assertNotIn('"railway_station_crew"', sql)
+        self.assertNotIn('"arrival_time"', sql)
+
+    def test_unexpanded_relations_are_ids(self):
+        url = reverse("railway_station:journey-detail", args=[self.journey.id])
+        response, sql = self.get(url, {"expand": "route"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["train"], self.train.id)
+        self.assertEqual(response.data["route"]["source_name"], "Station A")
+        self.assertNotIn('"railway_station_train"."name"', sql)
+
+    def test_default_output_is_unchanged(self):
+        url = reverse("railway_station:journey-detail", args=[self.journey.id])
+        response = self.client.get(url)
+        self.assertEqual(response.data["train"]["train_type"]["name"], "Intercity")
+        self.assertEqual(response.data["crew"], ["John Doe"])
+
+    def test_fields_on_values_list_action(self):
+        response, sql = self.get(
+            reverse("railway_station:journey-list"),
+            {"fields": "id,train", "date_from": "2025-05-20"},
+        )
+        self.assertEqual(response.json(), [{"id": self.journey.id, "train": "Hyundai"}])
+        self.assertNotIn("COUNT", sql.upper())
+
+    def test_fields_skip_prefetch(self):
+        response, sql = self.get(
+            reverse("railway_station:order-list"), {"fields": "id,created_at"}
+        )
+        self.assertEqual(set(response.data[0]), {"id", "created_at"})
+        self.assertNotIn('"railway_station_ticket"', sql)
+
+    def test_unknown_fields_are_rejected(self):
+        url = reverse("railway_station:journey-detail", args=[self.journey.id])
+        self.assertEqual(self.client.get(url, {"fields": "fare"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"expand": "crew"}).status_code, 400)
+        response = self.client.get(
+            reverse("railway_station:journey-list"), {"fields": "fare"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryParamFilterTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        station_c = Station.objects.create(name="Station C", latitude=52, longitude=32)
+        self.short = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=100
+        )
+        self.long = Route.objects.create(
+            source=self.station_a, destination=station_c, distance=400
+        )
+        self.authenticate()
+
+    def get_routes(self, **params):
+        response = self.client.get(reverse("railway_station:route-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return {route["id"] for route in response.json()}
+
+    def test_distance_range(self):
+        self.assertEqual(
+            self.get_routes(distance_min=50), {self.short.id, self.long.id}
+        )
+        self.assertEqual(self.get_routes(distance_max=300), {self.short.id})
+        self.assertEqual(self.get_routes(distance=400), {self.long.id})
+
+    def test_long_id_lists_bind_one_array(self):
+        ids = ",".join(
+            str(id_) for id_ in [self.long.destination_id, *range(10**6, 10**6 + 20)]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_routes(destination=ids), {self.long.id})
+        self.assertIn("= ANY(", queries[-1]["sql"])
+        self.assertEqual(
+            self.get_routes(destination=f"{self.station_b.id}"), {self.short.id}
+        )
+
+    def test_invalid_values_are_rejected(self):
+        url = reverse("railway_station:station-list")
+        for params in (
+            {"station": "1,a"},
+            {"station": ",".join(["1"] * 101)},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("station", response.json())
+        response = self.client.get(
+            reverse("railway_station:route-list"),
+            {"distance_min": 300, "distance_max": 100},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_creation_date(self):
+        order = Order.objects.create(user=self.user)
+        url = reverse("railway_station:order-list")
+        day = order.created_at.date()
+        response = self.client.get(url, {"created_at": day.isoformat()})
+        self.assertEqual([row["id"] for row in response.json()], [order.id])
+        response = self.client.get(
+            url, {"created_at": (day - timedelta(days=1)).isoformat()}
+        )
+        self.assertEqual(response.json(), [])
+
+    def test_schema_lists_filter_parameters(self):
+        response = self.client.get(reverse("schema"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("distance_min", response.content.decode())
+        self.assertIn("from_station", response.content.decode())
+
+
+class FareTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.intercity = TrainType.objects.create(
+            name="Intercity", fare_multiplier="1.50"
+        )
+        self.train = Train.objects.create(
+            name="Hyundai", train_type=self.intercity, cargo_num=9, place_in_cargo=50
+        )
+        self.route = Route.objects.create(
+            source=self.station_a, destination=self.station_b, distance=120
+        )
+        self.journey = Journey.objects.create(
+            train=self.train,
+            route=self.route,
+            departure_time=make_aware(datetime(2030, 6, 1, 8, 0)),
+            arrival_time=make_aware(datetime(2030, 6, 1, 10, 0)),
+        )
+        FareBand.objects.create(min_distance=0, price="40.00")
+        self.band = FareBand.objects.create(min_distance=100, price="100.00")
+        FareBand.objects.create(min_distance=300, price="300.00")
+        self.authenticate()
+
+    def journey_prices(self):
+        response = self.client.get(reverse("railway_station:journey-list"))
+        detail = self.client.get(
+            reverse("railway_station:journey-detail", args=[self.journey.id])
+        )
+        return response.json()[0]["price"], detail.json()["price"]
+
+    def test_price_is_band_times_multiplier(self):
+        self.assertEqual(self.journey_prices(), ("150.00", "150.00"))
+
+    def test_fare_rule_changes_invalidate_matrix(self):
+        self.journey_prices()
+        self.band.price = "80.00"
+        self.band.save()
+        self.assertEqual(self.journey_prices(), ("120.00", "120.00"))
+        RouteFare.objects.create(route=self.route, price="10.00")
+        self.assertEqual(self.journey_prices(), ("15.00", "15.00"))
+        self.intercity.fare_multiplier = "2.00"
+        self.intercity.save()
+        self.assertEqual(self.journey_prices(), ("20.00", "20.00"))
+
+    def test_pricing_a_page_needs_no_fare_queries(self):
+        for hour in range(11, 20):
+            Journey.objects.create(
+                train=self.train,
+                route=self.route,
+                departure_time=make_aware(datetime(2030, 6, 1, hour, 0)),
+                arrival_time=make_aware(datetime(2030, 6, 1, hour, 30)),
+            )
+        self.journey_prices()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("railway_station:journey-list"))
+        self.assertEqual({row["price"] for row in response.json()}, {"150.00"})
+        self.assertNotIn("fareband", " ".join(query["sql"] for query in queries))
+
+    def test_order_stores_ticket_prices_and_total(self):
+        self.user.is_staff = True
+        self.user.save()
+        tickets = [
+            {"cargo": 1, "seat": seat, "journey": self.journey.id} for seat in (1, 2)
+        ]
+        response = self.client.post(
+            reverse("railway_station:order-list"), {"tickets": tickets}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["total"], "300.00")
+        self.assertEqual(response.data["tickets"][0]["price"], "150.00")
+
+        self.band.price = "1.00"
+        self.band.save()
+        response = self.client.get(reverse("railway_station:order-list"))
+        self.assertEqual(response.data[0]["total"], "300.00")
+
+
+class FareVersionSharingTests(TransactionTestCase):
+    def test_rule_change_in_another_process_invalidates_matrix(self):
+        route = Route.objects.create(
+            source=Station.objects.create(name="A", latitude=50, longitude=30),
+            destination=Station.objects.create(name="B", latitude=51, longitude=31),
+            distance=120,
+        )
+        train_type = TrainType.objects.create(name="Regional")
+        self.assertIsNone(fare_matrix().price(route.id, train_type.id))
+
+        # A management command or another worker: its own process and cache.
+        subprocess.run(
+            [
+                sys.executable,
+                "manage.py",
+                "shell",
+                "-c",
+                "from railway_station.models import FareBand;"
+                " FareBand.objects.create(min_distance=0, price='40.00')",
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "POSTGRES_DB": connection.settings_dict["NAME"]},
+            check=True,
+            capture_output=True,
+            timeout=60,
+        )
+        self.assertEqual(fare_matrix().price(route.id, train_type.id), Decimal("40.00"))
+
+
+class JobQueueTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+
+        def flaky(payload):
+            self.calls.append(payload)
+            raise RuntimeError("temporarily unavailable")
+
+        jobs.registry["flaky"] = (flaky, 2)
+        self.addCleanup(jobs.registry.pop, "flaky")
+
+    def test_order_side_effects_run_on_workers(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.authenticate()
+        journey = Journey.objects.create(
+            train=Train.objects.create(
+                name="T-1",
+                train_type=TrainType.objects.create(name="Express"),
+                cargo_num=9,
+                place_in_cargo=50,
+            ),
+            route=Route.objects.create(
+                source=self.station_a, destination=self.station_b, distance=100
+            ),
+            departure_time=make_aware(datetime(2030, 5, 20, 8, 0)),
+            arrival_time=make_aware(datetime(2030, 5, 20, 10, 0)),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("railway_station:order-list"),
+                {"tickets": [{"cargo": 1, "seat": 3, "journey": journey.id}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(Job.objects.values_list("name", flat=True)), ["order_created"]
+        )
+        self.assertEqual(mail.outbox, [])
+
+        call_command("run_workers", "--burst", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user_email])
+        self.assertIn("Station A - Station B", mail.outbox[0].body)
+        self.assertFalse(Job.objects.exists())
+
+        # A second run (of a job taken for a dead worker's) sends nothing.
+        jobs.enqueue("send_order_confirmation", {"order_id": response.data["id"]})
+        call_command("run_workers", "--burst", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_job_backs_off_then_fails(self):
+        queued = jobs.enqueue("flaky", {"order_id": 1})
+        self.assertEqual(jobs.run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.QUEUED, 1))
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn("temporarily unavailable", queued.last_error)
+        self.assertEqual(jobs.run_pending(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("railway_station.jobs", "ERROR"):
+            self.assertEqual(jobs.run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.FAILED, 2))
+        self.assertEqual(self.calls, [{"order_id": 1}] * 2)
+
+    def test_outcome_of_a_job_claimed_again_is_dropped(self):
+        queued = jobs.enqueue("flaky", {"order_id": 1})
+        [first] = jobs.claim()
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        [second] = jobs.claim()
+        with self.assertLogs("railway_station.jobs", "WARNING"):
+            jobs.run(first)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.last_error), (Job.RUNNING, ""))
+
+        jobs.registry["flaky"] = (lambda payload: None, 2)
+        jobs.run(second)
+        self.assertFalse(Job.objects.exists())
+
+    def test_jobs_of_dead_workers_are_claimed_again(self):
+        stale = timezone.now() - timedelta(hours=1)
+        Job.objects.create(
+            name="flaky", status=Job.RUNNING, run_at=stale, locked_at=stale
+        )
+        Job.objects.create(
+            name="flaky", status=Job.RUNNING, run_at=stale, locked_at=timezone.now()
+        )
+        self.assertEqual(len(jobs.claim()), 1)
@@ -2,13 +2,16 @@ from django.urls import include, path
 from rest_framework import routers
 
 from railway_station.views import (
+    AnalyticsExportView,
     CrewViewSet,
     JourneyViewSet,
     OrderViewSet,
     RouteViewSet,
     StationViewSet,
+    TicketScanView,
     TrainTypeViewSet,
     TrainViewSet,
+    journey_availability_stream,
 )
 
 router = routers.DefaultRouter()
@@ -22,6 +25,17 @@ router.register("order", OrderViewSet)
 
 
 urlpatterns = [
+    path(
+        "journey/<int:pk>/availability/stream/",
+        journey_availability_stream,
+        name="journey-availability-stream",
+    ),
+    path(
+        "export/<str:dataset>/",
+        AnalyticsExportView.as_view(),
+        name="analytics-export",
+    ),
+    path("scans/", TicketScanView.as_view(), name="ticket-scans"),
     path("", include(router.urls)),
 ]
 
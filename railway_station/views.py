@@ -1,75 +1,120 @@
-from datetime import datetime
-
-from django.utils.dateparse import parse_datetime
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from railway_station.availability import hub
+from railway_station.coalescing import single_flight
+from railway_station.export import DATASETS, FORMATS, export_dataset
+from railway_station.filters import (
+    DateFilter,
+    DateRangeFilter,
+    ListFilter,
+    RangeFilter,
+    RelatedDateFilter,
+)
+from railway_station.geo import distance_matrix
+from railway_station.idempotency import idempotent_response
+from railway_station.jobs import enqueue
 from railway_station.models import (
+    ArchivedTicket,
     Crew,
     Journey,
     Order,
     Route,
     Station,
+    Ticket,
     Train,
     TrainType,
 )
+from railway_station.pagination import KeysetPagination
 from railway_station.permissions import IsAdminAllORIsAuthenticatedReadOnly
+from railway_station.realtime import (
+    ESTIMATED_FIELDS,
+    DelayUpdate,
+    apply_delays,
+    isoformat,
+)
+from railway_station.scans import Scan, record_scans
 from railway_station.serializers import (
     CrewSerializer,
+    DelayUpdateSerializer,
     JourneyListSerializer,
+    JourneyListValuesSerializer,
     JourneyRetrieveSerializer,
     JourneySerializer,
     OrderSerializer,
     RouteListSerializer,
+    RouteListValuesSerializer,
     RouteRetrieveSerializer,
     RouteSerializer,
+    StationBoardSerializer,
     StationSerializer,
+    TicketScanSerializer,
     TrainImageSerializer,
     TrainListSerializer,
+    TrainListValuesSerializer,
     TrainRetrieveSerializer,
     TrainSerializer,
     TrainTypeSerializer,
 )
 
 
+class ValuesListMixin:
+    """Serve the list action through `values_serializer_class` (see ValuesListSerializer)."""
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.values_serializer_class
+        fields = serializer_class.select_fields(request)
+        queryset = serializer_class.setup_queryset(
+            self.filter_queryset(self.get_queryset()), fields
+        )
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer_class(page, context=context, fields=fields).data
+            )
+        return Response(serializer_class(queryset, context=context, fields=fields).data)
+
+
 class TrainTypeViewSet(viewsets.ModelViewSet):
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
     permission_classes = (IsAdminAllORIsAuthenticatedReadOnly,)
+    filter_fields = {
+        "name": ListFilter("id", "Filter train type by name id (ex. ?name=2,3)"),
+    }
 
-    @staticmethod
-    def _params_to_ints(query_string):
-        return [int(str_id) for str_id in query_string.split(",")]
-
-    def get_queryset(self):
-        queryset = self.queryset
-        name = self.request.query_params.get("name")
-
-        if name:
-            name_id = self._params_to_ints(name)
-            queryset = queryset.filter(id__in=name_id)
-        return queryset
-
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "name",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter train type by name id (ex. ?name=2,3)",
-            )
-        ]
-    )
     def list(self, request, *args, **kwargs):
         """Get list of train types and filter by train type name ID"""
         return super().list(request, *args, **kwargs)
 
 
 class TrainViewSet(
+    ValuesListMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -78,10 +123,13 @@ class TrainViewSet(
 ):
     queryset = Train.objects.all()
     serializer_class = TrainListSerializer
-
-    @staticmethod
-    def _params_to_ints(query_string):
-        return [int(str_id) for str_id in query_string.split(",")]
+    values_serializer_class = TrainListValuesSerializer
+    filter_fields = {
+        "name": ListFilter("id", "Filter by name id (ex. ?name=2,3)"),
+        "train_type": ListFilter(
+            "train_type_id", "Filter by train_type id (ex. ?train_type=2,3)"
+        ),
+    }
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -96,22 +144,10 @@ class TrainViewSet(
         return TrainSerializer
 
     def get_queryset(self):
-        queryset = self.queryset
-
-        name = self.request.query_params.get("name")
-        train_type = self.request.query_params.get("train_type")
-
-        if name:
-            name_id = self._params_to_ints(name)
-            queryset = queryset.filter(id__in=name_id)
-
-        if train_type:
-            train_type = self._params_to_ints(train_type)
-            queryset = queryset.filter(train_type__id__in=train_type)
-
+        queryset = super().get_queryset()
         if self.action in ("list", "retrieve"):
             queryset = queryset.select_related("train_type")
-        return queryset.distinct()
+        return queryset
 
     # http://127.0.0.1:8000/api/railway/train/2/upload-image/
     @action(
@@ -129,62 +165,154 @@ class TrainViewSet(
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "train_type",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter by train_type id (ex. ?train_type=2,3)",
-            ),
-            OpenApiParameter(
-                "name",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter by name id (ex. ?name=2,3)",
-            ),
-        ],
-    )
     def list(self, request, *args, **kwargs):
         """Get list of all trains and filter the trains by train name ID and train type ID."""
         return super().list(request, *args, **kwargs)
 
 
+BOARD_LIMIT_PARAMETER = OpenApiParameter(
+    "limit",
+    OpenApiTypes.INT,
+    description="Number of journeys, at most 100 (default 20)",
+)
+BOARD_SINCE_PARAMETER = OpenApiParameter(
+    "since",
+    OpenApiTypes.DATETIME,
+    description="Journeys from this time on (default now)",
+)
+
+
 class StationViewSet(viewsets.ModelViewSet):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
+    filter_fields = {
+        "station": ListFilter("id", "Filter by station id (ex. ?station=2,3)"),
+    }
+    target_filter = ListFilter("id")
+    board_size = 20
+    max_board_size = 100
 
-    @staticmethod
-    def _params_to_ints(query_string):
-        return [int(str_id) for str_id in query_string.split(",")]
+    def list(self, request, *args, **kwargs):
+        """Get a list of all stations and filter by ID"""
+        return super().list(request, *args, **kwargs)
 
-    def get_queryset(self):
-        queryset = self.queryset
-        station = self.request.query_params.get("station")
-        if station:
-            station_id = self._params_to_ints(station)
-            queryset = queryset.filter(id__in=station_id)
-        return queryset
+    def _board(self, request, pk, station_field: str, time_field: str):
+        params = request.query_params
+        try:
+            size = int(params.get("limit", self.board_size))
+        except ValueError:
+            size = 0
+        if size < 1:
+            raise ValidationError({"limit": "Must be a positive integer."})
+        since = timezone.now()
+        if params.get("since"):
+            try:
+                since = parse_datetime(params["since"])
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({"since": f"Invalid value: {params['since']!r}."})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        station = get_object_or_404(Station.objects.only("id"), pk=pk)
+        # One range scan of the (station, time) index, see Journey.source_station.
+        journeys = (
+            Journey.objects.filter(
+                **{station_field: station, f"{time_field}__gte": since}
+            )
+            .select_related("source_station", "destination_station", "train")
+            .order_by(time_field)[: min(size, self.max_board_size)]
+        )
+        serializer = StationBoardSerializer(
+            journeys, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[BOARD_LIMIT_PARAMETER, BOARD_SINCE_PARAMETER],
+        responses=StationBoardSerializer(many=True),
+    )
+    @action(detail=True, pagination_class=None, filter_backends=[])
+    def departures(self, request, pk=None):
+        """Next journeys departing from the station (20 by default)."""
+        return self._board(request, pk, "source_station", "departure_time")
+
+    @extend_schema(
+        parameters=[BOARD_LIMIT_PARAMETER, BOARD_SINCE_PARAMETER],
+        responses=StationBoardSerializer(many=True),
+    )
+    @action(detail=True, pagination_class=None, filter_backends=[])
+    def arrivals(self, request, pk=None):
+        """Next journeys arriving at the station (20 by default)."""
+        return self._board(request, pk, "destination_station", "arrival_time")
 
     @extend_schema(
         parameters=[
             OpenApiParameter(
-                "station",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter by station id (ex. ?station=2,3)",
-            ),
+                "target",
+                {"type": "array", "items": {"type": "integer"}},
+                required=True,
+                description="Target station ids, at most 100 (ex. ?target=2,3)",
+            )
         ],
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "sources": {"type": "array", "items": {"type": "integer"}},
+                    "targets": {"type": "array", "items": {"type": "integer"}},
+                    "distances": {
+                        "type": "array",
+                        "items": {"type": "array", "items": {"type": "number"}},
+                    },
+                },
+            }
+        },
     )
-    def list(self, request, *args, **kwargs):
-        """Get a list of all stations and filter by ID"""
-        return super().list(request, *args, **kwargs)
+    @action(detail=False, pagination_class=None)
+    def distances(self, request):
+        """
+        Great-circle distances in km from the stations (all, or ?station=) to
+        the ?target= stations: distances[i][j] from sources[i] to targets[j].
+        """
+        if not request.query_params.get("target"):
+            raise ValidationError({"target": "This parameter is required."})
+        try:
+            targets = self.target_filter.filter(
+                Station.objects.all(), request.query_params, "target"
+            )
+        except ValidationError as error:
+            raise ValidationError({"target": error.detail})
+        sources = self.filter_queryset(self.get_queryset())
+
+        fields = ("id", "latitude", "longitude")
+        sources = np.array(list(sources.order_by("id").values_list(*fields)))
+        targets = np.array(list(targets.order_by("id").values_list(*fields)))
+        sources, targets = sources.reshape(-1, 3), targets.reshape(-1, 3)
+        distances = distance_matrix(sources[:, 1:], targets[:, 1:])
+        return Response(
+            {
+                "sources": sources[:, 0].astype(int).tolist(),
+                "targets": targets[:, 0].astype(int).tolist(),
+                "distances": np.round(distances, 1).tolist(),
+            }
+        )
 
 
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = Route.objects.all().select_related("source", "destination")
     serializer_class = RouteSerializer
-
-    @staticmethod
-    def _params_to_ints(query_string):
-        return [int(str_id) for str_id in query_string.split(",")]
+    values_serializer_class = RouteListValuesSerializer
+    filter_fields = {
+        "source": ListFilter("source_id", "Filter by source id (ex. ?source=2,3)"),
+        "destination": ListFilter(
+            "destination_id", "Filter by destination id (ex. ?destination=2,3)"
+        ),
+        "distance": RangeFilter(
+            "distance", "Filter by distance (ex. ?distance_min=100&distance_max=300)"
+        ),
+    }
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -194,40 +322,7 @@ class RouteViewSet(viewsets.ModelViewSet):
 
         return RouteSerializer
 
-    def get_queryset(self):
-        queryset = self.queryset
-
-        source_param = self.request.query_params.get("source")
-        destination_param = self.request.query_params.get("destination")
-        distance_parm = self.request.query_params.get("distance")
-
-        if source_param:
-            source_param_id = self._params_to_ints(source_param)
-            queryset = queryset.filter(source__id__in=source_param_id)
-
-        if destination_param:
-            destination_param_id = self._params_to_ints(destination_param)
-            queryset = queryset.filter(destination__id__in=destination_param_id)
-
-        if distance_parm:
-            queryset = queryset.filter(distance=distance_parm)
-
-        return queryset.distinct()
-
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "source",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter by source id (ex. ?source=2,3)",
-            ),
-            OpenApiParameter(
-                "destination",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter by destination id (ex. ?destination=2,3)",
-            ),
-        ],
-    )
+    @single_flight()
     def list(self, request, *args, **kwargs):
         """Get a list of all sources and destinations and filter the route by source ID and route ID ."""
         return super().list(request, *args, **kwargs)
@@ -237,40 +332,41 @@ class CrewViewSet(viewsets.ModelViewSet):
     queryset = Crew.objects.all()
     serializer_class = CrewSerializer
     permission_classes = (IsAdminAllORIsAuthenticatedReadOnly,)
+    filter_fields = {
+        "crew": ListFilter("id", "Filter by crew id (ex. ?crew=2,3)"),
+    }
 
-    @staticmethod
-    def _params_to_ints(query_string):
-        return [int(str_id) for str_id in query_string.split(",")]
-
-    def get_queryset(self):
-        queryset = self.queryset
-        crew = self.request.query_params.get("crew")
-        if crew:
-            crew_id = self._params_to_ints(crew)
-            queryset = queryset.filter(id__in=crew_id)
-        return queryset
-
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "crew",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter by crew id (ex. ?crew=2,3)",
-            ),
-        ],
-    )
     def list(self, request, *args, **kwargs):
         """Get list of all crews."""
         return super().list(request, *args, **kwargs)
 
 
-class JourneyViewSet(viewsets.ModelViewSet):
+class JourneyViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = (
         Journey.objects.all()
         .select_related("train", "route", "route__source", "route__destination")
         .prefetch_related("crew")
     )
     serializer_class = JourneySerializer
+    values_serializer_class = JourneyListValuesSerializer
+    # Longest date range for which a time-of-day window is expanded into
+    # one departure_time range per day instead of a __time cast.
+    max_time_window_days = 31
+    max_delay_updates = 10_000
+    filter_fields = {
+        "route": ListFilter(
+            "route_id", "Filter journey (trips) by route ID (ex. ?route=101)"
+        ),
+        # (source, destination) on Route, then (route, departure_time) on Journey.
+        "from_station": ListFilter(
+            "route__source_id",
+            "Filter journey (trips) by source station ID (ex. ?from_station=1)",
+        ),
+        "to_station": ListFilter(
+            "route__destination_id",
+            "Filter journey (trips) by destination station ID (ex. ?to_station=2)",
+        ),
+    }
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -280,24 +376,89 @@ class JourneyViewSet(viewsets.ModelViewSet):
 
         return JourneySerializer
 
-    def get_queryset(self):
-        queryset = self.queryset
-
-        start_data = self.request.query_params.get("start")
-        route_id_str = self.request.query_params.get("route")
-        departure_time_gte = self.request.query_params.get("departure_time__gte")
+    def _query_param(self, name, parse):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            parsed = parse(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: f"Invalid value: {value!r}."})
+        return parsed
 
-        if start_data:
-            start_data = datetime.strptime(start_data, "%Y-%m-%d").date()
-            queryset = queryset.filter(departure_time___date=start_data)
+    @staticmethod
+    def _day_start(day: date) -> datetime:
+        return timezone.make_aware(datetime.combine(day, time.min))
 
-        if route_id_str:
-            queryset = queryset.filter(route_id=int(route_id_str))
+    def _filter_time_window(self, queryset, date_from, date_to, time_from, time_to):
+        """
+        Departures between time_from (inclusive) and time_to (exclusive) local
+        time, wrapping past midnight when time_to <= time_from.
+        """
+        wraps = time_to is not None and time_to <= time_from
+        if (
+            date_from
+            and date_to
+            and ((date_to - date_from).days < self.max_time_window_days)
+        ):
+            # One half-open departure_time range per day keeps the index usable.
+            window = Q()
+            day = date_from - timedelta(days=1) if wraps else date_from
+            while day <= date_to:
+                start = timezone.make_aware(datetime.combine(day, time_from))
+                if time_to is None:
+                    end = self._day_start(day + timedelta(days=1))
+                else:
+                    end_day = day + timedelta(days=1) if wraps else day
+                    end = timezone.make_aware(datetime.combine(end_day, time_to))
+                window |= Q(departure_time__gte=start, departure_time__lt=end)
+                day += timedelta(days=1)
+            return queryset.filter(window)
+
+        # Unbounded date range: filter the rows of the departure_time range.
+        if time_to is None:
+            return queryset.filter(departure_time__time__gte=time_from)
+        if wraps:
+            return queryset.filter(
+                Q(departure_time__time__gte=time_from)
+                | Q(departure_time__time__lt=time_to)
+            )
+        return queryset.filter(
+            departure_time__time__gte=time_from, departure_time__time__lt=time_to
+        )
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        start = self._query_param("start", parse_date)
+        date_from = self._query_param("date_from", parse_date) or start
+        date_to = self._query_param("date_to", parse_date) or start
+        time_from = self._query_param("time_from", parse_time)
+        time_to = self._query_param("time_to", parse_time)
+        departure_time_gte = self._query_param("departure_time__gte", parse_datetime)
+
+        # Half-open ranges on departure_time rather than __date casts, which
+        # cannot use the departure_time indexes.
+        if date_from and date_to and date_to < date_from:
+            raise ValidationError({"date_to": "Must not be before date_from."})
+        if date_from:
+            queryset = queryset.filter(departure_time__gte=self._day_start(date_from))
+        if date_to:
+            queryset = queryset.filter(
+                departure_time__lt=self._day_start(date_to + timedelta(days=1))
+            )
+        if time_from or time_to:
+            queryset = self._filter_time_window(
+                queryset, date_from, date_to, time_from or time.min, time_to
+            )
         if departure_time_gte:
-            parsed_dt = parse_datetime(departure_time_gte)
-            if parsed_dt:
-                queryset = queryset.filter(departure_time__gte=parsed_dt)
+            queryset = queryset.filter(departure_time__gte=departure_time_gte)
+
+        if self.action == "list" and not (date_from or departure_time_gte):
+            # Upcoming journeys only, unless an explicit lower bound is given.
+            queryset = queryset.filter(departure_time__gte=timezone.now())
 
         return queryset
 
@@ -314,9 +475,33 @@ class JourneyViewSet(viewsets.ModelViewSet):
                 required=False,
             ),
             OpenApiParameter(
-                name="route",
-                type=OpenApiTypes.INT,
-                description="Filter journey (trips) by route ID (ex. ?route=101)",
+                name="date_from",
+                type=OpenApiTypes.DATE,
+                description="Journeys departing on or after this date (ex. ?date_from=2025-05-08)",
+                location=OpenApiParameter.QUERY,
+                required=False,
+            ),
+            OpenApiParameter(
+                name="date_to",
+                type=OpenApiTypes.DATE,
+                description="Journeys departing on or before this date (ex. ?date_to=2025-05-10)",
+                location=OpenApiParameter.QUERY,
+                required=False,
+            ),
+            OpenApiParameter(
+                name="time_from",
+                type=OpenApiTypes.TIME,
+                description="Departure time of day from, inclusive (ex. ?time_from=06:00)",
+                location=OpenApiParameter.QUERY,
+                required=False,
+            ),
+            OpenApiParameter(
+                name="time_to",
+                type=OpenApiTypes.TIME,
+                description=(
+                    "Departure time of day to, exclusive; wraps past midnight "
+                    "when earlier than time_from (ex. ?time_to=12:00)"
+                ),
                 location=OpenApiParameter.QUERY,
                 required=False,
             ),
@@ -324,7 +509,8 @@ class JourneyViewSet(viewsets.ModelViewSet):
     )
     def list(self, request, *args, **kwargs):
         """
-        Get a list of all journey (trips) with the ability to filter by start date and route ID.
+        Get a list of upcoming journey (trips) with the ability to filter by
+        stations, route ID, departure date range and time of day.
         """
         return super().list(request, *args, **kwargs)
 
@@ -339,44 +525,344 @@ class JourneyViewSet(viewsets.ModelViewSet):
             ),
         ]
     )
+    @single_flight()
     def retrieve(self, request, *args, **kwargs):
         """
         Get detailed information about a specific journey (trip) by its ID.
         """
         return super().retrieve(request, *args, **kwargs)
 
+    @extend_schema(
+        request=DelayUpdateSerializer(many=True),
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "updated": {"type": "integer"},
+                    "unchanged": {"type": "integer"},
+                    "missing": {"type": "array", "items": {"type": "integer"}},
+                },
+            }
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAdminUser],
+        pagination_class=None,
+        filter_backends=[],
+    )
+    def delays(self, request):
+        """
+        Ingest realtime estimated times of up to 10000 journeys (admin only).
+        Only changed journeys are written, in batches; unknown ids are returned
+        as missing.
+        """
+        serializer = DelayUpdateSerializer(
+            data=request.data, many=True, max_length=self.max_delay_updates
+        )
+        serializer.is_valid(raise_exception=True)
+        result = apply_delays(
+            DelayUpdate(**update) for update in serializer.validated_data
+        )
+        return Response(
+            {
+                "updated": len(result.updated),
+                "unchanged": result.unchanged,
+                "missing": result.missing,
+            }
+        )
+
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all().select_related("user")
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
+    filter_fields = {
+        "created_at": DateFilter(
+            "created_at",
+            "Filter orders by creation date (YYYY-MM-DD) (ex. ?created_at=2025-05-13)",
+        ),
+        "created": DateRangeFilter("created_at", "creation date (YYYY-MM-DD)"),
+        "travel_date": RelatedDateFilter(
+            [
+                "tickets__journey__departure_time",
+                "archived_tickets__journey__departure_time",
+            ],
+            "Filter orders by departure date of a ticket (ex. ?travel_date=2025-05-20)",
+        ),
+    }
 
     def get_queryset(self):
         queryset = (
             Order.objects.filter(user=self.request.user)
-            .prefetch_related("tickets")
+            .prefetch_related(
+                Prefetch(
+                    "tickets",
+                    queryset=Ticket.objects.select_related(
+                        "journey__route__source",
+                        "journey__route__destination",
+                        "journey__train",
+                    ),
+                ),
+                Prefetch(
+                    "archived_tickets",
+                    queryset=ArchivedTicket.objects.select_related(
+                        "journey__route__source", "journey__route__destination"
+                    ),
+                ),
+            )
             .select_related("user")
         )
-        created_at = self.request.query_params.get("created_at")
-        if created_at:
-            created_at = datetime.strptime(created_at, "%Y-%m-%d").date()
-            queryset = queryset.filter(created_at__date=created_at)
-
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        Get a list of user's orders, optionally filtered by creation or travel
+        date. Tickets of archived journeys are listed too. Paginated with
+        ?page_size=, following the `next` link.
+        """
+        return super().list(request, *args, **kwargs)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
-                name="created_at",
-                type=OpenApiTypes.DATE,
-                description="Filter orders by creation date (YYYY-MM-DD) (ex. ?created_at=2025-05-13)",
-                location=OpenApiParameter.QUERY,
+                name="Idempotency-Key",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Unique key of this order attempt: retries with the same key "
+                    "get the original response instead of a new order"
+                ),
+                location=OpenApiParameter.HEADER,
                 required=False,
             ),
         ],
     )
-    def list(self, request, *args, **kwargs):
-        """Get a list of user's orders, optionally filtered by creation date."""
-        return super().list(request, *args, **kwargs)
+    def create(self, request, *args, **kwargs):
+        """Create an order, at most once per Idempotency-Key header."""
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        return idempotent_response(
+            request, key, lambda: super(OrderViewSet, self).create(request)
+        )
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # Side effects run on the job queue; the jobs commit with the order.
+        with transaction.atomic():
+            order = serializer.save(user=self.request.user)
+            enqueue("order_created", {"order_id": order.id})
+
+
+async def _iterate_in_thread(iterator):
+    """
+    Pull a sync iterator one item at a time in the sync thread (where its
+    database connection lives), closing it if the client goes away.
+    """
+    done = object()
+    try:
+        while (
+            item := await sync_to_async(next, thread_sensitive=True)(iterator, done)
+        ) is not done:
+            yield item
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+class AnalyticsExportView(APIView):
+    """
+    Stream a dataset (tickets joined with journey, route and train, or
+    journeys) as a Parquet or Arrow IPC file, one row group at a time.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "file_format",
+                enum=sorted(FORMATS),
+                default="parquet",
+                description="Output file format",
+            )
+        ],
+        responses={
+            (200, media_type): OpenApiTypes.BINARY for media_type, _ in FORMATS.values()
+        },
+    )
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise NotFound(f"Unknown dataset {dataset!r}.")
+        file_format = request.query_params.get("file_format", "parquet")
+        if file_format not in FORMATS:
+            raise ValidationError({"file_format": f"Must be one of {sorted(FORMATS)}."})
+        media_type, extension = FORMATS[file_format]
+        content = export_dataset(dataset, file_format)
+        if isinstance(request._request, ASGIRequest):
+            # ASGI buffers a sync iterator whole before sending it.
+            content = _iterate_in_thread(content)
+        response = StreamingHttpResponse(content, content_type=media_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{dataset}.{extension}"'
+        )
+        return response
+
+
+class TicketScanView(APIView):
+    """
+    Batch upload of gate scans: each ticket token is verified and its first
+    use recorded, all in one query per batch, so scanners learn about
+    tickets already used at another gate.
+    """
+
+    permission_classes = (IsAdminUser,)
+    max_scans = 10_000
+
+    @extend_schema(
+        request=TicketScanSerializer(many=True),
+        responses={
+            200: {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "status": {
+                            "type": "string",
+                            "enum": ["valid", "duplicate", "invalid", "unknown"],
+                        },
+                        "ticket": {"type": "integer"},
+                        "detail": {"type": "string"},
+                        "first_scanned_at": {"type": "string", "format": "date-time"},
+                        "first_gate": {"type": "string"},
+                    },
+                },
+            }
+        },
+    )
+    def post(self, request):
+        serializer = TicketScanSerializer(
+            data=request.data, many=True, max_length=self.max_scans
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            record_scans(Scan(**scan) for scan in serializer.validated_data)
+        )
+
+
+# Comment lines sent on idle streams so proxies keep the connection open.
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+def _authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _availability_events(journey: Journey):
+    capacity = journey.train.cargo_num * journey.train.place_in_cargo
+
+    async def taken_seats() -> set[tuple[int, int]]:
+        return {
+            seat
+            async for seat in Ticket.objects.filter(journey=journey).values_list(
+                "cargo", "seat"
+            )
+        }
+
+    def snapshot() -> str:
+        return _event(
+            "snapshot",
+            {
+                "journey": journey.id,
+                "capacity": capacity,
+                "available": capacity - len(taken),
+                "taken": sorted(taken),
+                **{
+                    field: isoformat(getattr(journey, field))
+                    for field in ESTIMATED_FIELDS
+                },
+            },
+        )
+
+    # Subscribe before reading the seat map so no change falls in between;
+    # changes already in the snapshot are skipped below.
+    queue = hub.subscribe(journey.id)
+    try:
+        await hub.wait_listening()
+        taken = await taken_seats()
+        yield snapshot()
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=STREAM_KEEPALIVE_SECONDS
+                )
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event["type"] == "resync":
+                await journey.arefresh_from_db(fields=ESTIMATED_FIELDS)
+                taken = await taken_seats()
+                yield snapshot()
+                continue
+            if event["type"] == "delayed":
+                yield _event(
+                    "delayed", {field: event[field] for field in ESTIMATED_FIELDS}
+                )
+                continue
+            seat = (event["cargo"], event["seat"])
+            if event["type"] == "sold" and seat not in taken:
+                taken.add(seat)
+            elif event["type"] == "released" and seat in taken:
+                taken.discard(seat)
+            else:
+                continue
+            yield _event(
+                event["type"],
+                {
+                    "cargo": seat[0],
+                    "seat": seat[1],
+                    "available": capacity - len(taken),
+                },
+            )
+    finally:
+        hub.unsubscribe(journey.id, queue)
+
+
+async def journey_availability_stream(request, pk):
+    """
+    Server-Sent Events of a journey's seats: a `snapshot` event with the taken
+    seats, then `sold` / `released` events as tickets are created or deleted
+    and `delayed` events with new estimated times.
+    Served through the ASGI application only, each open stream holds no
+    thread: a WSGI server would buffer the endless stream instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "The stream is only served by the ASGI application."},
+            status=501,
+        )
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    journey = await Journey.objects.select_related("train").filter(pk=pk).afirst()
+    if journey is None:
+        return JsonResponse(
+            {"detail": "No Journey matches the given query."}, status=404
+        )
+    return StreamingHttpResponse(
+        _availability_events(journey),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )